@@ -0,0 +1,114 @@
+import math
+import os
+import threading
+import time
+
+
+# Each lane has its own concurrency limit and bounded wait queue, so a burst
+# of crawls can never hold up quick single-page analyses. A request that
+# finds its lane's queue full, or waits longer than ADMISSION_WAIT_SECONDS,
+# is rejected right away with 429 and a Retry-After estimate.
+LANE_INTERACTIVE_CONCURRENCY = int(os.getenv("LANE_INTERACTIVE_CONCURRENCY", "8"))
+LANE_INTERACTIVE_QUEUE = int(os.getenv("LANE_INTERACTIVE_QUEUE", "16"))
+LANE_CRAWL_CONCURRENCY = int(os.getenv("LANE_CRAWL_CONCURRENCY", "2"))
+LANE_CRAWL_QUEUE = int(os.getenv("LANE_CRAWL_QUEUE", "4"))
+LANE_STREAM_CONCURRENCY = int(os.getenv("LANE_STREAM_CONCURRENCY", "8"))
+ADMISSION_WAIT_SECONDS = float(os.getenv("ADMISSION_WAIT_SECONDS", "10"))
+RETRY_AFTER_MAX_SECONDS = 120
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"Servidor ocupado ({lane}); tente novamente em {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Lane:
+    def __init__(self, name: str, concurrency: int, queue_size: int, wait_seconds: float = ADMISSION_WAIT_SECONDS):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.wait_seconds = wait_seconds
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Smoothed seconds per request, for Retry-After.
+        self.service_seconds = 1.0
+        self._condition = threading.Condition()
+
+    def retry_after(self) -> int:
+        ahead = self.waiting + 1
+        estimate = self.service_seconds * ahead / self.concurrency
+        return min(RETRY_AFTER_MAX_SECONDS, max(1, math.ceil(estimate)))
+
+    def acquire(self):
+        with self._condition:
+            if self.active >= self.concurrency and self.waiting >= self.queue_size:
+                self.rejected += 1
+                raise Overloaded(self.name, self.retry_after())
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(lambda: self.active < self.concurrency, self.wait_seconds)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                raise Overloaded(self.name, self.retry_after())
+            self.active += 1
+            self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started: float):
+        elapsed = time.monotonic() - started
+        with self._condition:
+            self.active -= 1
+            self.service_seconds += SERVICE_TIME_SMOOTHING * (elapsed - self.service_seconds)
+            self._condition.notify()
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "queueSize": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "serviceSeconds": round(self.service_seconds, 2),
+        }
+
+
+class AdmissionController:
+    def __init__(self, lanes):
+        self.lanes = {lane.name: lane for lane in lanes}
+
+    def acquire(self, lane_name: str):
+        # Returns a release callable; call it exactly once when the response
+        # (including a streamed body) is finished.
+        lane = self.lanes[lane_name]
+        started = lane.acquire()
+        released = threading.Event()
+
+        def release():
+            if not released.is_set():
+                released.set()
+                lane.release(started)
+
+        return release
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+
+def default_admission():
+    return AdmissionController(
+        [
+            Lane("interactive", LANE_INTERACTIVE_CONCURRENCY, LANE_INTERACTIVE_QUEUE),
+            Lane("crawl", LANE_CRAWL_CONCURRENCY, LANE_CRAWL_QUEUE),
+            # Long-lived job streams cannot use up the serving threads; no
+            # queue, the client reconnects later.
+            Lane("stream", LANE_STREAM_CONCURRENCY, 0, wait_seconds=0),
+        ]
+    )
@@ -1,14 +1,19 @@
 import re
 from collections import defaultdict
 
-from content_generator_aeo import generate_aeo_markdown
+from artifact_store import digest, module_version
+from budget_engine import BudgetExceeded
+from content_generator_aeo import generate_aeo_content
+from content_model import answer, content_markdown, heading
 from entity_engine import extract_entities
+from gazetteer import gazetteer_for
 from intent_engine import detect_intent, infer_primary_question, infer_secondary_questions
-from issue_engine import build_issues
+from issue_engine import build_issues, structural_issues
 from parser_engine import expected_data_gaps
-from schema_engine import build_schema_ld, check_schema_parity
+from schema_engine import build_schema_ld, compare_existing_schema, validate_schema
 from scoring_engine import compute_aeo_score
 from test_harness import run_test_harness
+from text_index import TextIndex
 
 
 def safe_filename(url: str):
@@ -42,75 +47,396 @@ def _legacy_summary_from_breakdown(score_pack, issues_pack):
     return {"score": score_pack.get("total", 0), "issues": flat_issues}
 
 
-def build_page_artifacts(parsed_page):
-    intent = detect_intent(parsed_page.get("url"), parsed_page)
-    primary_question = infer_primary_question(intent, parsed_page)
-    secondary_questions = infer_secondary_questions(intent, parsed_page, limit=6)
-    entities = extract_entities(parsed_page)
-    gaps = expected_data_gaps(parsed_page)
-
-    content_pack = generate_aeo_markdown(
-        parsed_page=parsed_page,
-        intent=intent,
-        primary_question=primary_question,
-        secondary_questions=secondary_questions,
-        entities=entities,
-        expected_gaps=gaps,
+def _check_budget(budget, stage: str):
+    if budget is not None:
+        budget.check(stage)
+
+
+def _content_pack(ctx):
+    return generate_aeo_content(
+        parsed_page=ctx["parsed_page"],
+        intent=ctx["intent"],
+        primary_question=ctx["primary_question"],
+        secondary_questions=ctx["secondary_questions"],
+        entities=ctx["entities"],
+        expected_gaps=ctx["gaps"],
+        text_index=ctx["text_index"],
     )
 
-    schema = build_schema_ld(parsed_page, content_pack, intent, entities)
-    parity_ok, parity_errors = check_schema_parity(schema, content_pack)
 
-    score_pack = compute_aeo_score(
-        intent=intent,
-        primary_question=primary_question,
-        entities=entities,
-        content_pack=content_pack,
-        schema=schema,
-        secondary_questions=secondary_questions,
+def _with_schema_graph(content_pack, schema):
+    return {**content_pack, "schema_graph": schema.get("@graph", [])}
+
+
+def _published_content_pack(content_pack, schema=None):
+    # The stages work on the blocks; markdown is rendered once the content
+    # pack itself is part of the result.
+    published = {**content_pack, "markdown": content_markdown(content_pack)}
+    return _with_schema_graph(published, schema) if schema is not None else published
+
+
+def _score_pack(ctx):
+    return compute_aeo_score(
+        intent=ctx["intent"],
+        primary_question=ctx["primary_question"],
+        entities=ctx["entities"],
+        content_pack=ctx["content_pack"],
+        schema=ctx["schema"],
+        secondary_questions=ctx["secondary_questions"],
+        validation=ctx["schema_validation"],
     )
 
-    content_pack["schema_graph"] = schema.get("@graph", [])
 
-    issues_pack = build_issues(
-        parsed_page=parsed_page,
-        score_pack=score_pack,
-        content_pack=content_pack,
-        entities=entities,
-        schema_parity_ok=parity_ok,
-        schema_parity_errors=parity_errors,
-        expected_gaps=gaps,
+def _issues_pack(ctx):
+    validation = ctx["schema_validation"]
+    return build_issues(
+        parsed_page=ctx["parsed_page"],
+        score_pack=ctx["score_pack"],
+        content_pack=_with_schema_graph(ctx["content_pack"], ctx["schema"]),
+        entities=ctx["entities"],
+        schema_parity_ok=validation["parity_ok"],
+        schema_parity_errors=validation["parity_errors"],
+        expected_gaps=ctx["gaps"],
+        schema_comparison=ctx["schema_comparison"],
+        structural=ctx["structural_issues"],
+        schema_errors=validation["errors"],
     )
 
-    test_report = run_test_harness(primary_question, content_pack, entities, schema)
 
-    page_meta = {
+def _page_meta(ctx):
+    parsed_page = ctx["parsed_page"]
+    return {
         "url": parsed_page.get("url"),
         "title": parsed_page.get("title"),
-        "intent": intent,
-        "primaryQuestion": primary_question,
-        "secondaryQuestions": secondary_questions,
-        "directAnswer": content_pack.get("direct_answer"),
+        "intent": ctx["intent"],
+        "primaryQuestion": ctx["primary_question"],
+        "secondaryQuestions": ctx["secondary_questions"],
+        "directAnswer": ctx["content_pack"].get("direct_answer"),
         "sourceSummary": (parsed_page.get("paragraphs") or [""])[0][:300],
+        "existingSchemaTypes": ctx["schema_comparison"]["existing_types"],
     }
 
+
+# Stage graph: name -> (dependencies, function). Each function reads the
+# parsed page and its dependencies from `ctx`.
+STAGES = {
+    # Lowercased/accent-folded text shared by every engine that scans full_text.
+    "text_index": ((), lambda ctx: TextIndex(ctx["parsed_page"].get("full_text") or "")),
+    "intent": (("text_index",), lambda ctx: detect_intent(ctx["parsed_page"].get("url"), ctx["parsed_page"], text_index=ctx["text_index"])),
+    "primary_question": (("intent",), lambda ctx: infer_primary_question(ctx["intent"], ctx["parsed_page"])),
+    "secondary_questions": (
+        ("intent", "text_index"),
+        lambda ctx: infer_secondary_questions(ctx["intent"], ctx["parsed_page"], limit=6, text_index=ctx["text_index"]),
+    ),
+    "entities": (
+        ("text_index",),
+        lambda ctx: extract_entities(ctx["parsed_page"], text_index=ctx["text_index"], gazetteer=ctx["gazetteer"]),
+    ),
+    "gaps": (("text_index",), lambda ctx: expected_data_gaps(ctx["parsed_page"], text_index=ctx["text_index"])),
+    "content_pack": (("intent", "primary_question", "secondary_questions", "entities", "gaps", "text_index"), _content_pack),
+    "schema": (
+        ("content_pack", "intent", "entities"),
+        lambda ctx: build_schema_ld(ctx["parsed_page"], ctx["content_pack"], ctx["intent"], ctx["entities"]),
+    ),
+    "schema_validation": (("schema", "content_pack"), lambda ctx: validate_schema(ctx["schema"], ctx["content_pack"])),
+    "schema_comparison": (("schema",), lambda ctx: compare_existing_schema(ctx["schema"], ctx["parsed_page"])),
+    "structural_issues": (
+        ("schema_comparison",),
+        lambda ctx: structural_issues(ctx["parsed_page"], ctx["schema_comparison"]),
+    ),
+    "score_pack": (
+        ("intent", "primary_question", "entities", "content_pack", "schema", "secondary_questions", "schema_validation"),
+        _score_pack,
+    ),
+    "issues_pack": (
+        ("score_pack", "content_pack", "schema", "entities", "schema_validation", "gaps", "schema_comparison", "structural_issues"),
+        _issues_pack,
+    ),
+    "test_report": (
+        ("primary_question", "content_pack", "entities", "schema", "schema_validation"),
+        lambda ctx: run_test_harness(
+            ctx["primary_question"], ctx["content_pack"], ctx["entities"], ctx["schema"], validation=ctx["schema_validation"]
+        ),
+    ),
+    "page_meta": (("intent", "primary_question", "secondary_questions", "content_pack", "schema_comparison"), _page_meta),
+    "legacy_basic": ((), lambda ctx: _extract_legacy_basic(ctx["parsed_page"])),
+    "legacy_links": ((), lambda ctx: _legacy_links(ctx["parsed_page"])),
+    "legacy_summary": (("score_pack", "issues_pack"), lambda ctx: _legacy_summary_from_breakdown(ctx["score_pack"], ctx["issues_pack"])),
+}
+
+# Modules whose source makes up each stage's code version (memo keys).
+STAGE_MODULES = {
+    "text_index": ("text_index",),
+    "intent": ("intent_engine",),
+    "primary_question": ("intent_engine",),
+    "secondary_questions": ("intent_engine",),
+    "entities": ("entity_engine", "gazetteer"),
+    "gaps": ("parser_engine",),
+    "content_pack": ("content_generator_aeo", "content_model", "fact_engine"),
+    "schema": ("schema_engine", "structured_data_engine"),
+    "schema_validation": ("schema_engine", "schema_vocabulary"),
+    "schema_comparison": ("schema_engine", "structured_data_engine"),
+    "structural_issues": ("issue_engine",),
+    "score_pack": ("scoring_engine", "content_model"),
+    "issues_pack": ("issue_engine",),
+    "test_report": ("test_harness", "content_model"),
+    "page_meta": (__name__,),
+    "legacy_basic": (__name__,),
+    "legacy_links": (__name__,),
+    "legacy_summary": (__name__,),
+}
+# Data a stage reads besides its code: the request's entity dictionaries.
+STAGE_DATA_VERSIONS = {"entities": lambda ctx: ctx["gazetteer"].version}
+# Derived in memory, never stored.
+UNSTORED_STAGES = ("text_index",)
+
+ARTIFACT_KEYS = (
+    "intent",
+    "primary_question",
+    "secondary_questions",
+    "entities",
+    "gaps",
+    "content_pack",
+    "schema",
+    "schema_comparison",
+    "structural_issues",
+    "score_pack",
+    "issues_pack",
+    "test_report",
+    "page_meta",
+    "legacy_basic",
+    "legacy_links",
+    "legacy_summary",
+)
+
+# Public names accepted by `fields=` (API/CLI) and the artifacts they select.
+FIELD_ARTIFACTS = {
+    "intent": ("intent",),
+    "questions": ("primary_question", "secondary_questions"),
+    "entities": ("entities",),
+    "content": ("content_pack",),
+    "markdown": ("content_pack",),
+    "schema": ("schema",),
+    "schemaComparison": ("schema_comparison",),
+    "structuralIssues": ("structural_issues",),
+    "score": ("score_pack",),
+    "issues": ("issues_pack",),
+    "tests": ("test_report",),
+    "meta": ("page_meta",),
+    "legacy": ("legacy_basic", "legacy_links", "legacy_summary"),
+}
+
+# Budget checkpoints run after these stages (the label is the stage reported
+# in `degraded` when the page runs out of time).
+BUDGET_CHECKPOINTS = {
+    "secondary_questions": "intent",
+    "entities": "entities",
+    "content_pack": "content",
+    "structural_issues": "schema",
+    "issues_pack": "score",
+}
+
+
+def parse_fields(value):
+    # "score,entities" or ["score", "entities"] -> artifact keys; None keeps
+    # the full artifact set.
+    if not value:
+        return None
+    names = value.split(",") if isinstance(value, str) else list(value)
+    artifacts = []
+    for name in (str(name).strip() for name in names):
+        if not name:
+            continue
+        if name in FIELD_ARTIFACTS:
+            artifacts.extend(FIELD_ARTIFACTS[name])
+        elif name in ARTIFACT_KEYS:
+            artifacts.append(name)
+        else:
+            raise ValueError(f"Campo desconhecido em 'fields': {name}")
+    return tuple(dict.fromkeys(artifacts)) or None
+
+
+def stage_plan(targets):
+    # Dependencies first, each stage once.
+    plan = []
+
+    def visit(name):
+        if name in plan:
+            return
+        for dependency in STAGES[name][0]:
+            visit(dependency)
+        plan.append(name)
+
+    for target in targets:
+        visit(target)
+    return plan
+
+
+def stage_memo_keys(plan, page_key: str, ctx):
+    # key(stage) = hash(stage, code version, page, dependency keys), so a
+    # change invalidates the stage and everything downstream of it.
+    keys = {}
+    for name in plan:
+        version = module_version(*STAGE_MODULES[name])
+        if name in STAGE_DATA_VERSIONS:
+            version = digest(version, STAGE_DATA_VERSIONS[name](ctx))
+        keys[name] = digest(
+            name,
+            version,
+            page_key,
+            [keys[dependency] for dependency in STAGES[name][0]],
+        )
+    return keys
+
+
+def build_page_artifacts(parsed_page, budget=None, fields=None, memo=None, page_key=None, dictionaries=()):
+    # `fields` (artifact keys, see parse_fields) limits the result to those
+    # artifacts and runs only the stages they depend on. With `memo` (an
+    # ArtifactStore) stage results are reused when their memo key matches.
+    # `dictionaries` names the client or vertical entity dictionaries.
+    _check_budget(budget, "parse")
+    targets = fields or ARTIFACT_KEYS
+    plan = stage_plan(targets)
+    ctx = {"parsed_page": parsed_page, "gazetteer": gazetteer_for(dictionaries)}
+    keys = stage_memo_keys(plan, page_key or digest(parsed_page), ctx) if memo is not None else {}
+    needed = _stages_to_run(plan, targets, keys, memo, ctx)
+    for name in plan:
+        if name in needed:
+            ctx[name] = STAGES[name][1](ctx)
+            if memo is not None and name not in UNSTORED_STAGES:
+                memo.put(keys[name], ctx[name])
+        if name in BUDGET_CHECKPOINTS:
+            _check_budget(budget, BUDGET_CHECKPOINTS[name])
+
+    artifacts = {key: ctx[key] for key in targets}
+    if "content_pack" in artifacts:
+        artifacts["content_pack"] = _published_content_pack(ctx["content_pack"], ctx.get("schema"))
+    artifacts["degraded"] = None
+    return artifacts
+
+
+def _stages_to_run(plan, targets, keys, memo, ctx):
+    # Walks back from the targets: a stored stage satisfies its whole subtree.
+    if memo is None:
+        return set(plan)
+    needed = set()
+
+    def require(name):
+        if name in needed or name in ctx:
+            return
+        if name not in UNSTORED_STAGES:
+            found, value = memo.get(keys[name])
+            if found:
+                ctx[name] = value
+                return
+        needed.add(name)
+        for dependency in STAGES[name][0]:
+            require(dependency)
+
+    for target in targets:
+        require(target)
+    return needed
+
+
+# What an edited content pack feeds into; /rescore reruns only these.
+RESCORE_ARTIFACTS = ("schema", "schema_validation", "score_pack", "issues_pack", "test_report")
+# Stage results that do not depend on the content pack and can be reused.
+CONTENT_INPUTS = tuple(name for name in STAGES if name != "content_pack" and "content_pack" not in stage_plan((name,)))
+
+
+def rescore_artifacts(parsed_page, content_pack, inputs=None, targets=RESCORE_ARTIFACTS, dictionaries=()):
+    # Reruns the stages downstream of an edited content pack. `inputs` holds
+    # stage results of the original analysis (see CONTENT_INPUTS); anything
+    # missing is recomputed from the parsed page.
+    ctx = {"parsed_page": parsed_page, "gazetteer": gazetteer_for(dictionaries)}
+    ctx.update((name, value) for name, value in (inputs or {}).items() if name in CONTENT_INPUTS)
+    ctx["content_pack"] = content_pack
+    for name in stage_plan(targets):
+        if name not in ctx:
+            ctx[name] = STAGES[name][1](ctx)
+    artifacts = {key: ctx[key] for key in targets}
+    if "content_pack" in artifacts:
+        artifacts["content_pack"] = _published_content_pack(ctx["content_pack"], ctx.get("schema"))
+    return artifacts
+
+
+def build_page_artifacts_within_budget(
+    parsed_page, budget=None, fields=None, memo=None, page_key=None, dictionaries=()
+):
+    try:
+        return build_page_artifacts(
+            parsed_page, budget=budget, fields=fields, memo=memo, page_key=page_key, dictionaries=dictionaries
+        )
+    except BudgetExceeded as error:
+        return project_artifacts(build_degraded_artifacts(parsed_page, error), fields)
+
+
+def build_degraded_artifacts(parsed_page, error):
+    # Same shape as build_page_artifacts so callers can treat both alike; the
+    # `degraded` flag tells consumers that the analysis was cut short.
+    title = parsed_page.get("title") or "Pagina sem titulo"
+    reason = f"Analise interrompida na etapa '{error.stage}' ({error.reason})"
+    degraded = {"stage": error.stage, "reason": error.reason}
+    blocks = [heading(1, title), answer(f"{reason}. Resultado parcial.")]
+    content_pack = {
+        "blocks": blocks,
+        "markdown": content_markdown({"blocks": blocks}),
+        "direct_answer": "",
+        "faq": [],
+        "facts": {},
+        "fact_values": {},
+        "fact_candidates": {},
+    }
+    score_pack = {"total": 0, "breakdown": {}, "degraded": degraded}
+    issues_pack = {
+        "Technical SEO": [reason],
+        "AEO/GEO Content Quality": [],
+        "Structured Data": [],
+    }
+    structural = {"Technical SEO": [], "Structured Data": []}
     return {
-        "intent": intent,
-        "primary_question": primary_question,
-        "secondary_questions": secondary_questions,
-        "entities": entities,
+        "intent": None,
+        "primary_question": None,
+        "secondary_questions": [],
+        "entities": [],
+        "gaps": [],
         "content_pack": content_pack,
-        "schema": schema,
+        "schema": {"@context": "https://schema.org", "@graph": []},
+        "schema_comparison": {
+            "existing_types": (parsed_page.get("structured_data") or {}).get("types", []),
+            "generated_types": [],
+            "missing_on_page": [],
+            "only_on_page": [],
+            "invalid_jsonld": 0,
+        },
+        "structural_issues": structural,
         "score_pack": score_pack,
         "issues_pack": issues_pack,
-        "test_report": test_report,
-        "page_meta": page_meta,
+        "test_report": {"passed_checks": 0, "total_checks": 0, "checks": []},
+        "page_meta": {
+            "url": parsed_page.get("url"),
+            "title": parsed_page.get("title"),
+            "degraded": degraded,
+        },
         "legacy_basic": _extract_legacy_basic(parsed_page),
         "legacy_links": _legacy_links(parsed_page),
         "legacy_summary": _legacy_summary_from_breakdown(score_pack, issues_pack),
+        "degraded": degraded,
     }
 
 
+def project_artifacts(artifacts, fields=None):
+    if not fields:
+        return artifacts
+    projected = {key: artifacts[key] for key in fields}
+    projected["degraded"] = artifacts["degraded"]
+    return projected
+
+
+# Per-page files that keep their historical, page-independent names.
+LEGACY_FILENAMES = ("summary.json", "headings.json", "meta.json", "links.json")
+
+
 def to_download_files(page_url: str, artifacts: dict):
     base = safe_filename(page_url)
     files = [
@@ -150,36 +476,47 @@ def to_download_files(page_url: str, artifacts: dict):
     return files
 
 
-def build_internal_link_graph(parsed_pages):
-    edges = defaultdict(lambda: {"from": "", "to": "", "anchors": set(), "count": 0})
+class InternalLinkGraph:
+    # Incremental form of build_internal_link_graph so crawler mode does not
+    # need to keep every parsed page around.
+    def __init__(self):
+        self.edges = defaultdict(lambda: {"from": "", "to": "", "anchors": set(), "count": 0})
 
-    for page in parsed_pages:
+    def add_page(self, page):
         source = page.get("url")
         for link in page.get("internal_links", []):
             target = link.get("url")
             if not source or not target:
                 continue
             key = (source, target)
-            edge = edges[key]
+            edge = self.edges[key]
             edge["from"] = source
             edge["to"] = target
             if link.get("anchor"):
                 edge["anchors"].add(link.get("anchor"))
             edge["count"] += 1
 
-    output = []
-    for edge in edges.values():
-        output.append(
-            {
-                "from": edge["from"],
-                "to": edge["to"],
-                "anchorTexts": sorted(list(edge["anchors"]))[:10],
-                "count": edge["count"],
-            }
-        )
+    def to_list(self):
+        output = []
+        for edge in self.edges.values():
+            output.append(
+                {
+                    "from": edge["from"],
+                    "to": edge["to"],
+                    "anchorTexts": sorted(list(edge["anchors"]))[:10],
+                    "count": edge["count"],
+                }
+            )
+
+        output.sort(key=lambda item: (-item["count"], item["from"], item["to"]))
+        return output
 
-    output.sort(key=lambda item: (-item["count"], item["from"], item["to"]))
-    return output
+
+def build_internal_link_graph(parsed_pages):
+    graph = InternalLinkGraph()
+    for page in parsed_pages:
+        graph.add_page(page)
+    return graph.to_list()
 
 
 def build_summary_text(parsed_page, score_pack):
@@ -1,31 +1,98 @@
+import functools
 import json
 import os
+import time
 
 from dotenv import load_dotenv
 import requests
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 
+from admission import Overloaded, default_admission
 from aeo_pipeline import (
-    build_internal_link_graph,
-    build_page_artifacts,
+    RESCORE_ARTIFACTS,
+    build_page_artifacts_within_budget,
     build_summary_text,
+    parse_fields,
+    rescore_artifacts,
     to_download_files,
 )
+from artifact_store import default_artifact_store
+from boilerplate_engine import load_boilerplate_cache
+from budget_engine import PAGE_MAX_BYTES, RequestBudget, request_budget_from_body
+from html_bundle import bundle_pages, decode_html, open_maybe_gzip
 from browser_fetch import is_unusable_page, fetch_html_with_playwright, playwright_enabled
-from crawler_async import crawl_site
-from entity_engine import aggregate_sitewide_entities
-from parser_engine import parse_page
+from content_model import check_content_edits, edit_content_pack
+from crawl_analysis import parse_key, parse_page_memo
+from fact_matrix import conditions_from_args
+from gazetteer import parse_dictionaries
+from job_manager import JobManager
+from page_cache import default_page_cache
+from response_cache import ResponseCache, cache_key
+from response_writer import (
+    RESPONSE_ENCODINGS,
+    coalesce,
+    compact_document,
+    compress_bytes,
+    compress_chunks,
+    dumps_json,
+    stream_compact_response,
+    stream_crawler_response,
+    stream_zip,
+    zip_entries,
+)
+from results_store import process_memory
+from site_analysis import (
+    BatchAnalysis,
+    BundleAnalysis,
+    SiteAnalysis,
+    analysis_details,
+    batch_options_from_body,
+    batch_urls_from_body,
+    crawl_options_from_body,
+    site_files,
+)
+
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
 
 
 load_dotenv()
 
 DEFAULT_REQUEST_TIMEOUT = int(os.getenv("ENGINE_REQUEST_TIMEOUT", "180"))
+# JSON/NDJSON responses at least this large are gzip/zstd encoded when the
+# client accepts it; 0 disables response compression.
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson")
+
+
+def _read_limited(resp, max_bytes: int):
+    if not max_bytes:
+        return resp.text
+    chunks = []
+    size = 0
+    # Read one byte past the budget so parse_page can flag the truncation.
+    for chunk in resp.iter_content(chunk_size=65536):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_bytes:
+            break
+    resp.close()
+    raw = b"".join(chunks)[: max_bytes + 1]
+    try:
+        return raw.decode(resp.encoding or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
 
 
 def fetch_html(
     target_url: str,
     timeout: int = DEFAULT_REQUEST_TIMEOUT,
     allow_unusable: bool = False,
+    max_bytes: int = PAGE_MAX_BYTES,
 ):
     headers = {
         "User-Agent": (
@@ -34,7 +101,7 @@ def fetch_html(
         )
     }
     try:
-        resp = requests.get(target_url, headers=headers, timeout=timeout, allow_redirects=True)
+        resp = requests.get(target_url, headers=headers, timeout=timeout, allow_redirects=True, stream=True)
         status = resp.status_code
         ctype = resp.headers.get("Content-Type", "").lower()
         is_html = ("text/html" in ctype) or ("application/xhtml+xml" in ctype) or (ctype.strip() == "")
@@ -47,6 +114,8 @@ def fetch_html(
                 )
             raise ValueError(f"Unsupported content type: {ctype}")
 
+        body = _read_limited(resp, max_bytes)
+
         # Treat common anti-bot / maintenance HTTP statuses as "unusable" (do not hard fail).
         if status >= 400:
             if status in (403, 429, 503) and playwright_enabled():
@@ -57,12 +126,12 @@ def fetch_html(
                     return html, final_url, True
                 raise ValueError("Conteudo bloqueado por anti-bot ou pagina de manutencao")
             if allow_unusable:
-                return resp.text, resp.url, True
+                return body, resp.url, True
             if status in (403, 429, 503):
                 raise ValueError("Conteudo bloqueado por anti-bot ou pagina de manutencao")
             resp.raise_for_status()
 
-        if is_unusable_page(resp.text):
+        if is_unusable_page(body):
             if playwright_enabled():
                 html, final_url = fetch_html_with_playwright(target_url, timeout=timeout)
                 if is_unusable_page(html):
@@ -71,9 +140,9 @@ def fetch_html(
                     raise ValueError("Conteudo bloqueado por anti-bot ou pagina de manutencao")
                 return html, final_url, False
             if allow_unusable:
-                return resp.text, resp.url, True
+                return body, resp.url, True
             raise ValueError("Conteudo bloqueado por anti-bot ou pagina de manutencao")
-        return resp.text, resp.url, False
+        return body, resp.url, False
     except requests.exceptions.HTTPError as e:
         status = e.response.status_code if e.response is not None else None
         if status in (403, 429, 503) and playwright_enabled():
@@ -86,100 +155,394 @@ def fetch_html(
         raise
 
 
-def _analysis_details(parsed_page, artifacts):
-    return {
-        "intent": artifacts["intent"],
-        "primaryQuestion": artifacts["primary_question"],
-        "secondaryQuestions": artifacts["secondary_questions"],
-        "topEntities": artifacts["entities"][:10],
-        "scoreBreakdown": artifacts["score_pack"]["breakdown"],
-        "issuesByCategory": artifacts["issues_pack"],
-        "testReport": artifacts["test_report"],
-        "url": parsed_page.get("url"),
-    }
-
-
 def build_single_page_response(
     url: str,
     warning: str | None = None,
     mode: str = "single",
     allow_unusable: bool = False,
+    budget: RequestBudget | None = None,
+    fields=None,
+    strip_template: bool = False,
+    dictionaries=(),
 ):
-    html, final_url, unusable = fetch_html(url, allow_unusable=allow_unusable)
+    budget = budget or RequestBudget()
+    html, final_url, unusable = fetch_html(url, allow_unusable=allow_unusable, max_bytes=budget.page_max_bytes)
     if unusable and not warning:
         warning = (
             "Site protegido por anti-bot ou em manutencao. "
             "Nao foi possivel realizar analise completa; exibindo somente resumo."
         )
-    parsed_page = parse_page(html, final_url)
-    artifacts = build_page_artifacts(parsed_page)
+    return build_html_response(
+        html,
+        final_url,
+        warning=warning,
+        mode=mode,
+        budget=budget,
+        fields=fields,
+        strip_template=strip_template,
+        dictionaries=dictionaries,
+    )
+
+
+def build_html_response(
+    html: str,
+    final_url: str,
+    warning: str | None = None,
+    mode: str = "single",
+    budget: RequestBudget | None = None,
+    fields=None,
+    strip_template: bool = False,
+    dictionaries=(),
+):
+    budget = budget or RequestBudget()
+    # Template blocks learned from earlier crawls of the host are only
+    # stripped on request (`stripTemplateBlocks`): otherwise one URL would
+    # analyze differently depending on what was crawled before.
+    boilerplate = load_boilerplate_cache(final_url) if strip_template else None
+    template_blocks = boilerplate.template_fingerprints() if boilerplate else None
+    page_budget = budget.page_budget()
+    memo = default_artifact_store()
+    parsed_page, page_key = parse_page_memo(html, final_url, template_blocks, page_budget, memo)
+    artifacts = build_page_artifacts_within_budget(
+        parsed_page, budget=page_budget, fields=fields, memo=memo, page_key=page_key, dictionaries=dictionaries
+    )
+    page_ref = page_key or parse_key(html, final_url, template_blocks, page_budget)
+    page_cache.remember(page_ref, parsed_page, artifacts, dictionaries)
+    if fields:
+        # Projection: only the requested artifacts, no files or markdown.
+        response = {
+            "analyzedUrl": final_url,
+            "mode": mode,
+            "fields": list(fields),
+            "artifacts": {key: artifacts[key] for key in fields},
+            "degraded": artifacts["degraded"],
+            "pageRef": page_ref,
+        }
+        if warning:
+            response["warning"] = warning
+        return response
     files = to_download_files(final_url, artifacts)
     response = {
         "analyzedUrl": final_url,
         "summary": build_summary_text(parsed_page, artifacts["score_pack"]),
         "optimizedContent": artifacts["content_pack"]["markdown"],
         "files": files,
-        "analysisDetails": _analysis_details(parsed_page, artifacts),
+        "analysisDetails": analysis_details(parsed_page, artifacts),
         "mode": mode,
+        "pageRef": page_ref,
     }
     if warning:
         response["warning"] = warning
     return response
 
 
+class FastJSONProvider(DefaultJSONProvider):
+    # jsonify/get_json through orjson when installed; keys stay sorted like
+    # Flask's default output.
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode(
+            "utf-8"
+        )
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+admission = default_admission()
+response_cache = ResponseCache()
+page_cache = default_page_cache()
+# Set on the internal request that refreshes a stale cache entry.
+CACHE_REFRESH_ENVIRON = "engine.cache_refresh"
+jobs = JobManager()
+JOB_RESULTS_MAX_LIMIT = 100
+JOB_FACTS_MAX_LIMIT = 1000
+FACT_QUERY_ARGS = ("offset", "limit", "columns", "stats", "format")
+
+
+def _request_fields(body=None):
+    # `fields` from the JSON body or the query string, e.g. fields=score,entities.
+    value = (body or {}).get("fields") or request.args.get("fields")
+    return parse_fields(value)
+
+
+def _request_dictionaries(body=None):
+    # Client or vertical entity dictionaries, e.g. dictionary=automotivo,cliente_a.
+    value = (body or {}).get("dictionary") or request.args.get("dictionary")
+    return parse_dictionaries(value)
+
+
+def admitted(lane):
+    # `lane` is a lane name or a function of the request returning one. The
+    # slot is held until the response, including a streamed body, is closed.
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            release = admission.acquire(lane(request) if callable(lane) else lane)
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except BaseException:
+                release()
+                raise
+            response.call_on_close(release)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cached(view):
+    # Response cache in front of admission control: hits never take a lane
+    # slot. `"cache": false` or `Cache-Control: no-cache` skips the lookup
+    # but still stores the new response.
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        body = request.get_json(silent=True)
+        if not response_cache.enabled or not isinstance(body, dict) or _wants_stream(body):
+            return view(*args, **kwargs)
+        if _strips_template(body):
+            # Depends on the host's boilerplate cache, which is not in the key.
+            return view(*args, **kwargs)
+        try:
+            key = cache_key(request.path, body, _cache_options(body))
+        except ValueError:
+            # Invalid options: the view answers 400.
+            return view(*args, **kwargs)
+        bypass = (
+            request.environ.get(CACHE_REFRESH_ENVIRON)
+            or body.get("cache") is False
+            or "no-cache" in request.headers.get("Cache-Control", "")
+        )
+        if not bypass:
+            entry, status = response_cache.lookup(key)
+            if entry is not None:
+                if status == "STALE":
+                    task = functools.partial(_refresh_cached, request.path, body, request.args.to_dict())
+                    response_cache.refresh(key, task)
+                return _cached_response(entry, status)
+
+        response = app.make_response(view(*args, **kwargs))
+        response.headers["X-Cache"] = "BYPASS" if bypass else "MISS"
+        if response.status_code != 200:
+            return response
+        disposition = response.headers.get("Content-Disposition")
+        headers = {"Content-Disposition": disposition} if disposition else {}
+        if response.is_streamed:
+            response.response = response_cache.capture(key, response.response, response.mimetype, headers)
+        else:
+            response_cache.put(key, compress_bytes(response.get_data(), "gzip"), response.mimetype, headers)
+        return response
+
+    return wrapper
+
+
+def _cache_options(body):
+    # The options a view reads from the body or the query string, parsed the
+    # same way, so `?dictionary=` and `{"dictionary": ...}` key alike.
+    return {
+        "fields": _request_fields(body),
+        "dictionary": _request_dictionaries(body),
+        "compact": _output_format(body),
+        "stripTemplateBlocks": _strips_template(body),
+    }
+
+
+def _cached_response(entry, status: str):
+    if request.accept_encodings["gzip"] > 0:
+        response = Response(entry.body_gzip, mimetype=entry.mimetype, headers=entry.headers)
+        response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+    else:
+        response = Response(entry.body(), mimetype=entry.mimetype, headers=entry.headers)
+    response.headers["X-Cache"] = status
+    response.headers["Age"] = str(int(entry.age()))
+    return response
+
+
+def _refresh_cached(path: str, body: dict, args: dict):
+    # Replays the request in the background; the cached() wrapper stores the
+    # result once the body has been produced.
+    environ = {CACHE_REFRESH_ENVIRON: True}
+    with app.test_request_context(path, method="POST", json=body, query_string=args, environ_overrides=environ):
+        response = app.full_dispatch_request()
+        try:
+            for _ in response.response:
+                pass
+        finally:
+            response.close()
+
+
+def _analyze_lane(req):
+    return "crawl" if (req.get_json(silent=True) or {}).get("useCrawler") else "interactive"
+
+
+def _html_lane(req):
+    if req.mimetype == "application/json":
+        return "crawl" if isinstance((req.get_json(silent=True) or {}).get("pages"), list) else "interactive"
+    if req.mimetype in ("text/html", "application/xhtml+xml", "application/octet-stream", ""):
+        return "interactive"
+    return "crawl"
+
+
+@app.errorhandler(Overloaded)
+def overloaded(error):
+    response = jsonify({"status": "error", "message": str(error), "retryAfter": error.retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+@app.get("/health")
+def health():
+    return jsonify(
+        {"status": "ok", "lanes": admission.stats(), "cache": response_cache.stats(), "memory": process_memory.stats()}
+    )
+
+
+@app.after_request
+def compress_response(response):
+    if (
+        RESPONSE_COMPRESS_MIN_BYTES <= 0
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+        or response.status_code in (204, 304)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(RESPONSE_ENCODINGS)
+    if not encoding:
+        return response
+    if response.is_streamed:
+        flush_each = response.mimetype == "application/x-ndjson"
+        response.response = compress_chunks(response.response, encoding, flush_each=flush_each)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < RESPONSE_COMPRESS_MIN_BYTES:
+            return response
+        response.set_data(compress_bytes(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def _output_format(body=None):
+    # "compact": content-addressed blobs referenced by files and pages.
+    value = (body or {}).get("compact")
+    if value is None:
+        value = request.args.get("compact")
+    return "compact" if value in (True, 1, "1", "true") else "full"
+
+
+def _strips_template(body=None):
+    # Single-page opt-in to drop the template blocks learned by earlier crawls.
+    return bool((body or {}).get("stripTemplateBlocks")) or request.args.get("stripTemplateBlocks") in ("1", "true")
+
+
+def _wants_stream(body=None):
+    # NDJSON lines as pages complete instead of one JSON document.
+    return bool((body or {}).get("stream")) or request.args.get("stream") in ("1", "true")
+
+
+def _zip_response(chunks):
+    headers = {"Content-Disposition": 'attachment; filename="analysis.zip"'}
+    return Response(stream_with_context(chunks), mimetype="application/zip", headers=headers)
+
+
+def _document_response(document: dict, output: str = "full"):
+    if output == "zip":
+        return _zip_response(stream_zip(zip_entries(document)))
+    if output == "compact":
+        return jsonify(compact_document(document))
+    return jsonify(document)
+
+
+def _crawler_document(store, head: dict, tail: dict, extra_files, output: str = "full"):
+    # Streams the crawler-style result from the store (full JSON, compact JSON
+    # or ZIP) and closes the store when the response ends.
+    if output == "zip":
+        chunks = stream_zip(zip_entries({**head, **tail}, store, extra_files))
+    elif output == "compact":
+        chunks = stream_compact_response(store, head, tail, extra_files)
+    else:
+        chunks = stream_crawler_response(store, head, tail, extra_files)
+
+    def generate():
+        try:
+            yield from chunks
+        finally:
+            store.close()
+
+    if output == "zip":
+        return _zip_response(generate())
+    return Response(stream_with_context(coalesce(generate())), mimetype="application/json")
 
 
 @app.post("/analyze")
+@cached
+@admitted(_analyze_lane)
 def analyze():
     body = request.get_json(silent=True) or {}
+    return _analyze(body, _output_format(body))
+
+
+@app.post("/analyze/zip")
+@cached
+@admitted(_analyze_lane)
+def analyze_zip():
+    # Same body as /analyze; the result comes back as a streamed ZIP.
+    return _analyze(request.get_json(silent=True) or {}, "zip")
+
+
+def _analyze(body: dict, output: str):
     url = (body.get("url") or "").strip()
     use_crawler = bool(body.get("useCrawler"))
 
     if not url:
         return jsonify({"status": "error", "message": "Campo 'url' e obrigatorio"}), 400
+    try:
+        fields = _request_fields(body)
+        dictionaries = _request_dictionaries(body)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    budget = request_budget_from_body(body)
 
     try:
         if not use_crawler:
-            return jsonify(build_single_page_response(url, mode="single"))
-
-        max_pages = int(body.get("maxPages") or 15)
-        max_tasks = int(body.get("maxTasks") or 6)
-        delay = float(body.get("delay") or 0.4)
-        timeout = int(body.get("timeout") or DEFAULT_REQUEST_TIMEOUT)
-
-        crawled_pages = crawl_site(url, max_pages=max_pages, max_tasks=max_tasks, delay=delay, timeout=timeout)
-
-        page_results = []
-        all_files = []
-        site_entities_input = []
-        parsed_pages = []
-        analysis_details = []
-        for page in crawled_pages:
-            html = page.get("html")
-            page_url = page.get("url") or url
-            if not html:
-                continue
-            parsed_page = parse_page(html, page_url)
-            artifacts = build_page_artifacts(parsed_page)
-            parsed_pages.append(parsed_page)
-            site_entities_input.append({"url": parsed_page.get("url"), "entities": artifacts["entities"]})
-            analysis_details.append(_analysis_details(parsed_page, artifacts))
-            all_files.extend(to_download_files(parsed_page.get("url"), artifacts))
-            page_results.append(
-                {
-                    "url": parsed_page.get("url"),
-                    "title": parsed_page.get("title"),
-                    "h1": parsed_page.get("headings", {}).get("h1", []),
-                    "intent": artifacts["intent"],
-                    "primaryQuestion": artifacts["primary_question"],
-                    "score": artifacts["score_pack"]["total"],
-                    "markdown": artifacts["content_pack"]["markdown"],
-                    "schema": artifacts["schema"],
-                }
+            return _document_response(
+                build_single_page_response(
+                    url,
+                    mode="single",
+                    budget=budget,
+                    fields=fields,
+                    strip_template=_strips_template(body),
+                    dictionaries=dictionaries,
+                ),
+                output,
             )
 
-        if not page_results:
+        # Per-page payloads go to a compressed store that spills to disk past
+        # ENGINE_MEMORY_CEILING_MB; only small aggregates stay in memory.
+        analysis = SiteAnalysis(url, crawl_options_from_body(body), budget, fields=fields, dictionaries=dictionaries)
+        if output == "full" and _wants_stream(body):
+            return _analysis_response(analysis, {"analyzedUrl": url, "mode": "crawler"}, True)
+        store = analysis.store
+        try:
+            for _ in analysis.run():
+                pass
+            summary = analysis.finish()
+        except BaseException:
+            store.close()
+            raise
+
+        if not summary["pagesProcessed"]:
+            store.close()
             fallback = build_single_page_response(
                 url,
                 warning=(
@@ -190,37 +553,23 @@ def analyze():
                 allow_unusable=True,
             )
             fallback["pagesProcessed"] = 0
-            return jsonify(fallback)
-
-        entities_sitewide = aggregate_sitewide_entities(site_entities_input)
-        link_graph = build_internal_link_graph(parsed_pages)
-        all_files.append(
-            {
-                "filename": "entities_sitewide.json",
-                "mimeType": "application/json",
-                "data": entities_sitewide,
-            }
-        )
-        all_files.append(
-            {
-                "filename": "internal_link_graph.json",
-                "mimeType": "application/json",
-                "data": link_graph,
-            }
-        )
+            return _document_response(fallback, output)
 
-        return jsonify(
-            {
-                "analyzedUrl": url,
-                "mode": "crawler",
-                "pagesProcessed": len(page_results),
-                "optimizedContent": "\n\n".join([p.get("markdown", "") for p in page_results]),
-                "files": all_files,
-                "pages": page_results,
-                "analysisDetails": analysis_details[0] if analysis_details else {},
-                "entitiesSitewide": entities_sitewide[:20],
-            }
-        )
+        head = {
+            "analyzedUrl": url,
+            "mode": "crawler",
+            "pagesProcessed": summary["pagesProcessed"],
+            "pagesFailed": summary["pagesFailed"],
+            "pagesDegraded": summary["pagesDegraded"],
+        }
+        tail = {
+            "analysisDetails": summary["analysisDetails"],
+            "entitiesSitewide": summary["entitiesSitewide"][:20],
+            "templates": summary["templates"],
+        }
+        return _crawler_document(store, head, tail, site_files(summary), output)
+    except Overloaded:
+        raise
     except requests.exceptions.RequestException as e:
         return jsonify({"status": "error", "message": f"Falha ao buscar URL: {str(e)}"}), 502
     except ValueError as e:
@@ -229,7 +578,7 @@ def analyze():
         if "anti-bot" in lowered or "manutencao" in lowered or "manuten" in lowered or "bloque" in lowered:
             # Never hard-fail on blocked pages: return a minimal, non-breaking summary with a warning.
             try:
-                return jsonify(
+                return _document_response(
                     build_single_page_response(
                         url,
                         warning=(
@@ -238,7 +587,8 @@ def analyze():
                         ),
                         mode="single_fallback_summary",
                         allow_unusable=True,
-                    )
+                    ),
+                    output,
                 )
             except Exception:
                 return jsonify({"status": "error", "message": message}), 502
@@ -247,6 +597,335 @@ def analyze():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+def _summary_fields(summary):
+    return {
+        "pagesProcessed": summary["pagesProcessed"],
+        "pagesFailed": summary["pagesFailed"],
+        "pagesDegraded": summary["pagesDegraded"],
+    }
+
+
+def _summary_tail(summary):
+    tail = {}
+    if "aggregates" in summary:
+        tail["aggregates"] = summary["aggregates"]
+    tail["analysisDetails"] = summary["analysisDetails"]
+    tail["entitiesSitewide"] = summary["entitiesSitewide"][:20]
+    tail["templates"] = summary["templates"]
+    return tail
+
+
+def _analysis_response(analysis, head: dict, stream: bool, output: str = "full"):
+    # Runs a SiteAnalysis subclass and returns either NDJSON lines as pages
+    # complete or the crawler-style JSON document streamed from the store.
+    store = analysis.store
+    if stream:
+        def generate_lines():
+            try:
+                for index, record in analysis.run():
+                    yield dumps_json({"type": "page", "index": index, "page": record["page"]}) + "\n"
+                summary = analysis.finish()
+                done = {"type": "done", **_summary_fields(summary), **_summary_tail(summary)}
+                done.pop("analysisDetails")
+                if not summary["pagesProcessed"]:
+                    done["warning"] = (
+                        "Site protegido por anti-bot ou em manutencao. "
+                        "Nenhuma pagina foi analisada com crawler."
+                    )
+                yield dumps_json(done) + "\n"
+            except ValueError as e:
+                yield dumps_json({"type": "error", "message": str(e)}) + "\n"
+            finally:
+                store.close()
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return Response(stream_with_context(generate_lines()), mimetype="application/x-ndjson", headers=headers)
+
+    try:
+        for _ in analysis.run():
+            pass
+        summary = analysis.finish()
+    except ValueError as e:
+        store.close()
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        store.close()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+    head = {**head, **_summary_fields(summary)}
+    return _crawler_document(store, head, _summary_tail(summary), site_files(summary), output)
+
+
+@app.post("/analyze/batch")
+@cached
+@admitted("crawl")
+def analyze_batch():
+    body = request.get_json(silent=True) or {}
+    try:
+        urls = batch_urls_from_body(body)
+        fields = _request_fields(body)
+        dictionaries = _request_dictionaries(body)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    budget = request_budget_from_body(body)
+    analysis = BatchAnalysis(urls, batch_options_from_body(body), budget, fields=fields, dictionaries=dictionaries)
+    head = {"mode": "batch", "urlsRequested": len(urls)}
+    return _analysis_response(analysis, head, _wants_stream(body), _output_format(body))
+
+
+@app.post("/analyze/html")
+@admitted(_html_lane)
+def analyze_html():
+    # Pre-fetched HTML, no network access: a single page (JSON {url, html} or
+    # a raw/gzipped text/html body with ?url=) or a bundle of pages (JSON
+    # {pages: [...]}, tar/tar.gz of .html or .jsonl members, or JSONL).
+    content_type = (request.mimetype or "").lower()
+    stream = request.args.get("stream") in ("1", "true")
+    base_url = (request.args.get("baseUrl") or "").strip() or None
+
+    body = (request.get_json(silent=True) or {}) if content_type == "application/json" else {}
+    output = _output_format(body)
+    try:
+        fields = _request_fields(body)
+        dictionaries = _request_dictionaries(body)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    if content_type == "application/json":
+        budget = request_budget_from_body(body)
+        if isinstance(body.get("pages"), list):
+            pages = [page for page in body["pages"] if isinstance(page, dict) and page.get("html")]
+            if not pages:
+                return jsonify({"status": "error", "message": "Campo 'pages' sem paginas com 'html'"}), 400
+            default_url = base_url or (pages[0].get("url") or "")
+            analysis = BundleAnalysis(iter(pages), default_url, budget, fields=fields, dictionaries=dictionaries)
+            return _analysis_response(analysis, {"analyzedUrl": default_url, "mode": "html_bundle"}, stream, output)
+        url = (body.get("url") or "").strip()
+        html = body.get("html")
+        if not url or not isinstance(html, str) or not html:
+            return jsonify({"status": "error", "message": "Campos 'url' e 'html' sao obrigatorios"}), 400
+        response = build_html_response(
+            html,
+            url,
+            mode="html",
+            budget=budget,
+            fields=fields,
+            strip_template=_strips_template(body),
+            dictionaries=dictionaries,
+        )
+        return _document_response(response, output)
+
+    budget = request_budget_from_body(request.args)
+    if content_type in ("text/html", "application/xhtml+xml", "application/octet-stream", ""):
+        url = (request.args.get("url") or "").strip()
+        if not url:
+            return jsonify({"status": "error", "message": "Parametro 'url' e obrigatorio"}), 400
+        raw = open_maybe_gzip(request.stream).read(budget.page_max_bytes + 1)
+        html = decode_html(raw, request.mimetype_params.get("charset"))
+        response = build_html_response(
+            html,
+            url,
+            mode="html",
+            budget=budget,
+            fields=fields,
+            strip_template=_strips_template(),
+            dictionaries=dictionaries,
+        )
+        return _document_response(response, output)
+
+    try:
+        pages = bundle_pages(request.stream, content_type, base_url=base_url)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 415
+    analysis = BundleAnalysis(pages, base_url or "", budget, fields=fields, dictionaries=dictionaries)
+    head = {"analyzedUrl": base_url or "", "mode": "html_bundle"}
+    return _analysis_response(analysis, head, stream, output)
+
+
+@app.post("/rescore")
+@admitted("interactive")
+def rescore():
+    # Edited content_pack (markdown, faq, ...) over a page analyzed before:
+    # only the stages downstream of content_pack run again, from the cached
+    # parsed page; no fetch and no parse.
+    started = time.perf_counter()
+    body = request.get_json(silent=True) or {}
+    page_ref = (body.get("pageRef") or "").strip() if isinstance(body.get("pageRef"), str) else ""
+    edits = body.get("contentPack")
+    if not page_ref or not isinstance(edits, dict):
+        return jsonify({"status": "error", "message": "Campos 'pageRef' e 'contentPack' sao obrigatorios"}), 400
+    try:
+        fields = _request_fields(body) or RESCORE_ARTIFACTS
+        dictionaries = _request_dictionaries(body)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    try:
+        edits = check_content_edits(edits)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"contentPack invalido: {e}"}), 400
+    entry = page_cache.recall(page_ref, dictionaries)
+    if entry is None:
+        message = "pageRef nao encontrado ou expirado; analise a pagina novamente"
+        return jsonify({"status": "error", "message": message}), 404
+    content_pack = edit_content_pack(entry.content_pack or {}, edits)
+    artifacts = rescore_artifacts(
+        entry.parsed_page, content_pack, entry.inputs, targets=fields, dictionaries=entry.dictionaries
+    )
+    return jsonify(
+        {
+            "pageRef": page_ref,
+            "fields": list(fields),
+            "artifacts": artifacts,
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+        }
+    )
+
+
+def _int_arg(name: str, default: int):
+    try:
+        return int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _job_or_404(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return None, (jsonify({"status": "error", "message": "Job nao encontrado"}), 404)
+    return job, None
+
+
+def _job_links(job):
+    return {
+        "status": f"/jobs/{job.id}",
+        "stream": f"/jobs/{job.id}/stream",
+        "results": f"/jobs/{job.id}/results",
+        "facts": f"/jobs/{job.id}/facts",
+    }
+
+
+@app.post("/jobs")
+def submit_job():
+    body = request.get_json(silent=True) or {}
+    url = (body.get("url") or "").strip()
+    try:
+        if "urls" in body:
+            batch_urls_from_body(body)
+        parse_fields(body.get("fields"))
+        parse_dictionaries(body.get("dictionary"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if "urls" not in body and not url:
+        return jsonify({"status": "error", "message": "Campo 'url' e obrigatorio"}), 400
+
+    job = jobs.submit(url, body)
+    payload = job.status_payload()
+    payload["links"] = _job_links(job)
+    return jsonify(payload), 202
+
+
+@app.get("/jobs/<job_id>")
+def job_status(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    payload = job.status_payload()
+    payload["links"] = _job_links(job)
+    return jsonify(payload)
+
+
+@app.delete("/jobs/<job_id>")
+def cancel_job(job_id):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job nao encontrado"}), 404
+    return jsonify(job.status_payload())
+
+
+@app.get("/jobs/<job_id>/results")
+def job_results(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    offset = _int_arg("offset", 0)
+    limit = max(1, min(_int_arg("limit", 20), JOB_RESULTS_MAX_LIMIT))
+    include_files = request.args.get("include") == "files"
+    payload = job.results_page(offset, limit, include_files=include_files)
+    if include_files and job.finished and job.summary is not None:
+        payload["siteFiles"] = site_files(job.summary)
+    return jsonify(payload)
+
+
+def _list_arg(name: str):
+    return [value.strip() for value in request.args.get(name, "").split(",") if value.strip()]
+
+
+@app.get("/jobs/<job_id>/facts")
+def job_facts(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    if not job.finished:
+        return jsonify({"status": "error", "message": "Job ainda em execucao"}), 409
+    matrix = (job.summary or {}).get("factMatrix")
+    if matrix is None:
+        return jsonify({"status": "error", "message": "Matriz de fatos indisponivel para este job"}), 404
+    try:
+        conditions = conditions_from_args(request.args, reserved=FACT_QUERY_ARGS)
+        if request.args.get("format") == "csv":
+            csv_text = matrix.to_csv(matrix.where(conditions), _list_arg("columns"))
+            headers = {"Content-Disposition": f"attachment; filename=fact_matrix_{job.id}.csv"}
+            return Response(csv_text, mimetype="text/csv", headers=headers)
+        payload = matrix.query(
+            conditions,
+            offset=_int_arg("offset", 0),
+            limit=max(1, min(_int_arg("limit", 100), JOB_FACTS_MAX_LIMIT)),
+            columns=_list_arg("columns"),
+            stats=_list_arg("stats"),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"jobId": job.id, "status": job.status, **payload})
+
+
+@app.get("/jobs/<job_id>/stream")
+@admitted("stream")
+def job_stream(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+
+    use_sse = request.args.get("format") == "sse" or "text/event-stream" in request.headers.get("Accept", "")
+    after = _int_arg("after", -1)
+    if use_sse and request.headers.get("Last-Event-ID"):
+        try:
+            after = int(request.headers["Last-Event-ID"])
+        except ValueError:
+            pass
+
+    def ndjson():
+        for kind, index, data in job.events(after):
+            message = {"type": kind, "index": index, "page": data} if kind == "page" else {"type": kind, "job": data}
+            yield dumps_json(message) + "\n"
+
+    def sse():
+        # The browser EventSource resends the last id, so a reconnect resumes
+        # after the last page it received.
+        yield "retry: 1000\n\n"
+        for kind, index, data in job.events(after):
+            if kind == "heartbeat":
+                yield ": heartbeat\n\n"
+                continue
+            event_id = f"id: {index}\n" if index is not None else ""
+            yield f"{event_id}event: {kind}\ndata: {dumps_json(data)}\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if use_sse:
+        return Response(stream_with_context(sse()), mimetype="text/event-stream", headers=headers)
+    return Response(stream_with_context(ndjson()), mimetype="application/x-ndjson", headers=headers)
+
+
 if __name__ == "__main__":
     port = int(os.getenv("ENGINE_PORT", "5000"))
     app.run(host="0.0.0.0", port=port)
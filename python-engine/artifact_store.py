@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import zlib
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+
+ENGINE_ARTIFACT_STORE = os.getenv("ENGINE_ARTIFACT_STORE", "").strip()
+COMPRESSION_LEVEL = 1
+
+
+def _dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def digest(*parts) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else _dumps(part))
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+_module_versions = {}
+
+
+def module_version(*module_names) -> str:
+    # Code version of a stage: hash of the source of the modules it runs.
+    # Editing a rule in intent_engine.py changes the intent stage keys (and
+    # everything downstream) while other stages stay cached.
+    parts = []
+    for name in module_names:
+        if name not in _module_versions:
+            module = sys.modules.get(name)
+            path = getattr(module, "__file__", None)
+            try:
+                with open(path, "rb") as handle:
+                    _module_versions[name] = digest(handle.read())
+            except (OSError, TypeError):
+                _module_versions[name] = name
+        parts.append(_module_versions[name])
+    return digest(*parts)
+
+
+class ArtifactStore:
+    # Content-addressed local store: one zlib-compressed JSON file per memo
+    # key, sharded by the first two hex digits. Writes are atomic so several
+    # worker processes can share the directory.
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key: str):
+        return os.path.join(self.path, key[:2], f"{key}.json.z")
+
+    def get(self, key: str):
+        # Returns (found, value); stored values may legitimately be None.
+        try:
+            with open(self._file(key), "rb") as handle:
+                record = _loads(zlib.decompress(handle.read()))
+        except (OSError, ValueError, zlib.error):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, record["value"]
+
+    def put(self, key: str, value):
+        try:
+            payload = zlib.compress(_dumps({"value": value}), COMPRESSION_LEVEL)
+        except TypeError:
+            return
+        path = self._file(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def default_artifact_store():
+    if not ENGINE_ARTIFACT_STORE:
+        return None
+    return ArtifactStore(ENGINE_ARTIFACT_STORE)
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawl_analysis import CrawlAnalysisStream
+from worker_pool import configure_workers, reset_process_pool, worker_count
+
+
+def synthetic_page(index: int):
+    paragraphs = "".join(
+        f"<p>O Peugeot 208 versao {index}-{block} tem consumo de 13 km/l, garantia de 3 anos e preco de "
+        f"R$ {90 + block}.990,00 em Sao Paulo. Financiamento pela Stellantis com taxa especial.</p>"
+        for block in range(60)
+    )
+    rows = "".join(f"<tr><th>Versao {row}</th><td>Motor 1.0 turbo</td></tr>" for row in range(30))
+    return {
+        "url": f"https://example.com/modelos/208-{index}",
+        "html": (
+            f"<html><head><title>Peugeot 208 {index}</title></head><body><main><h1>Peugeot 208 {index}</h1>"
+            f"<h2>Versoes</h2>{paragraphs}<table>{rows}</table>"
+            f"<ul>{''.join(f'<li><a href=/p/{n}>Link {n}</a></li>' for n in range(40))}</ul></main></body></html>"
+        ),
+    }
+
+
+def analyze(pages, parallel: bool = True):
+    # The streaming path crawler-mode requests and jobs run.
+    for _ in CrawlAnalysisStream(iter(pages), "https://example.com", parallel=parallel):
+        pass
+
+
+def run(page_counts, workers):
+    print(f"workers={workers} cpu_count={os.cpu_count()}")
+    print(f"{'pages':>6} {'serial_s':>9} {'parallel_s':>11} {'speedup':>8} {'pages/s':>8}")
+    for count in page_counts:
+        pages = [synthetic_page(index) for index in range(count)]
+
+        started = time.perf_counter()
+        analyze(pages, parallel=False)
+        serial = time.perf_counter() - started
+
+        configure_workers(workers)
+        analyze(pages[: min(count, workers)])  # warm the pool
+        started = time.perf_counter()
+        analyze(pages)
+        parallel = time.perf_counter() - started
+
+        print(f"{count:>6} {serial:>9.2f} {parallel:>11.2f} {serial / parallel:>8.2f} {count / parallel:>8.1f}")
+    reset_process_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serial vs process-pool artifact building")
+    parser.add_argument("--pages", default="10,50,100", help="comma separated page counts")
+    parser.add_argument("--workers", type=int, default=worker_count())
+    args = parser.parse_args()
+    run([int(value) for value in args.pages.split(",")], args.workers)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: concurrent saves there are last-writer-wins
+    fcntl = None
+
+
+BOILERPLATE_CACHE_ENABLED = os.getenv("BOILERPLATE_CACHE", "1").strip().lower() not in ("0", "false", "no")
+BOILERPLATE_CACHE_DIR = os.getenv(
+    "BOILERPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "seokiller-boilerplate")
+)
+BOILERPLATE_MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))
+BOILERPLATE_MIN_RATIO = float(os.getenv("BOILERPLATE_MIN_RATIO", "0.5"))
+# Counts from earlier crawls are multiplied by BOILERPLATE_DECAY on every
+# load/save and capped at BOILERPLATE_MAX_PAGES pages, so blocks a site has
+# dropped stop being template after a few crawls.
+BOILERPLATE_DECAY = float(os.getenv("BOILERPLATE_DECAY", "0.5"))
+BOILERPLATE_MAX_PAGES = int(os.getenv("BOILERPLATE_MAX_PAGES", "500"))
+MAX_FINGERPRINTS = 5000
+
+# Only containers are fingerprinted: link lists (menus) anywhere and blocks
+# outside <main>/<article> (div footers, cookie banners). Headings,
+# paragraphs and tables of the main content are kept even when every page
+# repeats them ("Ficha tecnica", FAQ headings, price disclaimers).
+FINGERPRINT_TAGS = ("div", "section", "header", "ul", "ol", "form")
+CONTENT_TAGS = ("main", "article")
+MIN_LINK_RATIO = 0.6
+MIN_BLOCK_CHARS = 8
+MAX_BLOCK_CHARS = 20000
+
+
+def _normalize_block(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def block_fingerprint(text: str):
+    normalized = _normalize_block(text)
+    if not (MIN_BLOCK_CHARS <= len(normalized) <= MAX_BLOCK_CHARS):
+        return None
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _link_ratio(node, text: str) -> float:
+    if not text:
+        return 0.0
+    return sum(len(anchor.get_text(" ", strip=True)) for anchor in node.find_all("a")) / len(text)
+
+
+def template_candidates(soup):
+    # Yields (node, text) for the blocks that may be sitewide template.
+    content = soup.find_all(CONTENT_TAGS)
+    content_ids = {id(node) for node in content}
+    # Wrappers around the main content hold page content too.
+    wrappers = {id(parent) for node in content for parent in node.parents}
+    for node in soup.find_all(FINGERPRINT_TAGS):
+        if node.decomposed or id(node) in wrappers:
+            continue
+        text = node.get_text(" ", strip=True)
+        outside = content and not any(id(parent) in content_ids for parent in node.parents)
+        if outside or _link_ratio(node, text) >= MIN_LINK_RATIO:
+            yield node, text
+
+
+def block_fingerprints(soup):
+    fingerprints = set()
+    for _, text in template_candidates(soup):
+        fingerprint = block_fingerprint(text)
+        if fingerprint:
+            fingerprints.add(fingerprint)
+    return fingerprints
+
+
+def strip_template_blocks(soup, template_fingerprints):
+    removed = 0
+    for node, text in template_candidates(soup):
+        fingerprint = block_fingerprint(text)
+        if fingerprint and fingerprint in template_fingerprints:
+            node.decompose()
+            removed += 1
+    return removed
+
+
+def _host_key(url_or_host: str) -> str:
+    host = urlparse(url_or_host).netloc if "://" in url_or_host else url_or_host
+    host = host.lower().split("@")[-1]
+    if host.startswith("www."):
+        host = host[4:]
+    return re.sub(r"[^a-z0-9\-_.]", "_", host) or "default"
+
+
+def _decayed(pages_seen, counts, decay: float, max_pages: int):
+    factor = decay
+    if pages_seen * factor > max_pages:
+        factor = max_pages / pages_seen
+    counts = {key: round(value * factor, 2) for key, value in counts.items()}
+    return pages_seen * factor, {key: value for key, value in counts.items() if value >= 1}
+
+
+class BoilerplateCache:
+    def __init__(
+        self,
+        host: str,
+        cache_dir: str = BOILERPLATE_CACHE_DIR,
+        min_pages: int = BOILERPLATE_MIN_PAGES,
+        min_ratio: float = BOILERPLATE_MIN_RATIO,
+        decay: float = BOILERPLATE_DECAY,
+        max_pages: int = BOILERPLATE_MAX_PAGES,
+    ):
+        self.host = _host_key(host)
+        self.cache_dir = cache_dir
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.decay = decay
+        self.max_pages = max_pages
+        # Decayed history plus this crawl; this crawl's own counts are kept
+        # apart so save() can merge them into whatever is on disk by then.
+        self.pages_seen = 0
+        self.counts = {}
+        self._crawl_pages = 0
+        self._crawl_counts = {}
+        # The streaming crawl observes pages on its own thread while analysis
+        # reads the template set.
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.cache_dir, f"{self.host}.json")
+
+    def observe(self, fingerprints):
+        with self._lock:
+            self.pages_seen += 1
+            self._crawl_pages += 1
+            for fingerprint in set(fingerprints):
+                self.counts[fingerprint] = self.counts.get(fingerprint, 0) + 1
+                self._crawl_counts[fingerprint] = self._crawl_counts.get(fingerprint, 0) + 1
+
+    def template_fingerprints(self):
+        with self._lock:
+            threshold = max(self.min_pages, math.ceil(self.min_ratio * self.pages_seen))
+            return frozenset(fingerprint for fingerprint, count in self.counts.items() if count >= threshold)
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return 0, {}
+        counts = {key: float(value) for key, value in (data.get("counts") or {}).items()}
+        return _decayed(float(data.get("pages_seen") or 0), counts, self.decay, self.max_pages)
+
+    def load(self):
+        pages_seen, counts = self._read()
+        with self._lock:
+            self.pages_seen = pages_seen + self._crawl_pages
+            self.counts = counts
+            for fingerprint, count in self._crawl_counts.items():
+                self.counts[fingerprint] = self.counts.get(fingerprint, 0) + count
+        return self
+
+    def save(self):
+        # Merges this crawl into the file as it is now (other processes may
+        # have saved since load()), under a lock file where available. Only
+        # the most frequent fingerprints are kept; one-off blocks are page
+        # content.
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.path + ".lock", "w") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self.load()
+                with self._lock:
+                    ranked = sorted(self.counts.items(), key=lambda item: -item[1])[:MAX_FINGERPRINTS]
+                    payload = {"host": self.host, "pages_seen": self.pages_seen, "counts": dict(ranked)}
+                    self._crawl_pages = 0
+                    self._crawl_counts = {}
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                    json.dump(payload, handle)
+                os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def load_boilerplate_cache(url: str):
+    if not BOILERPLATE_CACHE_ENABLED:
+        return None
+    return BoilerplateCache(url).load()
@@ -1,5 +1,14 @@
 import os
+import threading
 
+from admission import Overloaded
+
+
+# Chromium instances are heavy: at most this many run at once in a process,
+# whatever mix of single-page requests and crawls asks for them.
+PLAYWRIGHT_MAX_CONCURRENT = int(os.getenv("PLAYWRIGHT_MAX_CONCURRENT", "2"))
+PLAYWRIGHT_WAIT_SECONDS = float(os.getenv("PLAYWRIGHT_WAIT_SECONDS", "30"))
+_browser_slots = threading.BoundedSemaphore(max(1, PLAYWRIGHT_MAX_CONCURRENT))
 
 DEFAULT_BROWSER_UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -47,6 +56,15 @@ def playwright_enabled() -> bool:
 
 
 def fetch_html_with_playwright(url: str, timeout: int = 120):
+    if not _browser_slots.acquire(timeout=PLAYWRIGHT_WAIT_SECONDS):
+        raise Overloaded("playwright", int(PLAYWRIGHT_WAIT_SECONDS))
+    try:
+        return _fetch_with_browser(url, timeout)
+    finally:
+        _browser_slots.release()
+
+
+def _fetch_with_browser(url: str, timeout: int):
     from playwright.sync_api import sync_playwright
 
     timeout_ms = max(1, int(timeout)) * 1000
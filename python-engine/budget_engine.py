@@ -0,0 +1,82 @@
+import os
+import time
+
+
+PAGE_MAX_BYTES = int(os.getenv("PAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+PAGE_MAX_SECONDS = float(os.getenv("PAGE_MAX_SECONDS", "15"))
+REQUEST_MAX_SECONDS = float(os.getenv("REQUEST_MAX_SECONDS", "160"))
+# Page budgets are checked between stages; a worker still busy this long
+# past PAGE_MAX_SECONDS is stuck inside one and gets killed.
+PAGE_KILL_GRACE_SECONDS = float(os.getenv("PAGE_KILL_GRACE_SECONDS", "10"))
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"Orcamento excedido em '{stage}': {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class PageBudget:
+    def __init__(self, max_seconds: float = PAGE_MAX_SECONDS, max_bytes: int = PAGE_MAX_BYTES, deadline=None):
+        self.max_bytes = max_bytes
+        page_deadline = time.monotonic() + max_seconds if max_seconds and max_seconds > 0 else None
+        if deadline is not None and (page_deadline is None or deadline < page_deadline):
+            self.deadline = deadline
+            self.limit_reason = "request_time"
+        else:
+            self.deadline = page_deadline
+            self.limit_reason = "page_time"
+
+    def check(self, stage: str):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded(stage, self.limit_reason)
+
+    def clamp_html(self, html: str):
+        # Fetchers read one byte past the budget; compare in bytes because a
+        # decoded multi-byte page has fewer characters than bytes.
+        if not self.max_bytes or not html or len(html) * 4 <= self.max_bytes:
+            return html, False
+        encoded = html.encode("utf-8", errors="ignore")
+        if len(encoded) <= self.max_bytes:
+            return html, False
+        return encoded[: self.max_bytes].decode("utf-8", errors="ignore"), True
+
+
+class RequestBudget:
+    def __init__(
+        self,
+        max_seconds: float = REQUEST_MAX_SECONDS,
+        page_max_seconds: float = PAGE_MAX_SECONDS,
+        page_max_bytes: int = PAGE_MAX_BYTES,
+    ):
+        self.deadline = time.monotonic() + max_seconds if max_seconds and max_seconds > 0 else None
+        self.page_max_seconds = page_max_seconds
+        self.page_max_bytes = page_max_bytes
+
+    def exhausted(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def page_budget(self):
+        return PageBudget(max_seconds=self.page_max_seconds, max_bytes=self.page_max_bytes, deadline=self.deadline)
+
+    def page_kill_seconds(self):
+        # Hard limit for one page in a worker process; 0 when pages are unbounded.
+        if not self.page_max_seconds or self.page_max_seconds <= 0:
+            return 0
+        return self.page_max_seconds + PAGE_KILL_GRACE_SECONDS
+
+
+def request_budget_from_body(body, max_seconds: float = REQUEST_MAX_SECONDS):
+    def _number(key, default, cast):
+        try:
+            value = body.get(key)
+            return cast(value) if value not in (None, "") else default
+        except (TypeError, ValueError):
+            return default
+
+    return RequestBudget(
+        max_seconds=_number("requestBudgetSeconds", max_seconds, float),
+        page_max_seconds=_number("pageBudgetSeconds", PAGE_MAX_SECONDS, float),
+        page_max_bytes=_number("maxPageBytes", PAGE_MAX_BYTES, int),
+    )
@@ -0,0 +1,279 @@
+import argparse
+import collections
+import gzip
+import json
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+from aeo_pipeline import parse_fields, safe_filename
+from artifact_store import ENGINE_ARTIFACT_STORE, ArtifactStore
+from budget_engine import PAGE_MAX_BYTES, PAGE_MAX_SECONDS, RequestBudget
+from crawl_analysis import CrawlAnalysisStream
+from crawler_async import BATCH_PER_HOST, fetch_urls_stream
+from gazetteer import parse_dictionaries
+from html_bundle import HTML_SUFFIXES, decode_html
+from response_writer import dumps_json
+from site_analysis import page_record
+from worker_pool import configure_workers, reset_process_pool, worker_count
+
+
+DONE_FILENAME = ".done"
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="ignore")
+    return open(path, "r", encoding="utf-8", errors="ignore")
+
+
+def _line_item(line: str, base_url: str | None):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        record = json.loads(line)
+        url = (record.get("url") or "").strip()
+        item = {"url": url, "html": record.get("html") or "", "title": record.get("title") or ""}
+    else:
+        item = {"url": line}
+    if base_url and item["url"]:
+        item["url"] = urljoin(base_url, item["url"])
+    return item
+
+
+def iter_inputs(sources, base_url: str | None = None):
+    # Directories yield their HTML files; .jsonl files and stdin yield
+    # {url, html} records or bare URLs (one per line) to be fetched.
+    for source in sources:
+        if source == "-":
+            for line in sys.stdin:
+                item = _line_item(line, base_url)
+                if item:
+                    yield item
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if not name.lower().removesuffix(".gz").endswith(HTML_SUFFIXES):
+                        continue
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, source).replace(os.sep, "/").removesuffix(".gz")
+                    opener = gzip.open if name.endswith(".gz") else open
+                    with opener(path, "rb") as handle:
+                        html = decode_html(handle.read())
+                    url = base_url.rstrip("/") + "/" + relative if base_url else relative
+                    yield {"url": url, "html": html, "title": ""}
+        else:
+            with _open_text(source) as handle:
+                for line in handle:
+                    item = _line_item(line, base_url)
+                    if item:
+                        yield item
+
+
+class JsonlOutput:
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.done = set()
+        if path == "-":
+            self.handle = sys.stdout
+            return
+        if resume and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    # Failed entries are retried.
+                    if record.get("source") and "error" not in (record.get("page") or {}):
+                        self.done.add(record["source"])
+        self.handle = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def write(self, source: str, record: dict):
+        self.handle.write(dumps_json({"source": source, **record}) + "\n")
+        self.handle.flush()
+
+    def close(self):
+        if self.handle is not sys.stdout:
+            self.handle.close()
+
+
+class DirectoryOutput:
+    # One directory per page with the same files /analyze returns; completed
+    # sources are listed in `.done` for --resume.
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        done_path = os.path.join(path, DONE_FILENAME)
+        self.done = set()
+        if resume and os.path.exists(done_path):
+            with open(done_path, "r", encoding="utf-8") as handle:
+                self.done = {line.rstrip("\n") for line in handle if line.strip()}
+        self.done_handle = open(done_path, "a" if resume else "w", encoding="utf-8")
+
+    def write(self, source: str, record: dict):
+        page = record["page"]
+        page_dir = os.path.join(self.path, safe_filename(page.get("url") or source))
+        os.makedirs(page_dir, exist_ok=True)
+        if "error" in page:
+            files = [{"filename": "error.json", "mimeType": "application/json", "data": page}]
+        elif "artifacts" in page:
+            files = [{"filename": "artifacts.json", "mimeType": "application/json", "data": page}]
+        else:
+            files = record["files"]
+        for file in files:
+            data = file["data"]
+            with open(os.path.join(page_dir, file["filename"]), "w", encoding="utf-8") as handle:
+                handle.write(data if isinstance(data, str) else dumps_json(data))
+        if "error" not in page:
+            self.done_handle.write(source + "\n")
+            self.done_handle.flush()
+
+    def close(self):
+        self.done_handle.close()
+
+
+class RunStats:
+    def __init__(self, progress_seconds: float):
+        self.started = time.perf_counter()
+        self.progress_seconds = progress_seconds
+        self.last_report = self.started
+        self.pages = 0
+        self.failed = 0
+        self.degraded = 0
+        self.skipped = 0
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "pages": self.pages,
+            "failed": self.failed,
+            "degraded": self.degraded,
+            "skipped": self.skipped,
+            "elapsedSeconds": round(elapsed, 2),
+            "pagesPerSecond": round(self.pages / elapsed, 2) if elapsed > 0 else 0,
+            "workers": worker_count(),
+        }
+
+    def tick(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self.last_report < self.progress_seconds:
+            return
+        self.last_report = now
+        stats = self.as_dict()
+        print(
+            f"[cli] {stats['pages']} paginas ({stats['pagesPerSecond']}/s), "
+            f"{stats['degraded']} degradadas, {stats['failed']} falhas, {stats['skipped']} ja processadas",
+            file=sys.stderr,
+        )
+
+
+def run(args):
+    if args.format == "dir" and args.output == "-":
+        raise SystemExit("--format dir exige --output com um diretorio")
+    if args.workers:
+        configure_workers(args.workers)
+    output = DirectoryOutput(args.output, args.resume) if args.format == "dir" else JsonlOutput(args.output, args.resume)
+    stats = RunStats(args.progress_seconds)
+    budget = RequestBudget(max_seconds=0, page_max_seconds=args.page_seconds, page_max_bytes=args.max_bytes)
+    fields = parse_fields(args.fields)
+    dictionaries = parse_dictionaries(args.dictionary)
+    memo = ArtifactStore(args.artifact_store) if args.artifact_store else None
+    sources = collections.defaultdict(collections.deque)
+    failures = collections.deque()
+
+    def pages():
+        urls = []
+        for item in iter_inputs(args.inputs, args.base_url):
+            if not item.get("url"):
+                continue
+            if item["url"] in output.done:
+                stats.skipped += 1
+                continue
+            if item.get("html"):
+                sources[item["url"]].append(item["url"])
+                yield item
+            else:
+                urls.append(item["url"])
+        if not urls:
+            return
+        for page in fetch_urls_stream(
+            urls,
+            max_tasks=args.max_tasks,
+            per_host=args.per_host,
+            timeout=args.timeout,
+            max_bytes=args.max_bytes,
+        ):
+            if page.get("html"):
+                sources[page["url"]].append(page["requested_url"])
+                yield page
+            else:
+                failures.append(page)
+
+    def write_failures():
+        while failures:
+            failure = failures.popleft()
+            stats.failed += 1
+            page = {"url": failure["url"], "requestedUrl": failure["requested_url"], "error": failure["error"]}
+            output.write(failure["requested_url"], {"page": page, "files": [], "entities": []})
+
+    try:
+        stream = CrawlAnalysisStream(
+            pages(), args.base_url or "", budget=budget, fields=fields, memo=memo, dictionaries=dictionaries
+        )
+        for item in stream:
+            write_failures()
+            record = page_record(item["parsed_page"], item["artifacts"], fields)
+            url = record["page"]["url"]
+            source = sources[url].popleft() if sources.get(url) else url
+            output.write(source, record)
+            stats.pages += 1
+            stats.degraded += bool(record["page"]["degraded"])
+            stats.tick()
+        write_failures()
+    finally:
+        output.close()
+        reset_process_pool()
+
+    stats.tick(force=True)
+    print(dumps_json(stats.as_dict()), file=sys.stderr)
+    return stats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analise em lote do motor AEO/GEO sem HTTP")
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="diretorio de .html, arquivo .jsonl ({url, html} ou {url}), arquivo de URLs ou - para stdin",
+    )
+    parser.add_argument("-o", "--output", default="-", help="arquivo JSONL, diretorio (--format dir) ou - para stdout")
+    parser.add_argument("--format", choices=("jsonl", "dir"), default="jsonl")
+    parser.add_argument("--resume", action="store_true", help="pula entradas ja presentes na saida")
+    parser.add_argument("--base-url", default=None, help="prefixo das URLs de arquivos HTML e URLs relativas")
+    parser.add_argument("--fields", default=None, help="artefatos a calcular, ex.: score,entities (padrao: todos)")
+    parser.add_argument(
+        "--dictionary",
+        default=None,
+        help="dicionarios de entidades do cliente ou vertical em ENTITY_DICTIONARY_DIR, ex.: automotivo,cliente_a",
+    )
+    parser.add_argument(
+        "--artifact-store",
+        default=ENGINE_ARTIFACT_STORE or None,
+        help="diretorio de cache por etapa; reexecucoes so recalculam o que mudou",
+    )
+    parser.add_argument("--workers", type=int, default=0, help="processos de analise (padrao: ENGINE_WORKERS)")
+    parser.add_argument("--page-seconds", type=float, default=PAGE_MAX_SECONDS)
+    parser.add_argument("--max-bytes", type=int, default=PAGE_MAX_BYTES)
+    parser.add_argument("--max-tasks", type=int, default=8, help="downloads simultaneos para entradas sem html")
+    parser.add_argument("--per-host", type=int, default=BATCH_PER_HOST)
+    parser.add_argument("--timeout", type=int, default=30)
+    parser.add_argument("--progress-seconds", type=float, default=2.0)
+    return parser
+
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
@@ -1,5 +1,8 @@
 import re
 
+from content_model import answer, faq_entry, heading, item_list, paragraph, table
+from fact_engine import extract_facts
+
 
 QUESTION_PREFIXES = ("Como", "Quanto", "Quais", "Onde", "Quando", "Qual", "Quem")
 
@@ -18,39 +21,6 @@ def _truncate_words(text: str, max_words: int = 60) -> str:
     return " ".join(words[:max_words]).rstrip(",.;:") + "..."
 
 
-def _extract_facts(parsed_page):
-    text = parsed_page.get("full_text", "")
-    facts = {
-        "price": None,
-        "versions": None,
-        "consumption": None,
-        "warranty": None,
-        "address_or_contact": None,
-    }
-
-    price_match = re.search(r"(r\$\s?\d[\d\.,]*)", text, flags=re.I)
-    if price_match:
-        facts["price"] = price_match.group(1)
-
-    version_match = re.search(r"(vers(?:ao|oes|oes).{0,100})", text, flags=re.I)
-    if version_match:
-        facts["versions"] = version_match.group(1).strip()
-
-    consumo_match = re.search(r"(\d{1,2}\s?km\/l|consumo.{0,80})", text, flags=re.I)
-    if consumo_match:
-        facts["consumption"] = consumo_match.group(1).strip()
-
-    garantia_match = re.search(r"(garantia.{0,100})", text, flags=re.I)
-    if garantia_match:
-        facts["warranty"] = garantia_match.group(1).strip()
-
-    contact_match = re.search(r"(telefone.{0,80}|whatsapp.{0,80}|endereco.{0,120})", text, flags=re.I)
-    if contact_match:
-        facts["address_or_contact"] = contact_match.group(1).strip()
-
-    return facts
-
-
 def _build_faq(questions, facts):
     faq = []
     for question in questions[:8]:
@@ -85,17 +55,16 @@ def _normalize_question_heading(question: str):
     return f"Como {question[0].lower()}{question[1:]}"
 
 
-def _write_intent_sections(lines, intent, parsed_page, facts):
+def _write_intent_sections(blocks, intent, parsed_page, facts):
     paragraphs = parsed_page.get("paragraphs", [])
     internal_links = parsed_page.get("internal_links", [])
 
     if intent == "informacional_comparativa":
-        lines.append("## O que voce encontra nesta pagina")
+        blocks.append(heading(2, "O que voce encontra nesta pagina"))
         if paragraphs:
-            lines.append(_truncate_words(paragraphs[0], 60))
+            blocks.append(paragraph(_truncate_words(paragraphs[0], 60)))
         else:
-            lines.append("A fonte nao traz uma descricao editorial clara; esta pagina parece funcionar como indice/navegacao para modelos e servicos.")
-        lines.append("")
+            blocks.append(paragraph("A fonte nao traz uma descricao editorial clara; esta pagina parece funcionar como indice/navegacao para modelos e servicos."))
 
         model_links = []
         for link in internal_links:
@@ -113,62 +82,70 @@ def _write_intent_sections(lines, intent, parsed_page, facts):
             seen.add(u)
             dedup.append((a, u))
         if dedup:
-            lines.append("## Principais links de modelos/linha")
-            for a, u in dedup[:8]:
-                lines.append(f"- {a}: {u}")
-            lines.append("")
+            blocks.append(heading(2, "Principais links de modelos/linha"))
+            blocks.append(item_list(f"{a}: {u}" for a, u in dedup[:8]))
 
-        lines.append("## Versoes e principais diferencas")
-        lines.append(f"- {facts['versions']}" if facts.get("versions") else "- Versoes nao informadas na fonte.")
-        lines.append("")
+        blocks.append(heading(2, "Versoes e principais diferencas"))
+        blocks.append(item_list([facts["versions"] if facts.get("versions") else "Versoes nao informadas na fonte."]))
 
-        lines.append("## Preco")
-        lines.append(f"- Valor identificado: {facts['price']}" if facts.get("price") else "- Preco nao informado na fonte.")
-        lines.append("")
+        blocks.append(heading(2, "Preco"))
+        blocks.append(item_list([f"Valor identificado: {facts['price']}" if facts.get("price") else "Preco nao informado na fonte."]))
 
     elif intent == "transacional":
-        lines.append("## Qual e a oferta e para quem serve")
-        lines.append(paragraphs[0] if paragraphs else "A oferta nao esta detalhada na fonte.")
-        lines.append("")
+        blocks.append(heading(2, "Qual e a oferta e para quem serve"))
+        blocks.append(paragraph(paragraphs[0] if paragraphs else "A oferta nao esta detalhada na fonte."))
 
-        lines.append("## Condicoes")
+        blocks.append(heading(2, "Condicoes"))
         if facts.get("price"):
-            lines.append(f"- Preco ou valor citado: {facts['price']}")
+            blocks.append(item_list([f"Preco ou valor citado: {facts['price']}"]))
         else:
-            lines.append("- Entrada, parcelas e taxas nao informadas na fonte.")
-        lines.append("")
-
-        lines.append("## Como aproveitar a oferta")
-        lines.append("1. Consulte a pagina oficial da oferta.")
-        lines.append("2. Valide elegibilidade e documentos.")
-        lines.append("3. Confirme prazo de vigencia e condicoes finais.")
-        lines.append("")
+            blocks.append(item_list(["Entrada, parcelas e taxas nao informadas na fonte."]))
+
+        blocks.append(heading(2, "Como aproveitar a oferta"))
+        blocks.append(
+            item_list(
+                [
+                    "Consulte a pagina oficial da oferta.",
+                    "Valide elegibilidade e documentos.",
+                    "Confirme prazo de vigencia e condicoes finais.",
+                ],
+                ordered=True,
+            )
+        )
 
     elif intent == "local":
-        lines.append("## Onde encontrar atendimento")
-        lines.append(facts.get("address_or_contact") or "Endereco e contato nao informados na fonte.")
-        lines.append("")
-
-        lines.append("## Como agendar")
-        lines.append("- Verifique se a pagina disponibiliza formulario, telefone ou canal oficial.")
-        lines.append("- Se nao houver canal explicito, publicar instrucao de agendamento e recomendado.")
-        lines.append("")
+        blocks.append(heading(2, "Onde encontrar atendimento"))
+        blocks.append(paragraph(facts.get("address_or_contact") or "Endereco e contato nao informados na fonte."))
+
+        blocks.append(heading(2, "Como agendar"))
+        blocks.append(
+            item_list(
+                [
+                    "Verifique se a pagina disponibiliza formulario, telefone ou canal oficial.",
+                    "Se nao houver canal explicito, publicar instrucao de agendamento e recomendado.",
+                ]
+            )
+        )
 
     else:
-        lines.append("## Informacoes principais")
-        if paragraphs:
-            for paragraph in paragraphs[:3]:
-                lines.append(f"- {paragraph}")
-        else:
-            lines.append("- A fonte nao trouxe contexto suficiente.")
-        lines.append("")
-
-
-def generate_aeo_markdown(parsed_page, intent, primary_question, secondary_questions, entities, expected_gaps):
+        blocks.append(heading(2, "Informacoes principais"))
+        blocks.append(item_list(paragraphs[:3] if paragraphs else ["A fonte nao trouxe contexto suficiente."]))
+
+
+def generate_aeo_content(
+    parsed_page,
+    intent,
+    primary_question,
+    secondary_questions,
+    entities,
+    expected_gaps,
+    text_index=None,
+):
     title = parsed_page.get("title") or "Pagina sem titulo"
     paragraphs = parsed_page.get("paragraphs", [])
 
-    facts = _extract_facts(parsed_page)
+    extracted = extract_facts(parsed_page, text_index)
+    facts = extracted["facts"]
     if intent == "informacional_comparativa":
         direct_answer = (
             "Esta pagina funciona como indice para a gama de modelos e paginas relacionadas (modelos, ofertas e servicos). "
@@ -185,45 +162,39 @@ def generate_aeo_markdown(parsed_page, intent, primary_question, secondary_quest
 
     faq = _build_faq(secondary_questions, facts)
 
-    lines = [f"# {title}", "", f"**Resposta direta:** {direct_answer}", ""]
-    lines.append(f"## {primary_question}")
+    blocks = [heading(1, title), answer(direct_answer), heading(2, primary_question)]
     if intent == "informacional_comparativa":
-        lines.append(
-            "A fonte nao consolida uma explicacao unica em texto corrido; trate esta pagina como um indice. "
-            "Use os links internos para abrir o modelo/tema especifico e entao coletar dados (preco, versoes, consumo, garantia) da pagina correta."
+        blocks.append(
+            paragraph(
+                "A fonte nao consolida uma explicacao unica em texto corrido; trate esta pagina como um indice. "
+                "Use os links internos para abrir o modelo/tema especifico e entao coletar dados (preco, versoes, consumo, garantia) da pagina correta."
+            )
         )
     else:
-        lines.append(paragraphs[0] if paragraphs else "A fonte nao trouxe um bloco explicativo completo para esta pergunta.")
-    lines.append("")
+        blocks.append(paragraph(paragraphs[0] if paragraphs else "A fonte nao trouxe um bloco explicativo completo para esta pergunta."))
 
-    _write_intent_sections(lines, intent, parsed_page, facts)
+    _write_intent_sections(blocks, intent, parsed_page, facts)
 
-    lines.append("## Entidades relevantes")
-    lines.append("| Entidade | Tipo |")
-    lines.append("| --- | --- |")
-    if entities:
-        for entity in entities[:10]:
-            lines.append(f"| {entity.get('entity_name')} | {entity.get('entity_type')} |")
-    else:
-        lines.append("| Nao informado | Nao informado |")
-    lines.append("")
+    blocks.append(heading(2, "Entidades relevantes"))
+    rows = [[entity.get("entity_name"), entity.get("entity_type")] for entity in (entities or [])[:10]]
+    blocks.append(table(["Entidade", "Tipo"], rows or [["Nao informado", "Nao informado"]]))
 
-    lines.append("## Perguntas frequentes")
+    blocks.append(heading(2, "Perguntas frequentes"))
     for qa in faq:
-        lines.append(f"### {_normalize_question_heading(qa['question'])}")
-        lines.append(qa["answer"])
-        lines.append("")
+        blocks.append(faq_entry(_normalize_question_heading(qa["question"]), qa["answer"]))
 
-    lines.append("## Dados nao informados")
+    blocks.append(heading(2, "Dados nao informados"))
     if expected_gaps:
-        for gap in expected_gaps:
-            lines.append(f"- {gap['message']}. Recomenda-se publicar este dado de forma explicita.")
+        blocks.append(item_list(f"{gap['message']}. Recomenda-se publicar este dado de forma explicita." for gap in expected_gaps))
     else:
-        lines.append("- A fonte cobre os dados esperados para esta intencao.")
+        blocks.append(item_list(["A fonte cobre os dados esperados para esta intencao."]))
 
+    # No markdown here: content_model.content_markdown renders it on demand.
     return {
-        "markdown": "\n".join(lines).strip(),
+        "blocks": blocks,
         "direct_answer": direct_answer,
         "faq": faq,
         "facts": facts,
+        "fact_values": extracted["values"],
+        "fact_candidates": extracted["candidates"],
     }
@@ -0,0 +1,324 @@
+import re
+
+
+# Structured form of the generated page: a list of typed blocks, each with
+# the word count of its markdown rendering. Scoring and the test harness
+# read the blocks; markdown is rendered only for the responses and files.
+ANSWER_PREFIX = "**Resposta direta:**"
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+ORDERED_ITEM_PATTERN = re.compile(r"^(\d+)\.\s+(.*)$")
+TABLE_SEPARATOR_PATTERN = re.compile(r"^\|?(\s*:?-+:?\s*\|)+\s*:?-*:?\s*$")
+
+
+def _words(text: str) -> int:
+    return len((text or "").split())
+
+
+def heading(level: int, text: str):
+    return {"type": "heading", "level": level, "text": text, "words": 1 + _words(text)}
+
+
+def answer(text: str):
+    return {"type": "answer", "text": text, "words": 2 + _words(text)}
+
+
+def paragraph(text: str, standalone: bool = False):
+    # `standalone`: a paragraph of its own, not the body of the heading above.
+    block = {"type": "paragraph", "text": text, "words": _words(text)}
+    if standalone:
+        block["standalone"] = True
+    return block
+
+
+def item_list(items, ordered: bool = False):
+    items = list(items)
+    return {"type": "list", "ordered": ordered, "items": items, "words": sum(1 + _words(item) for item in items)}
+
+
+def table(columns, rows):
+    columns = [str(column) for column in columns]
+    rows = [[str(cell) for cell in row] for row in rows]
+    words = sum(_words(cell) for row in [columns, *rows] for cell in row)
+    # Pipes and the separator row count as words in the rendering.
+    words += (len(columns) + 1) * (len(rows) + 1) + len(columns) + 1 + len(columns)
+    return {"type": "table", "columns": columns, "rows": rows, "words": words}
+
+
+def faq_entry(question: str, answer_text: str):
+    return {"type": "faq", "question": question, "answer": answer_text, "words": 1 + _words(question) + _words(answer_text)}
+
+
+def _block_lines(block):
+    kind = block["type"]
+    if kind == "heading":
+        return [f"{'#' * block['level']} {block['text']}"]
+    if kind == "answer":
+        return [f"{ANSWER_PREFIX} {block['text']}"]
+    if kind == "paragraph":
+        return [block["text"]]
+    if kind == "list":
+        if block["ordered"]:
+            return [f"{index}. {item}" for index, item in enumerate(block["items"], 1)]
+        return [f"- {item}" for item in block["items"]]
+    if kind == "table":
+        return [
+            "| " + " | ".join(block["columns"]) + " |",
+            "| " + " | ".join("---" for _ in block["columns"]) + " |",
+            *("| " + " | ".join(row) + " |" for row in block["rows"]),
+        ]
+    if kind == "faq":
+        return [f"### {block['question']}", *([block["answer"]] if block["answer"] else [])]
+    return []
+
+
+def _starts_paragraph(block, previous) -> bool:
+    # A blank line goes before headings, the direct answer, FAQ entries and
+    # standalone paragraphs; the body right under a heading follows it.
+    if previous is None:
+        return False
+    if block["type"] == "answer" or block.get("standalone"):
+        return True
+    if block["type"] in ("heading", "faq"):
+        return previous["type"] != "heading"
+    return False
+
+
+def block_markdown(block) -> str:
+    return "\n".join(_block_lines(block))
+
+
+def render_markdown(blocks) -> str:
+    lines = []
+    previous = None
+    for block in blocks:
+        if _starts_paragraph(block, previous):
+            lines.append("")
+        lines.extend(_block_lines(block))
+        previous = block
+    return "\n".join(lines).strip()
+
+
+def parse_markdown(markdown: str):
+    # Markdown back into blocks, for content edited as text (/rescore).
+    blocks = []
+    lines = (markdown or "").splitlines()
+    index = 0
+    blank_before = True
+    while index < len(lines):
+        line = lines[index].strip()
+        if not line:
+            blank_before = True
+            index += 1
+            continue
+        heading_match = HEADING_PATTERN.match(line)
+        ordered_match = ORDERED_ITEM_PATTERN.match(line)
+        if heading_match and len(heading_match.group(1)) == 3:
+            body = []
+            index += 1
+            while index < len(lines) and _is_text_line(lines[index].strip()):
+                body.append(lines[index].strip())
+                index += 1
+            blocks.append(faq_entry(heading_match.group(2).strip(), "\n".join(body)))
+        elif heading_match:
+            blocks.append(heading(len(heading_match.group(1)), heading_match.group(2).strip()))
+            index += 1
+        elif line.lower().startswith(ANSWER_PREFIX.lower()):
+            blocks.append(answer(line[len(ANSWER_PREFIX):].strip()))
+            index += 1
+        elif line.startswith("- ") or ordered_match:
+            prefix = ORDERED_ITEM_PATTERN if ordered_match else None
+            items = []
+            while index < len(lines):
+                current = lines[index].strip()
+                if prefix is not None and prefix.match(current):
+                    items.append(prefix.match(current).group(2))
+                elif prefix is None and current.startswith("- "):
+                    items.append(current[2:])
+                else:
+                    break
+                index += 1
+            blocks.append(item_list(items, ordered=prefix is not None))
+        elif line.startswith("|"):
+            rows = []
+            while index < len(lines) and lines[index].strip().startswith("|"):
+                current = lines[index].strip()
+                if not TABLE_SEPARATOR_PATTERN.match(current):
+                    rows.append([cell.strip() for cell in current.strip("|").split("|")])
+                index += 1
+            blocks.append(table(rows[0], rows[1:]))
+        else:
+            body = []
+            while index < len(lines) and _is_text_line(lines[index].strip()):
+                body.append(lines[index].strip())
+                index += 1
+            blocks.append(paragraph("\n".join(body), standalone=blank_before and bool(blocks)))
+        blank_before = False
+    return blocks
+
+
+def _is_text_line(line: str) -> bool:
+    return bool(line) and not (
+        line.startswith(("#", "- ", "|")) or ORDERED_ITEM_PATTERN.match(line) or line.lower().startswith(ANSWER_PREFIX.lower())
+    )
+
+
+def content_blocks(content_pack):
+    # Content packs from before the block model (or built by hand) only
+    # carry markdown.
+    blocks = content_pack.get("blocks")
+    if blocks is None:
+        blocks = parse_markdown(content_pack.get("markdown", ""))
+    return blocks
+
+
+def content_markdown(content_pack) -> str:
+    markdown = content_pack.get("markdown")
+    if markdown is None:
+        markdown = render_markdown(content_pack.get("blocks") or [])
+    return markdown
+
+
+def _text(value, name: str) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f"'{name}' deve ser texto")
+    return value
+
+
+def _texts(value, name: str, cells: bool = False):
+    if not isinstance(value, list):
+        raise ValueError(f"'{name}' deve ser uma lista")
+    kinds = (str, int, float) if cells else str
+    if any(isinstance(item, bool) or not isinstance(item, kinds) for item in value):
+        raise ValueError(f"'{name}' deve conter apenas textos")
+    return value
+
+
+def _level(value, name: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 6:
+        raise ValueError(f"'{name}' deve ser um inteiro de 1 a 6")
+    return value
+
+
+def _rows(value, name: str):
+    if not isinstance(value, list):
+        raise ValueError(f"'{name}' deve ser uma lista")
+    return [_texts(row, f"{name}[{index}]", cells=True) for index, row in enumerate(value)]
+
+
+BLOCK_TYPES = ("heading", "answer", "paragraph", "list", "table", "faq")
+
+
+def _edited_block(block, name: str):
+    # Rebuilt from its fields, so `words` is always computed here.
+    kind = block.get("type")
+    if kind == "heading":
+        return heading(_level(block.get("level"), f"{name}.level"), _text(block.get("text"), f"{name}.text"))
+    if kind == "answer":
+        return answer(_text(block.get("text"), f"{name}.text"))
+    if kind == "paragraph":
+        return paragraph(_text(block.get("text"), f"{name}.text"), standalone=bool(block.get("standalone")))
+    if kind == "list":
+        return item_list(_texts(block.get("items"), f"{name}.items"), ordered=bool(block.get("ordered")))
+    if kind == "table":
+        columns = _texts(block.get("columns"), f"{name}.columns", cells=True)
+        return table(columns, _rows(block.get("rows"), f"{name}.rows"))
+    if kind == "faq":
+        return faq_entry(_text(block.get("question"), f"{name}.question"), _text(block.get("answer"), f"{name}.answer"))
+    raise ValueError(f"'{name}.type' deve ser um de: {', '.join(BLOCK_TYPES)}")
+
+
+def _edited_blocks(value):
+    if not isinstance(value, list):
+        raise ValueError("'blocks' deve ser uma lista")
+    blocks = []
+    for index, block in enumerate(value):
+        name = f"blocks[{index}]"
+        if not isinstance(block, dict):
+            raise ValueError(f"'{name}' deve ser um objeto")
+        blocks.append(_edited_block(block, name))
+    return blocks
+
+
+def _edited_faq(value):
+    if not isinstance(value, list):
+        raise ValueError("'faq' deve ser uma lista")
+    faq = []
+    for index, qa in enumerate(value):
+        name = f"faq[{index}]"
+        if not isinstance(qa, dict):
+            raise ValueError(f"'{name}' deve ser um objeto")
+        question = _text(qa.get("question"), f"{name}.question")
+        faq.append({"question": question, "answer": _text(qa.get("answer"), f"{name}.answer")})
+    return faq
+
+
+def check_content_edits(edits):
+    # Edits sent by clients (/rescore): type-checked, blocks rebuilt so their
+    # word counts come from the server. Raises ValueError.
+    checked = dict(edits)
+    if "markdown" in checked:
+        checked["markdown"] = _text(checked["markdown"], "markdown")
+    if "blocks" in checked:
+        checked["blocks"] = _edited_blocks(checked["blocks"])
+    if "faq" in checked:
+        checked["faq"] = _edited_faq(checked["faq"])
+    if "direct_answer" in checked:
+        checked["direct_answer"] = _text(checked["direct_answer"], "direct_answer")
+    if "facts" in checked and not isinstance(checked["facts"], dict):
+        raise ValueError("'facts' deve ser um objeto")
+    return checked
+
+
+def edit_content_pack(content_pack, edits):
+    # Edited keys replace the pack's; edited markdown replaces the blocks.
+    edited = {**content_pack, **edits}
+    edited.pop("schema_graph", None)
+    if "blocks" not in edits and "markdown" in edits:
+        edited["blocks"] = parse_markdown(edits["markdown"] or "")
+    if "blocks" in edits:
+        edited.pop("markdown", None)
+    return edited
+
+
+def block_text(block) -> str:
+    # Plain text of a block (markup left out) for substring checks.
+    kind = block["type"]
+    if kind == "list":
+        return "\n".join(block["items"])
+    if kind == "table":
+        return "\n".join(" | ".join(row) for row in [block["columns"], *block["rows"]])
+    if kind == "faq":
+        return f"{block['question']}\n{block['answer']}"
+    return block["text"]
+
+
+def blocks_text(blocks) -> str:
+    return "\n".join(block_text(block) for block in blocks)
+
+
+def leading_words(blocks, count: int):
+    # First `count` words of the rendered markdown, rendering only the
+    # blocks they fall in.
+    words = []
+    for block in blocks:
+        if len(words) >= count:
+            break
+        if len(words) + block["words"] <= count:
+            words.extend(block_markdown(block).split())
+        else:
+            words.extend(block_markdown(block).split()[: count - len(words)])
+    return words
+
+
+def question_headings(blocks):
+    return [block["question"] for block in blocks if block["type"] == "faq"]
+
+
+def standalone_paragraphs(blocks):
+    # Prose that is not the body of a heading: the direct answer and
+    # paragraphs set apart by blank lines.
+    return [
+        block
+        for index, block in enumerate(blocks)
+        if block["type"] == "answer" or (block["type"] == "paragraph" and (index == 0 or block.get("standalone")))
+    ]
@@ -0,0 +1,207 @@
+from aeo_pipeline import build_degraded_artifacts, build_page_artifacts_within_budget, project_artifacts
+from artifact_store import digest, module_version
+from budget_engine import BudgetExceeded
+from parser_engine import empty_parsed_page, parse_page
+from template_engine import TemplateClusterer, build_template_report, dom_signature
+from worker_pool import imap_in_pool
+
+
+COMPACT_PARSED_FIELDS = ("url", "title", "meta_description", "headings", "internal_links", "flags")
+PARSE_MODULES = ("parser_engine", "boilerplate_engine", "structured_data_engine", "text_index")
+
+
+def compact_parsed_page(parsed_page):
+    # Only what response assembly and the link graph read; keeps the payload
+    # sent back from worker processes small.
+    return {field: parsed_page.get(field) for field in COMPACT_PARSED_FIELDS}
+
+
+def _page_summary(parsed_page, artifacts):
+    # With a `fields` projection score and issues may not have been computed.
+    score_pack = artifacts.get("score_pack")
+    issues_pack = artifacts.get("issues_pack") or {}
+    structural = artifacts.get("structural_issues") or {}
+    schema_comparison = artifacts.get("schema_comparison") or {}
+    return {
+        "url": parsed_page.get("url"),
+        "template_id": artifacts.get("template_id"),
+        "intent": None if artifacts.get("degraded") else artifacts.get("intent"),
+        "structural_issues": [issue for issues in structural.values() for issue in issues],
+        "existing_schema_types": schema_comparison.get("existing_types") or [],
+        "score": score_pack["total"] if score_pack else None,
+        "issues": [issue for issues in issues_pack.values() for issue in issues],
+    }
+
+
+def parse_key(html: str, page_url: str, template_fingerprints=None, page_budget=None) -> str:
+    return digest(
+        "parse",
+        module_version(*PARSE_MODULES),
+        html,
+        page_url,
+        sorted(template_fingerprints or ()),
+        page_budget.max_bytes if page_budget is not None else None,
+    )
+
+
+def parse_page_memo(html: str, page_url: str, template_fingerprints=None, page_budget=None, memo=None):
+    # Returns (parsed_page, page_key). The parse key doubles as page key for
+    # the stage memo keys, so an unchanged page skips BeautifulSoup as well
+    # as every cached stage.
+    if memo is None:
+        return parse_page(html, page_url, template_fingerprints=template_fingerprints, budget=page_budget), None
+    page_key = parse_key(html, page_url, template_fingerprints, page_budget)
+    found, parsed_page = memo.get(page_key)
+    if not found:
+        parsed_page = parse_page(html, page_url, template_fingerprints=template_fingerprints, budget=page_budget)
+        memo.put(page_key, parsed_page)
+    return parsed_page, page_key
+
+
+def analyze_page(
+    html: str,
+    page_url: str,
+    title: str = "",
+    template_fingerprints=None,
+    budget=None,
+    fields=None,
+    memo=None,
+    dictionaries=(),
+):
+    # `dictionaries` are names, resolved in the worker process: each process
+    # keeps its own compiled gazetteers instead of receiving one per task.
+    if budget is not None and budget.exhausted():
+        # Past the request deadline: report the page without parsing it.
+        parsed_page = empty_parsed_page(page_url, title)
+        error = BudgetExceeded("request", "request_time")
+        return parsed_page, project_artifacts(build_degraded_artifacts(parsed_page, error), fields)
+
+    page_budget = budget.page_budget() if budget is not None else None
+    parsed_page, page_key = parse_page_memo(html, page_url, template_fingerprints, page_budget, memo)
+    artifacts = build_page_artifacts_within_budget(
+        parsed_page, budget=page_budget, fields=fields, memo=memo, page_key=page_key, dictionaries=dictionaries
+    )
+    if page_key is not None:
+        # Stored parsed page: /rescore can find it by this reference.
+        artifacts["page_ref"] = page_key
+    return parsed_page, artifacts
+
+
+def _degraded_task(task, reason: str):
+    # Result for a page whose worker could not finish it.
+    page_url, title, fields = task[1], task[2], task[5]
+    parsed_page = empty_parsed_page(page_url, title)
+    artifacts = build_degraded_artifacts(parsed_page, BudgetExceeded("page", reason))
+    return compact_parsed_page(parsed_page), project_artifacts(artifacts, fields)
+
+
+def _analyze_task(task):
+    try:
+        parsed_page, artifacts = analyze_page(*task)
+    except MemoryError:
+        # Past the worker's address-space cap (ENGINE_WORKER_MAX_MB).
+        return _degraded_task(task, "memory")
+    return compact_parsed_page(parsed_page), artifacts
+
+
+def _analyze_stream_task(task):
+    template_id, page_task = task
+    parsed_page, artifacts = _analyze_task(page_task)
+    return template_id, parsed_page, artifacts
+
+
+def _timed_out_stream_task(task):
+    template_id, page_task = task
+    parsed_page, artifacts = _degraded_task(page_task, "worker_timeout")
+    return template_id, parsed_page, artifacts
+
+
+class CrawlAnalysisStream:
+    # Analyzes pages while they are still being crawled; template clustering
+    # is online.
+    def __init__(
+        self,
+        pages,
+        default_url: str,
+        template_fingerprints=None,
+        budget=None,
+        parallel: bool = True,
+        warmup: int = 0,
+        fields=None,
+        memo=None,
+        dictionaries=(),
+    ):
+        self.pages = pages
+        self.default_url = default_url
+        self.template_fingerprints = template_fingerprints
+        self.budget = budget
+        self.parallel = parallel
+        self.warmup = warmup
+        self.fields = fields
+        self.memo = memo
+        self.dictionaries = dictionaries
+        self.clusterer = TemplateClusterer()
+        self.summaries = []
+        self.fingerprints = None
+
+    def _frozen_fingerprints(self):
+        # Read once, after the warmup: every page of the crawl is stripped
+        # with the same set, so results (and parse keys) do not depend on how
+        # far the crawler thread got.
+        if callable(self.template_fingerprints):
+            return frozenset(self.template_fingerprints())
+        return self.template_fingerprints
+
+    def _warmed_pages(self):
+        # Hold back the first pages until the boilerplate cache has seen enough
+        # of the site to recognise template blocks.
+        iterator = iter(self.pages)
+        buffered = []
+        for page in iterator:
+            buffered.append(page)
+            if len(buffered) >= self.warmup:
+                break
+        yield from buffered
+        yield from iterator
+
+    def _tasks(self):
+        # Clustering only groups pages for the template report: every stage
+        # reads page content, so each page runs the full analysis. The
+        # structural stages are a few microseconds of a page's time; parsing
+        # and the content stages are the rest, and they differ between
+        # members of a template.
+        for page in self._warmed_pages():
+            html = page.get("html")
+            if not html:
+                continue
+            if self.fingerprints is None:
+                self.fingerprints = self._frozen_fingerprints()
+            page_url = page.get("url") or self.default_url
+            signature = page.get("dom_signature") or dom_signature(html)
+            template_id, _ = self.clusterer.assign(page_url, signature)
+            task = (
+                html,
+                page_url,
+                page.get("title") or "",
+                self.fingerprints,
+                self.budget,
+                self.fields,
+                self.memo,
+                self.dictionaries,
+            )
+            yield template_id, task
+
+    def __iter__(self):
+        # A page stuck inside one stage (where budgets are not checked) is cut
+        # after its page budget plus a grace period, and reported degraded.
+        timeout = self.budget.page_kill_seconds() if self.budget is not None else 0
+        results = imap_in_pool(
+            _analyze_stream_task, self._tasks(), self.parallel, timeout=timeout, fallback=_timed_out_stream_task
+        )
+        for template_id, parsed_page, artifacts in results:
+            artifacts["template_id"] = template_id
+            self.summaries.append(_page_summary(parsed_page, artifacts))
+            yield {"parsed_page": parsed_page, "artifacts": artifacts}
+
+    def template_report(self):
+        return build_template_report(self.clusterer, self.summaries)
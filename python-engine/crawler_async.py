@@ -1,12 +1,25 @@
 import asyncio
+import logging
 import os
+import queue
+import threading
+import time
 from urllib.parse import urljoin, urlparse
 from urllib.robotparser import RobotFileParser
 
 import aiohttp
 from aiohttp import ClientTimeout
 from bs4 import BeautifulSoup
+
+from boilerplate_engine import block_fingerprints
+from budget_engine import PAGE_MAX_BYTES
 from browser_fetch import fetch_html_with_playwright, is_unusable_page, playwright_enabled
+from template_engine import dom_signature
+
+CRAWL_QUEUE_SIZE = int(os.getenv("CRAWL_QUEUE_SIZE", "8"))
+BATCH_PER_HOST = int(os.getenv("BATCH_PER_HOST", "2"))
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_HEADERS = {
     "User-Agent": "GEO-AEO-Bot/1.0 (+https://your-agency.example)"
@@ -14,7 +27,19 @@ DEFAULT_HEADERS = {
 
 
 class AsyncCrawler:
-    def __init__(self, start_url: str, max_pages: int = 30, max_tasks: int = 8, delay: float = 0.5, timeout: int = 180):
+    def __init__(
+        self,
+        start_url: str,
+        max_pages: int = 30,
+        max_tasks: int = 8,
+        delay: float = 0.5,
+        timeout: int = 180,
+        boilerplate=None,
+        deadline=None,
+        max_bytes: int = PAGE_MAX_BYTES,
+        on_page=None,
+        results=None,
+    ):
         self.start_url = start_url
         self.parsed_start = urlparse(start_url)
         self.max_pages = max_pages
@@ -22,7 +47,9 @@ class AsyncCrawler:
         self.timeout = timeout
         self.seen = set()
         self.to_crawl = asyncio.Queue()
-        self.results = []
+        # Any append-only container works, e.g. a ResultStore that keeps the
+        # HTML compressed or spilled to disk.
+        self.results = results if results is not None else []
         self.sem = asyncio.Semaphore(max_tasks)
         self.session = None
         self.robots = RobotFileParser()
@@ -30,6 +57,12 @@ class AsyncCrawler:
         self.robots_allowed_check = False
         self.playwright_fallback_count = 0
         self.playwright_fallback_max = int(os.getenv("PLAYWRIGHT_MAX_FALLBACKS", "2"))
+        self.boilerplate = boilerplate
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        self.on_page = on_page
+        self.pages_crawled = 0
+        self.stopped = False
 
     async def _load_robots(self):
         try:
@@ -66,7 +99,7 @@ class AsyncCrawler:
                     timeout=ClientTimeout(total=self.timeout),
                     headers=DEFAULT_HEADERS,
                 ) as resp:
-                    text = await resp.text(errors="ignore")
+                    text = await self._read_text(resp)
                     if resp.status != 200:
                         if resp.status in (403, 429):
                             return await self._fetch_with_playwright(url)
@@ -78,6 +111,24 @@ class AsyncCrawler:
         except Exception:
             return await self._fetch_with_playwright(url)
 
+    async def _read_text(self, resp):
+        if not self.max_bytes:
+            return await resp.text(errors="ignore")
+        # Read one byte past the budget so parse_page can flag the truncation.
+        chunks = []
+        size = 0
+        while size <= self.max_bytes:
+            chunk = await resp.content.read(min(65536, self.max_bytes + 1 - size))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        raw = b"".join(chunks)
+        try:
+            return raw.decode(resp.charset or "utf-8", errors="ignore")
+        except LookupError:
+            return raw.decode("utf-8", errors="ignore")
+
     async def _fetch_with_playwright(self, url: str):
         if not playwright_enabled():
             return None
@@ -92,8 +143,8 @@ class AsyncCrawler:
         except Exception:
             return None
 
-    def extract_links(self, html: str, base_url: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def extract_links(self, html: str, base_url: str, soup=None):
+        soup = soup or BeautifulSoup(html, "html.parser")
         hrefs = []
         for a in soup.find_all("a", href=True):
             href = a["href"].strip()
@@ -106,8 +157,8 @@ class AsyncCrawler:
                 hrefs.append(next_url)
         return hrefs
 
-    def extract_content(self, html: str, url: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def extract_content(self, html: str, url: str, soup=None):
+        soup = soup or BeautifulSoup(html, "html.parser")
         title = (soup.title.string or "").strip() if soup.title else ""
         h1 = " ".join([h.get_text(separator=" ", strip=True) for h in soup.find_all("h1")]).strip()
         main = soup.find("main") or soup.find("article")
@@ -119,24 +170,51 @@ class AsyncCrawler:
         text = " ".join(text.split())[:10000]
         return {"url": url, "title": title, "h1": h1, "text": text, "html": html}
 
+    async def _process(self, url: str):
+        if url in self.seen or self.stopped or self.pages_crawled >= self.max_pages:
+            return
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            # Drain the queue without fetching once the request budget is spent.
+            return
+        self.seen.add(url)
+        html = await self.fetch(url)
+        if not html or self.pages_crawled >= self.max_pages:
+            return
+        soup = BeautifulSoup(html, "html.parser")
+        page = self.extract_content(html, url, soup=soup)
+        page["dom_signature"] = dom_signature(html)
+        self.pages_crawled += 1
+        if self.boilerplate is not None:
+            self.boilerplate.observe(block_fingerprints(soup))
+        links = self.extract_links(html, url, soup=soup)
+        if self.on_page is not None:
+            await self.on_page(page)
+        else:
+            self.results.append(page)
+        for link in links:
+            if link not in self.seen and (self.to_crawl.qsize() + len(self.seen)) < self.max_pages:
+                await self.to_crawl.put(link)
+
     async def worker(self):
-        while not self.to_crawl.empty() and len(self.results) < self.max_pages:
+        # Workers live until crawl() cancels them; exiting when the queue is
+        # momentarily empty would drop concurrency while others still fetch.
+        while True:
             url = await self.to_crawl.get()
-            if url in self.seen:
+            try:
+                await self._process(url)
+            except Exception as error:
+                # Reported like a failed batch URL instead of vanishing.
+                logger.warning("Falha ao processar %s: %s", url, error)
+                await self._report_failure(url, f"Falha ao processar pagina: {error}")
+            finally:
                 self.to_crawl.task_done()
-                continue
-            self.seen.add(url)
-            html = await self.fetch(url)
-            if not html:
-                self.to_crawl.task_done()
-                continue
-            page = self.extract_content(html, url)
+
+    async def _report_failure(self, url: str, error: str):
+        page = {"url": url, "error": error}
+        if self.on_page is not None:
+            await self.on_page(page)
+        else:
             self.results.append(page)
-            links = self.extract_links(html, url)
-            for link in links:
-                if link not in self.seen and (self.to_crawl.qsize() + len(self.seen)) < self.max_pages:
-                    await self.to_crawl.put(link)
-            self.to_crawl.task_done()
 
     async def crawl(self):
         timeout = ClientTimeout(total=self.timeout)
@@ -153,6 +231,185 @@ class AsyncCrawler:
         return self.results
 
 
-def crawl_site(url: str, max_pages: int = 30, max_tasks: int = 8, delay: float = 0.5, timeout: int = 180):
-    crawler = AsyncCrawler(url, max_pages=max_pages, max_tasks=max_tasks, delay=delay, timeout=timeout)
-    return asyncio.run(crawler.crawl())
+class BatchFetcher(AsyncCrawler):
+    # Fetches a fixed list of URLs (no link discovery, no robots.txt: the
+    # list is chosen by the user) with a global and a per-host limit.
+    def __init__(
+        self,
+        urls,
+        max_tasks: int = 8,
+        per_host: int = BATCH_PER_HOST,
+        timeout: int = 180,
+        deadline=None,
+        max_bytes: int = PAGE_MAX_BYTES,
+        on_page=None,
+        results=None,
+    ):
+        self.urls = list(urls)
+        super().__init__(
+            self.urls[0] if self.urls else "",
+            max_pages=len(self.urls),
+            max_tasks=max_tasks,
+            delay=0,
+            timeout=timeout,
+            deadline=deadline,
+            max_bytes=max_bytes,
+            on_page=on_page,
+            results=results,
+        )
+        self.per_host = max(1, per_host)
+        self.host_limits = {}
+
+    def _host_limit(self, url: str):
+        host = urlparse(url).netloc.lower()
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self.host_limits[host]
+
+    async def fetch_page(self, url: str):
+        # The host slot is taken before the global one so a busy host does
+        # not hold global slots while it waits.
+        async with self._host_limit(url):
+            async with self.sem:
+                if self.stopped:
+                    return None, url, "Lote interrompido"
+                if self.deadline is not None and time.monotonic() > self.deadline:
+                    return None, url, "Tempo da requisicao esgotado"
+                try:
+                    async with self.session.get(
+                        url,
+                        timeout=ClientTimeout(total=self.timeout),
+                        headers=DEFAULT_HEADERS,
+                    ) as resp:
+                        text = await self._read_text(resp)
+                        final_url = str(resp.url)
+                        status = resp.status
+                except Exception as error:
+                    html = await self._fetch_with_playwright(url)
+                    return html, url, None if html else f"Falha ao buscar URL: {error}"
+
+        if status in (403, 429) or (status == 200 and is_unusable_page(text)):
+            html = await self._fetch_with_playwright(url)
+            if html:
+                return html, final_url, None
+            return None, final_url, "Site protegido por anti-bot ou em manutencao"
+        if status != 200:
+            return None, final_url, f"HTTP {status}"
+        return text, final_url, None
+
+    async def _fetch_one(self, index: int, url: str):
+        html, final_url, error = await self.fetch_page(url)
+        page = {"index": index, "requested_url": url, "url": final_url}
+        if html:
+            page["html"] = html
+            page["dom_signature"] = dom_signature(html)
+            self.pages_crawled += 1
+        else:
+            page["error"] = error or "Pagina vazia"
+        if self.on_page is not None:
+            await self.on_page(page)
+        else:
+            self.results.append(page)
+
+    async def crawl(self):
+        async with aiohttp.ClientSession() as session:
+            self.session = session
+            await asyncio.gather(
+                *(self._fetch_one(index, url) for index, url in enumerate(self.urls)),
+                return_exceptions=True,
+            )
+        return self.results
+
+
+def _stream_pages(crawler, queue_size: int):
+    # Runs `crawler` on its own event loop thread and yields the pages it
+    # hands to on_page; a bounded queue applies backpressure when analysis
+    # falls behind.
+    pages = queue.Queue(maxsize=max(1, queue_size))
+    done = object()
+    errors = []
+
+    async def on_page(page):
+        while not crawler.stopped:
+            try:
+                await asyncio.to_thread(pages.put, page, True, 0.5)
+                return
+            except queue.Full:
+                continue
+
+    crawler.on_page = on_page
+
+    def run():
+        try:
+            asyncio.run(crawler.crawl())
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            while True:
+                try:
+                    pages.put(done, timeout=0.5)
+                    break
+                except queue.Full:
+                    if crawler.stopped:
+                        break
+
+    thread = threading.Thread(target=run, name="crawl-stream", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        crawler.stopped = True
+        thread.join(timeout=5)
+    if errors:
+        raise errors[0]
+
+
+def crawl_site_stream(
+    url: str,
+    max_pages: int = 30,
+    max_tasks: int = 8,
+    delay: float = 0.5,
+    timeout: int = 180,
+    boilerplate=None,
+    deadline=None,
+    max_bytes: int = PAGE_MAX_BYTES,
+    queue_size: int = CRAWL_QUEUE_SIZE,
+):
+    # Yields pages as they are fetched.
+    crawler = AsyncCrawler(
+        url,
+        max_pages=max_pages,
+        max_tasks=max_tasks,
+        delay=delay,
+        timeout=timeout,
+        boilerplate=boilerplate,
+        deadline=deadline,
+        max_bytes=max_bytes,
+    )
+    return _stream_pages(crawler, queue_size)
+
+
+def fetch_urls_stream(
+    urls,
+    max_tasks: int = 8,
+    per_host: int = BATCH_PER_HOST,
+    timeout: int = 180,
+    deadline=None,
+    max_bytes: int = PAGE_MAX_BYTES,
+    queue_size: int = CRAWL_QUEUE_SIZE,
+):
+    # Yields one page per URL in completion order; failed URLs come back
+    # with `error` instead of `html`.
+    fetcher = BatchFetcher(
+        urls,
+        max_tasks=max_tasks,
+        per_host=per_host,
+        timeout=timeout,
+        deadline=deadline,
+        max_bytes=max_bytes,
+    )
+    return _stream_pages(fetcher, queue_size)
@@ -1,114 +1,95 @@
 import re
 from collections import defaultdict
 
+from gazetteer import default_gazetteer
+from text_index import text_index_for
 
-ENTITY_DICTIONARY = {
-    "stellantis": {"type": "Organization", "aliases": ["Stellantis", "Grupo Stellantis"]},
-    "chevrolet": {"type": "Brand", "aliases": ["Chevrolet"]},
-    "peugeot": {"type": "Brand", "aliases": ["Peugeot"]},
-    "skinceuticals": {"type": "Brand", "aliases": ["SkinCeuticals"]},
-    "iof": {"type": "Tax/Regulation", "aliases": ["IOF", "Imposto sobre Operacoes Financeiras"]},
-    "ipva": {"type": "Tax/Regulation", "aliases": ["IPVA"]},
-    "financiamento": {"type": "FinancialProduct", "aliases": ["Financiamento"]},
-    "consorcio": {"type": "FinancialProduct", "aliases": ["Consorcio"]},
-    "seguro": {"type": "FinancialProduct", "aliases": ["Seguro"]},
-}
 
 MODEL_PATTERN = re.compile(r"\b(208|2008|boxer|partner(?:\s+rapid)?|sonic|onix|tracker|spin|s10)\b", re.I)
 LOCATION_PATTERN = re.compile(r"\b(sao paulo|rio de janeiro|belo horizonte|curitiba|porto alegre|brasil)\b", re.I)
 ORG_SUFFIX_PATTERN = re.compile(r"\b(s\.a\.|sa|ltda|inc|corp|group)\b", re.I)
+ORG_CANDIDATE_PATTERN = re.compile(r"\b([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+){0,2})\b")
+MAX_ORG_CANDIDATES = 40
 
 
-def _collect_evidence(text: str, token: str, window: int = 90):
-    match = re.search(re.escape(token), text, flags=re.I)
-    if not match:
-        return None
-    start = max(0, match.start() - window)
-    end = min(len(text), match.end() + window)
+def _evidence(text_index, start: int, end: int, window: int = 90):
     return {
-        "snippet": text[start:end].strip(),
-        "start": match.start(),
-        "end": match.end(),
+        "snippet": text_index.snippet(start, end, window),
+        "start": start,
+        "end": end,
     }
 
 
-def extract_entities(parsed_page):
-    full_text = parsed_page.get("full_text") or ""
-    lowered = full_text.lower()
+def extract_entities(parsed_page, text_index=None, gazetteer=None):
+    text_index = text_index_for(parsed_page, text_index)
+    full_text = text_index.original
+    gazetteer = default_gazetteer() if gazetteer is None else gazetteer
 
     entities = []
     added = set()
 
-    for key, cfg in ENTITY_DICTIONARY.items():
-        if key not in lowered:
-            continue
-        evidence = _collect_evidence(full_text, key)
-        if not evidence:
+    # Dictionary entities, with the first occurrence of any alias as evidence.
+    for entry, start, end in gazetteer.find_all(text_index):
+        key = (entry["name"].lower(), entry["type"])
+        if key in added:
             continue
-        entity_name = cfg["aliases"][0]
         entities.append(
             {
-                "entity_name": entity_name,
-                "entity_type": cfg["type"],
-                "aliases": cfg["aliases"],
-                "evidence": evidence,
+                "entity_name": entry["name"],
+                "entity_type": entry["type"],
+                "aliases": entry["aliases"],
+                "evidence": _evidence(text_index, *text_index.to_original(start, end)),
             }
         )
-        added.add((entity_name.lower(), cfg["type"]))
+        added.add(key)
 
-    for match in MODEL_PATTERN.finditer(full_text):
-        model = match.group(1)
+    for match in text_index.finditer(MODEL_PATTERN):
+        start, end = text_index.to_original(*match.span(1))
+        model = full_text[start:end]
         name = model.upper() if model.isnumeric() else model.title()
         key = (name.lower(), "Model")
         if key in added:
             continue
-        evidence = _collect_evidence(full_text, model)
-        if not evidence:
-            continue
         entities.append(
             {
                 "entity_name": name,
                 "entity_type": "Model",
                 "aliases": [name],
-                "evidence": evidence,
+                "evidence": _evidence(text_index, start, end),
             }
         )
         added.add(key)
 
-    for match in LOCATION_PATTERN.finditer(lowered):
+    for match in text_index.finditer(LOCATION_PATTERN):
         location = match.group(1).title()
         key = (location.lower(), "Location")
         if key in added:
             continue
-        evidence = _collect_evidence(full_text, match.group(1))
-        if not evidence:
-            continue
         entities.append(
             {
                 "entity_name": location,
                 "entity_type": "Location",
                 "aliases": [location],
-                "evidence": evidence,
+                "evidence": _evidence(text_index, *text_index.to_original(*match.span(1))),
             }
         )
         added.add(key)
 
-    candidate_orgs = re.findall(r"\b([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+){0,2})\b", full_text)
-    for candidate in candidate_orgs[:40]:
+    for candidate_index, match in enumerate(ORG_CANDIDATE_PATTERN.finditer(full_text)):
+        if candidate_index >= MAX_ORG_CANDIDATES:
+            break
+        candidate = match.group(1)
         if not ORG_SUFFIX_PATTERN.search(candidate):
             continue
         key = (candidate.lower(), "Organization")
         if key in added:
             continue
-        evidence = _collect_evidence(full_text, candidate)
-        if not evidence:
-            continue
         entities.append(
             {
                 "entity_name": candidate,
                 "entity_type": "Organization",
                 "aliases": [candidate],
-                "evidence": evidence,
+                "evidence": _evidence(text_index, *match.span(1)),
             }
         )
         added.add(key)
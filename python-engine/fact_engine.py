@@ -0,0 +1,158 @@
+import re
+
+from text_index import text_index_for
+
+
+# One scanner over the folded text finds every fact anchor; each anchor is
+# then widened to the same context window the per-field patterns used.
+# Candidates keep their offsets and a typed value, and are ranked per field.
+# Every alternative starts with a literal so the regex engine can skip ahead
+# on the first character; "km/l" is widened back to its number afterwards,
+# decimals included ("13,5 km/l").
+FACT_FIELDS = ("price", "versions", "consumption", "warranty", "address_or_contact")
+FACT_SCANNER = re.compile(r"r\$\s?\d[\d\.,]*|versao|versoes|km/l|consumo|garantia|telefone|whatsapp|endereco")
+ANCHOR_FIELDS = {
+    "versao": "versions",
+    "versoes": "versions",
+    "km/l": "consumption",
+    "consumo": "consumption",
+    "garantia": "warranty",
+    "telefone": "address_or_contact",
+    "whatsapp": "address_or_contact",
+    "endereco": "address_or_contact",
+}
+# Characters of context after the anchor, by anchor word.
+CONTEXT_CHARS = {"versao": 100, "versoes": 100, "consumo": 80, "garantia": 100, "telefone": 80, "whatsapp": 80, "endereco": 120}
+CONSUMPTION_NUMBER_PATTERN = re.compile(r"\d{1,2}(?:[\.,]\d{1,2})?\s?$")
+FACT_MAX_CANDIDATES = 10
+
+NUMBER_PATTERN = re.compile(r"\d+(?:[\.,]\d+)*")
+CONSUMPTION_PATTERN = re.compile(r"(\d+(?:[\.,]\d+)?)\s?km/l")
+WARRANTY_PATTERN = re.compile(r"(\d{1,3}(?:\.\d{3})*|\d+)\s*(anos?|mes(?:es)?|km)\b")
+PHONE_PATTERN = re.compile(r"\(?(\d{2})\)?\s?(9?\d{4})[\s\-]?(\d{4})")
+WARRANTY_UNITS = {"ano": "years", "anos": "years", "mes": "months", "meses": "months", "km": "km"}
+# Amounts that are not the price itself: instalments, entry and monthly
+# payments ("48x de R$ 1.299", "entrada de R$ 10.000", "R$ 899 mensais").
+INSTALMENT_BEFORE_PATTERN = re.compile(r"(?:\d+\s?x|parcelas?|entrada|sinal|mensais|mensalidades?)\s*(?:de\s*)?(?:apenas\s*)?$")
+INSTALMENT_AFTER_PATTERN = re.compile(r"\s*(?:/\s?mes|mensa(?:l|is)|por mes|ao mes|de entrada|na entrada)\b")
+INSTALMENT_CONTEXT_CHARS = 25
+
+
+def parse_number(text: str):
+    # Brazilian notation: "129.990,00" -> 129990, "13,5" -> 13.5; dots
+    # followed by three digit groups are thousands separators.
+    text = (text or "").strip(".,")
+    if not text:
+        return None
+    if "," in text and "." in text:
+        decimal = "," if text.rfind(",") > text.rfind(".") else "."
+    elif "," in text:
+        decimal = "," if text.count(",") == 1 else None
+    elif "." in text:
+        decimal = None if all(len(group) == 3 for group in text.split(".")[1:]) else "."
+    else:
+        decimal = None
+    for separator in ".,":
+        if separator != decimal:
+            text = text.replace(separator, "")
+    if decimal:
+        whole, _, fraction = text.rpartition(decimal)
+        text = f"{whole.replace(decimal, '')}.{fraction}"
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def _typed_value(field: str, folded: str):
+    if field == "price":
+        match = NUMBER_PATTERN.search(folded)
+        amount = parse_number(match.group(0)) if match else None
+        return {"amount": amount, "currency": "BRL"} if amount else None
+    if field == "consumption":
+        match = CONSUMPTION_PATTERN.search(folded)
+        value = parse_number(match.group(1)) if match else None
+        return {"value": value, "unit": "km/l"} if value else None
+    if field == "warranty":
+        match = WARRANTY_PATTERN.search(folded)
+        value = parse_number(match.group(1)) if match else None
+        return {"value": value, "unit": WARRANTY_UNITS[match.group(2)]} if value else None
+    if field == "address_or_contact":
+        match = PHONE_PATTERN.search(folded)
+        return {"phone": "".join(match.groups())} if match else None
+    return None
+
+
+def _is_instalment(folded: str, start: int, end: int) -> bool:
+    before = folded[max(0, start - INSTALMENT_CONTEXT_CHARS):start]
+    return bool(INSTALMENT_BEFORE_PATTERN.search(before) or INSTALMENT_AFTER_PATTERN.match(folded, end))
+
+
+def fact_candidates(text_index):
+    # {field: [(start, end, value, key, secondary), ...]} in text order;
+    # `key` groups mentions of the same value, `secondary` marks instalment
+    # and entry amounts, which are never preferred over the price.
+    folded = text_index.folded
+    candidates = {field: [] for field in FACT_FIELDS}
+    for match in FACT_SCANNER.finditer(folded):
+        anchor = match.group(0)
+        start, end = match.span()
+        field = ANCHOR_FIELDS.get(anchor, "price")
+        if anchor == "km/l":
+            number = CONSUMPTION_NUMBER_PATTERN.search(folded, max(0, start - 6), start)
+            if number is None:
+                continue
+            start = number.start()
+        extra = CONTEXT_CHARS.get(anchor)
+        if extra:
+            # Same window as the former `keyword.{0,N}` patterns: N more
+            # characters, never past a line break.
+            line_end = folded.find("\n", end, end + extra)
+            end = line_end if line_end >= 0 else min(len(folded), end + extra)
+        span = folded[start:end]
+        value = _typed_value(field, span)
+        secondary = field == "price" and _is_instalment(folded, start, end)
+        candidates[field].append((start, end, value, tuple(value.items()) if value else span.strip(), secondary))
+    return candidates
+
+
+def rank_candidates(candidates):
+    # One entry per distinct value: instalment amounts last, then values
+    # repeated on the page, typed values before untyped ones, then text
+    # order. Text is filled in by extract_facts for the ones kept.
+    groups = {}
+    for index, (start, end, value, key, secondary) in enumerate(candidates):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [index, {"start": start, "end": end, "value": value, "mentions": 1}, secondary]
+        else:
+            group[1]["mentions"] += 1
+            group[2] = group[2] or secondary
+    order = sorted(
+        groups.values(), key=lambda group: (group[2], -group[1]["mentions"], group[1]["value"] is None, group[0])
+    )
+    return [candidate for _, candidate, _ in order]
+
+
+def primary_candidate(candidates):
+    # The occurrence reported in `facts` and `values`: the first one on the
+    # page, skipping instalment amounts when the page states the price too.
+    return next((candidate for candidate in candidates if not candidate[4]), candidates[0] if candidates else None)
+
+
+def extract_facts(parsed_page, text_index=None):
+    # facts and values: text and typed value of the same occurrence per field
+    # (see primary_candidate); candidates: the ranked distinct occurrences.
+    text_index = text_index_for(parsed_page, text_index)
+    facts = {}
+    values = {}
+    ranked = {}
+    for field, candidates in fact_candidates(text_index).items():
+        ranked[field] = rank_candidates(candidates)[:FACT_MAX_CANDIDATES]
+        for candidate in ranked[field]:
+            candidate["text"] = text_index.original_text(candidate["start"], candidate["end"]).strip()
+        primary = primary_candidate(candidates)
+        facts[field] = text_index.original_text(primary[0], primary[1]).strip() if primary else None
+        values[field] = primary[2] if primary else None
+    return {"facts": facts, "values": values, "candidates": ranked}
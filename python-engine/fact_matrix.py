@@ -0,0 +1,273 @@
+import array
+import csv
+import io
+import math
+import os
+
+from fact_engine import FACT_FIELDS
+
+try:
+    import numpy
+except ImportError:  # optional, filters loop over the arrays otherwise
+    numpy = None
+
+
+# Crawler mode: one row per analyzed page in typed, array-backed columns
+# (normalized facts, fact/gap flags, intent, template, score components) so
+# cross-page questions ("model pages without a price", "price range") are a
+# scan over a few arrays instead of a walk over every page record. With
+# numpy installed the arrays are viewed as ndarrays without copying.
+FACT_MATRIX = os.getenv("FACT_MATRIX", "1") == "1"
+GAP_FIELDS = ("price", "versions", "consumption", "warranty")
+SCORE_COMPONENTS = ("answer_first", "extractability", "entity_clarity", "coverage", "schema_parity")
+
+NUMBER_COLUMNS = (
+    "template_id",
+    "score",
+    *(f"score_{name}" for name in SCORE_COMPONENTS),
+    "price",
+    "consumption_km_l",
+    "warranty_months",
+    "warranty_km",
+)
+FLAG_COLUMNS = ("degraded", *(f"has_{field}" for field in FACT_FIELDS), *(f"gap_{field}" for field in GAP_FIELDS))
+CATEGORY_COLUMNS = ("intent",)
+COLUMNS = ("url", *CATEGORY_COLUMNS, *NUMBER_COLUMNS, *FLAG_COLUMNS)
+WARRANTY_MONTHS = {"years": 12, "months": 1}
+TRUE_VALUES = ("1", "true", "sim", "yes")
+FALSE_VALUES = ("0", "false", "nao", "no")
+
+
+def page_row(artifacts):
+    # Column values of one page; None where the page has no value. Flags and
+    # values both describe the occurrence fact_engine reports per field
+    # (`facts` and `fact_values` of the same occurrence); a value is only
+    # read where the flag is set.
+    content_pack = artifacts.get("content_pack") or {}
+    facts = content_pack.get("facts") or {}
+    values = {field: value for field, value in (content_pack.get("fact_values") or {}).items() if facts.get(field)}
+    score_pack = artifacts.get("score_pack") or {}
+    breakdown = score_pack.get("breakdown") or {}
+    gaps = {gap.get("field") for gap in artifacts.get("gaps") or []}
+    price = values.get("price") or {}
+    consumption = values.get("consumption") or {}
+    warranty = values.get("warranty") or {}
+    row = {
+        "intent": artifacts.get("intent"),
+        "template_id": artifacts.get("template_id"),
+        "score": score_pack.get("total"),
+        "price": price.get("amount"),
+        "consumption_km_l": consumption.get("value"),
+        "warranty_months": warranty["value"] * WARRANTY_MONTHS[warranty["unit"]] if warranty.get("unit") in WARRANTY_MONTHS else None,
+        "warranty_km": warranty.get("value") if warranty.get("unit") == "km" else None,
+        "degraded": bool(artifacts.get("degraded")),
+    }
+    for name in SCORE_COMPONENTS:
+        row[f"score_{name}"] = (breakdown.get(name) or {}).get("score")
+    for field in FACT_FIELDS:
+        row[f"has_{field}"] = bool(facts.get(field))
+    for field in GAP_FIELDS:
+        row[f"gap_{field}"] = field in gaps
+    return row
+
+
+def _plain(value: float):
+    return int(value) if value.is_integer() else value
+
+
+def check_columns(names):
+    for name in names:
+        if name not in COLUMNS:
+            raise ValueError(f"Coluna desconhecida: {name}")
+
+
+def _number(value: str, name: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Valor numerico invalido para '{name}': {value}") from None
+
+
+def conditions_from_args(args, reserved=()):
+    # Query string -> where() conditions: `price_min`/`price_max` for
+    # ranges, `price=null` for missing values, `gap_price=1` for flags,
+    # `intent=a,b` for categories and `url=<substring>`.
+    conditions = {}
+    for key, value in args.items():
+        if key in reserved:
+            continue
+        name, _, bound = key.rpartition("_")
+        if bound in ("min", "max") and name in NUMBER_COLUMNS:
+            low, high = conditions.get(name) or (None, None)
+            number = _number(value, key)
+            conditions[name] = (number, high) if bound == "min" else (low, number)
+        elif key in NUMBER_COLUMNS:
+            conditions[key] = None if value.lower() in ("", "null") else _number(value, key)
+        elif key in FLAG_COLUMNS:
+            if value.lower() not in TRUE_VALUES + FALSE_VALUES:
+                raise ValueError(f"Valor invalido para '{key}': use 1 ou 0")
+            conditions[key] = value.lower() in TRUE_VALUES
+        elif key in CATEGORY_COLUMNS:
+            conditions[key] = None if value.lower() in ("", "null") else value.split(",")
+        elif key == "url":
+            conditions[key] = value
+        else:
+            raise ValueError(f"Coluna desconhecida: {key}")
+    return conditions
+
+
+NUMPY_TYPES = {"d": "float64", "b": "int8", "i": "int32"}
+
+
+class FactMatrix:
+    def __init__(self):
+        self.urls = []
+        self.columns = {name: array.array("d") for name in NUMBER_COLUMNS}
+        self.columns.update((name, array.array("b")) for name in FLAG_COLUMNS)
+        # Categories are dictionary-encoded: codes per row, -1 for none.
+        self.columns.update((name, array.array("i")) for name in CATEGORY_COLUMNS)
+        self.categories = {name: [] for name in CATEGORY_COLUMNS}
+        self._codes = {name: {} for name in CATEGORY_COLUMNS}
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add_page(self, url: str, artifacts):
+        row = page_row(artifacts)
+        self.urls.append(url)
+        for name in NUMBER_COLUMNS:
+            self.columns[name].append(math.nan if row[name] is None else float(row[name]))
+        for name in FLAG_COLUMNS:
+            self.columns[name].append(1 if row[name] else 0)
+        for name in CATEGORY_COLUMNS:
+            self.columns[name].append(self._code(name, row[name]))
+
+    def _code(self, name: str, value):
+        if value is None:
+            return -1
+        codes = self._codes[name]
+        if value not in codes:
+            codes[value] = len(self.categories[name])
+            self.categories[name].append(value)
+        return codes[value]
+
+    def value(self, name: str, row: int):
+        if name == "url":
+            return self.urls[row]
+        value = self.columns[name][row]
+        if name in NUMBER_COLUMNS:
+            return None if math.isnan(value) else _plain(value)
+        if name in FLAG_COLUMNS:
+            return bool(value)
+        return self.categories[name][value] if value >= 0 else None
+
+    def _category_codes(self, name: str, condition):
+        if condition is None:
+            return {-1}
+        wanted = [condition] if isinstance(condition, str) else condition
+        return {self._codes[name][value] for value in wanted if value in self._codes[name]}
+
+    def _mask(self, name: str, condition):
+        # numpy boolean mask for one condition.
+        if name == "url":
+            return numpy.fromiter((condition in url for url in self.urls), dtype=bool, count=len(self.urls))
+        column = numpy.frombuffer(self.columns[name], dtype=NUMPY_TYPES[self.columns[name].typecode])
+        if name in FLAG_COLUMNS:
+            return column == (1 if condition else 0)
+        if name in CATEGORY_COLUMNS:
+            return numpy.isin(column, list(self._category_codes(name, condition)))
+        if condition is None:
+            return numpy.isnan(column)
+        if isinstance(condition, tuple):
+            low, high = condition
+            mask = ~numpy.isnan(column)
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+            return mask
+        return column == condition
+
+    def _test(self, name: str, condition):
+        # Row predicate for one condition, without numpy.
+        if name == "url":
+            return lambda row: condition in self.urls[row]
+        column = self.columns[name]
+        if name in FLAG_COLUMNS:
+            flag = 1 if condition else 0
+            return lambda row: column[row] == flag
+        if name in CATEGORY_COLUMNS:
+            codes = self._category_codes(name, condition)
+            return lambda row: column[row] in codes
+        if condition is None:
+            return lambda row: math.isnan(column[row])
+        if isinstance(condition, tuple):
+            low = -math.inf if condition[0] is None else condition[0]
+            high = math.inf if condition[1] is None else condition[1]
+            return lambda row: low <= column[row] <= high
+        return lambda row: column[row] == condition
+
+    def where(self, conditions=None):
+        # Row indices matching every condition ({column: condition}): a
+        # value, a (low, high) range with None for an open end, None for a
+        # missing value, or a list of categories.
+        conditions = conditions or {}
+        check_columns(conditions)
+        if not len(self):
+            return []
+        if numpy is not None:
+            mask = numpy.ones(len(self), dtype=bool)
+            for name, condition in conditions.items():
+                mask &= self._mask(name, condition)
+            return numpy.flatnonzero(mask).tolist()
+        rows = range(len(self))
+        for name, condition in conditions.items():
+            rows = list(filter(self._test(name, condition), rows))
+        return list(rows)
+
+    def records(self, rows=None, columns=None):
+        rows = range(len(self)) if rows is None else rows
+        columns = columns or COLUMNS
+        check_columns(columns)
+        return [{name: self.value(name, row) for name in columns} for row in rows]
+
+    def stats(self, name: str, rows=None):
+        # Count, min, max and mean of a numeric column over the rows that
+        # have a value.
+        if name not in NUMBER_COLUMNS:
+            raise ValueError(f"Coluna nao numerica: {name}")
+        column = self.columns[name]
+        values = [column[row] for row in (range(len(self)) if rows is None else rows)]
+        values = [value for value in values if not math.isnan(value)]
+        if not values:
+            return {"count": 0, "min": None, "max": None, "mean": None}
+        return {"count": len(values), "min": _plain(min(values)), "max": _plain(max(values)), "mean": round(sum(values) / len(values), 2)}
+
+    def query(self, conditions=None, offset: int = 0, limit: int = 100, columns=None, stats=()):
+        # One page of matching records plus stats over all matching rows.
+        rows = self.where(conditions)
+        offset = max(0, min(offset, len(rows)))
+        return {
+            "total": len(self),
+            "matched": len(rows),
+            "offset": offset,
+            "limit": limit,
+            "rows": self.records(rows[offset:offset + limit], columns),
+            "stats": {name: self.stats(name, rows) for name in stats},
+        }
+
+    def to_columns(self):
+        # Columnar export: {"rows": n, "columns": {name: [values]}}.
+        return {
+            "rows": len(self),
+            "columns": {name: [self.value(name, row) for row in range(len(self))] for name in COLUMNS},
+        }
+
+    def to_csv(self, rows=None, columns=None) -> str:
+        columns = columns or COLUMNS
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        for record in self.records(rows, columns):
+            writer.writerow("" if record[name] is None else record[name] for name in columns)
+        return output.getvalue()
@@ -0,0 +1,254 @@
+import collections
+import csv
+import json
+import os
+import re
+import threading
+
+from artifact_store import digest
+from text_index import TOKEN_PATTERN, fold_text
+
+
+# Entity dictionaries (brands, models, SKUs...) matched with one
+# Aho-Corasick automaton over words: aliases are folded and split into words
+# like the page text, so every match starts and ends on a word boundary. The
+# page is scanned once by a regex of the dictionary's words (a character
+# trie, so its size barely matters) and only those words reach the
+# automaton; any other word in between resets it.
+#
+# Files are JSON ({key: {"type", "aliases"}} or [{"name", "type",
+# "aliases"}]) or TSV (name<TAB>type<TAB>alias|alias). ENTITY_DICTIONARIES
+# lists the files or directories (separated by ",") every page is matched
+# against; entries of later files replace earlier ones with the same key.
+#
+# Client or vertical dictionaries are chosen per request (`dictionary`):
+# each name is a file (<name>.json, <name>.tsv) or a directory under
+# ENTITY_DICTIONARY_DIR, loaded after the default ones. Every dictionary set
+# compiles to its own gazetteer; the last GAZETTEER_CACHE_SIZE are kept.
+DICTIONARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dictionaries")
+DEFAULT_DICTIONARY = os.path.join(DICTIONARY_DIR, "default.json")
+ENTITY_DICTIONARIES = os.getenv("ENTITY_DICTIONARIES", DEFAULT_DICTIONARY)
+ENTITY_DICTIONARY_DIR = os.getenv("ENTITY_DICTIONARY_DIR", DICTIONARY_DIR)
+GAZETTEER_CACHE_SIZE = int(os.getenv("GAZETTEER_CACHE_SIZE", "8"))
+DICTIONARY_EXTENSIONS = (".json", ".tsv")
+DICTIONARY_NAME_PATTERN = re.compile(r"[A-Za-z0-9][\w\-]*$")
+
+WORD_CHAR_PATTERN = re.compile(r"\w")
+
+_default = None
+_default_lock = threading.Lock()
+_by_set = collections.OrderedDict()
+_by_set_lock = threading.Lock()
+
+
+def alias_words(alias: str):
+    return tuple(TOKEN_PATTERN.findall(fold_text(alias)))
+
+
+def trie_pattern(words) -> str:
+    # Alternation of `words` factored by common prefixes: "peugeot|partner"
+    # -> "p(?:artner|eugeot)".
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = f"(?:{body})?" if len(body) > 1 else f"{body}?"
+        return body
+
+    return render(trie)
+
+
+def _entry(key, entity_type, aliases, name=None):
+    aliases = [alias.strip() for alias in aliases if alias and alias.strip()]
+    name = (name or (aliases[0] if aliases else key) or "").strip()
+    if name and name not in aliases:
+        aliases.insert(0, name)
+    return {"key": fold_text(key or name).strip(), "name": name, "type": entity_type, "aliases": aliases}
+
+
+def _json_entries(data):
+    if isinstance(data, dict):
+        return [_entry(key, value.get("type"), value.get("aliases") or [], value.get("name")) for key, value in data.items()]
+    return [_entry(item.get("key"), item.get("type"), item.get("aliases") or [], item.get("name")) for item in data]
+
+
+def _tsv_entries(handle):
+    entries = []
+    for row in csv.reader(handle, delimiter="\t"):
+        if not row or not row[0].strip() or row[0].startswith("#"):
+            continue
+        name = row[0].strip()
+        entity_type = row[1].strip() if len(row) > 1 else "Thing"
+        aliases = row[2].split("|") if len(row) > 2 else []
+        entries.append(_entry(name, entity_type, aliases, name))
+    return entries
+
+
+def load_dictionary(path: str):
+    with open(path, encoding="utf-8") as handle:
+        if path.endswith(".tsv"):
+            return _tsv_entries(handle)
+        return _json_entries(json.load(handle))
+
+
+def dictionary_paths(value: str):
+    paths = []
+    for item in (part.strip() for part in (value or "").split(",")):
+        if os.path.isdir(item):
+            paths.extend(
+                os.path.join(item, name) for name in sorted(os.listdir(item)) if name.endswith(DICTIONARY_EXTENSIONS)
+            )
+        elif item:
+            paths.append(item)
+    return paths
+
+
+class Gazetteer:
+    def __init__(self, entries):
+        by_key = {}
+        for entry in entries:
+            if entry["key"] and entry["aliases"]:
+                by_key[entry["key"]] = entry
+        self.entries = list(by_key.values())
+        self.version = digest(self.entries)
+        # Word trie: transitions, failure links and, per state, the
+        # (entry, word count) pairs ending there (own and inherited).
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        vocabulary = set()
+        for index, entry in enumerate(self.entries):
+            for words in dict.fromkeys(alias_words(alias) for alias in entry["aliases"]):
+                if words:
+                    self._add(words, index)
+                    vocabulary.update(words)
+        self._link()
+        # No leading \b: a literal first character lets the regex engine skip
+        # ahead; matches starting inside a word are dropped in find_all.
+        self._words_pattern = re.compile(trie_pattern(vocabulary) + r"\b") if vocabulary else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _add(self, words, index: int):
+        state = 0
+        for word in words:
+            following = self._goto[state].get(word)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][word] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = following
+        if (index, len(words)) not in self._out[state]:
+            self._out[state].append((index, len(words)))
+
+    def _link(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for word, following in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(word, 0)
+                self._out[following].extend(self._out[self._fail[following]])
+                queue.append(following)
+
+    def find_all(self, text_index):
+        # Yields (entry, start, end) with folded offsets for every alias
+        # occurrence on the page, in order of their end.
+        if self._words_pattern is None:
+            return
+        folded = text_index.folded
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        state = 0
+        starts = []
+        previous_end = 0
+        for match in self._words_pattern.finditer(folded):
+            start, end = match.span()
+            if start and WORD_CHAR_PATTERN.match(folded, start - 1):
+                continue
+            if WORD_CHAR_PATTERN.search(folded, previous_end, start):
+                # Another word in between: aliases need consecutive words.
+                state = 0
+                starts = []
+            previous_end = end
+            starts.append(start)
+            word = match.group()
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for index, length in out[state]:
+                yield self.entries[index], starts[-length], end
+
+
+def load_gazetteer(value: str = ENTITY_DICTIONARIES, dictionaries=()):
+    paths = dictionary_paths(value)
+    for name in dictionaries:
+        paths.extend(dictionary_paths(named_dictionary_path(name)))
+    entries = []
+    for path in paths:
+        entries.extend(load_dictionary(path))
+    return Gazetteer(entries)
+
+
+def named_dictionary_path(name: str, directory: str = None):
+    # <name>.json, <name>.tsv or <name>/ under ENTITY_DICTIONARY_DIR.
+    directory = directory or ENTITY_DICTIONARY_DIR
+    if DICTIONARY_NAME_PATTERN.match(name):
+        for candidate in [os.path.join(directory, name + extension) for extension in DICTIONARY_EXTENSIONS] + [
+            os.path.join(directory, name)
+        ]:
+            if os.path.exists(candidate):
+                return candidate
+    raise ValueError(f"Dicionario desconhecido: {name}")
+
+
+def parse_dictionaries(value):
+    # "automotivo,cliente_a" or ["automotivo", "cliente_a"] -> names in
+    # load order; unknown names are rejected before any page is analyzed.
+    if not value:
+        return ()
+    names = value.split(",") if isinstance(value, str) else list(value)
+    names = tuple(dict.fromkeys(name for name in (str(name).strip() for name in names) if name))
+    for name in names:
+        named_dictionary_path(name)
+    return names
+
+
+def default_gazetteer():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = load_gazetteer()
+        return _default
+
+
+def gazetteer_for(dictionaries=()):
+    # The default gazetteer, or the one compiled for this dictionary set.
+    if not dictionaries:
+        return default_gazetteer()
+    key = tuple(dictionaries)
+    with _by_set_lock:
+        gazetteer = _by_set.get(key)
+        if gazetteer is not None:
+            _by_set.move_to_end(key)
+            return gazetteer
+    gazetteer = load_gazetteer(dictionaries=key)
+    with _by_set_lock:
+        _by_set[key] = gazetteer
+        while len(_by_set) > max(1, GAZETTEER_CACHE_SIZE):
+            _by_set.popitem(last=False)
+    return gazetteer
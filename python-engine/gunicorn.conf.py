@@ -0,0 +1,17 @@
+import os
+
+
+# One process with many threads: jobs, admission lanes and the analysis
+# process pool (ENGINE_WORKERS) live in the engine process, so more gunicorn
+# workers would split them. CPU-bound work already runs on the pool; the
+# threads only wait on network, the pool and clients.
+bind = f"0.0.0.0:{os.getenv('ENGINE_PORT', '5000')}"
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+# Enough for every lane's concurrency plus its queue, so overload is
+# answered by admission control (429) instead of waiting in the backlog.
+threads = int(os.getenv("GUNICORN_THREADS", "48"))
+timeout = int(os.getenv("ENGINE_REQUEST_TIMEOUT", "180"))
+graceful_timeout = timeout
+keepalive = 5
+backlog = int(os.getenv("GUNICORN_BACKLOG", "64"))
@@ -0,0 +1,97 @@
+import gzip
+import io
+import json
+import os
+import tarfile
+from urllib.parse import urljoin
+
+try:
+    import orjson
+except ImportError:  # optional fast decoder
+    orjson = None
+
+
+BUNDLE_MAX_PAGES = int(os.getenv("BUNDLE_MAX_PAGES", "5000"))
+HTML_SUFFIXES = (".html", ".htm", ".xhtml")
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _loads(line):
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def decode_html(raw: bytes, charset: str | None = None) -> str:
+    try:
+        return raw.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
+
+
+def open_maybe_gzip(stream):
+    # Peeks at the first bytes so gzip works with or without Content-Encoding.
+    buffered = stream if hasattr(stream, "peek") else io.BufferedReader(stream)
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        return io.BufferedReader(gzip.GzipFile(fileobj=buffered))
+    return buffered
+
+
+def _record_page(record, base_url: str | None):
+    if not isinstance(record, dict):
+        raise ValueError("Registro do pacote deve ser um objeto {url, html}")
+    html = record.get("html")
+    url = (record.get("url") or "").strip()
+    if not isinstance(html, str) or not html:
+        raise ValueError("Registro do pacote sem campo 'html'")
+    if base_url:
+        url = urljoin(base_url, url)
+    if not url:
+        raise ValueError("Registro do pacote sem campo 'url'")
+    return {"url": url, "html": html, "title": record.get("title") or ""}
+
+
+def iter_jsonl_pages(stream, base_url: str | None = None):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield _record_page(_loads(line), base_url)
+
+
+def iter_tar_pages(stream, base_url: str | None = None):
+    # Stream mode ("r|*"): members are read in order without seeking, and
+    # tarfile handles .tar.gz itself. HTML members use their path (joined to
+    # base_url when given) as URL; JSONL members hold {url, html} records.
+    with tarfile.open(fileobj=stream, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            name = member.name.lstrip("./")
+            lowered = name.lower()
+            handle = archive.extractfile(member)
+            if handle is None:
+                continue
+            if lowered.endswith(HTML_SUFFIXES):
+                url = urljoin(base_url, name) if base_url else name
+                yield {"url": url, "html": decode_html(handle.read()), "title": ""}
+            elif lowered.endswith(JSONL_SUFFIXES):
+                yield from iter_jsonl_pages(io.BufferedReader(handle), base_url)
+
+
+def bundle_pages(stream, content_type: str, base_url: str | None = None, max_pages: int = BUNDLE_MAX_PAGES):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("application/x-tar", "application/tar", "application/gzip", "application/x-gtar"):
+        reader = iter_tar_pages
+    elif content_type in ("application/x-ndjson", "application/jsonl", "application/x-jsonlines"):
+        reader = iter_jsonl_pages
+    else:
+        raise ValueError(f"Tipo de pacote nao suportado: {content_type}")
+    return _limited(reader(open_maybe_gzip(stream), base_url), max_pages)
+
+
+def _limited(pages, max_pages: int):
+    for count, page in enumerate(pages):
+        if count >= max_pages:
+            raise ValueError(f"Maximo de {max_pages} paginas por pacote")
+        yield page
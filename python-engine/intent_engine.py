@@ -1,6 +1,8 @@
 import re
 from urllib.parse import urlparse
 
+from text_index import fold_text, text_index_for
+
 
 QUESTION_BANK = {
     "informacional_comparativa": [
@@ -37,11 +39,16 @@ QUESTION_BANK = {
 }
 
 
-def detect_intent(url: str, parsed_page):
+CONSUMPTION_PATTERN = re.compile(r"\bconsumo|km/l|autonomia\b")
+
+
+def detect_intent(url: str, parsed_page, text_index=None):
     path = urlparse(url).path.lower()
-    title = (parsed_page.get("title") or "").lower()
-    full_text = (parsed_page.get("full_text") or "").lower()
-    corpus = " ".join([path, title, full_text])
+    title = fold_text(parsed_page.get("title") or "")
+    full_text = text_index_for(parsed_page, text_index).folded
+
+    def corpus_has(key):
+        return key in path or key in title or key in full_text
 
     # Title is a strong hint. Some "gama/modelos" pages include pricing modules,
     # but the primary intent is still informational/comparative.
@@ -55,11 +62,11 @@ def detect_intent(url: str, parsed_page):
     if any(key in path for key in ("/concessionarias", "/dealers", "/lojas", "/store-locator")):
         return "local"
 
-    if "compar" in corpus or "diferen" in corpus:
+    if corpus_has("compar") or corpus_has("diferen"):
         return "informacional_comparativa"
-    if any(key in corpus for key in ("agendar", "compre", "simule", "oferta", "financiamento")):
+    if any(corpus_has(key) for key in ("agendar", "compre", "simule", "oferta", "financiamento")):
         return "transacional"
-    if any(key in corpus for key in ("endereco", "unidade", "concessionaria", "bairro", "cidade")):
+    if any(corpus_has(key) for key in ("endereco", "unidade", "concessionaria", "bairro", "cidade")):
         return "local"
     return "navegacional"
 
@@ -75,14 +82,13 @@ def infer_primary_question(intent: str, parsed_page):
     return f"Qual e a informacao principal disponivel em {title}?"
 
 
-def infer_secondary_questions(intent: str, parsed_page, limit: int = 6):
+def infer_secondary_questions(intent: str, parsed_page, limit: int = 6, text_index=None):
     questions = list(QUESTION_BANK.get(intent, QUESTION_BANK["navegacional"]))
-    h2_text = " ".join(parsed_page.get("headings", {}).get("h2", []))
-    full_text = parsed_page.get("full_text", "")
+    h2_text = fold_text(" ".join(parsed_page.get("headings", {}).get("h2", [])))
 
-    if re.search(r"\bgarantia\b", h2_text, flags=re.I):
+    if re.search(r"\bgarantia\b", h2_text):
         questions.insert(0, "Qual garantia oficial e informada para este item?")
-    if re.search(r"\bconsumo|km/l|autonomia\b", full_text, flags=re.I):
+    if text_index_for(parsed_page, text_index).search(CONSUMPTION_PATTERN):
         questions.insert(0, "Quais numeros de consumo e autonomia foram publicados?")
 
     cleaned = []
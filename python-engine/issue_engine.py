@@ -1,15 +1,37 @@
-def build_issues(parsed_page, score_pack, content_pack, entities, schema_parity_ok, schema_parity_errors, expected_gaps):
+def structural_issues(parsed_page, schema_comparison=None):
+    # Checks on the page markup rather than on its content; templates.json
+    # counts them per template cluster.
     technical = []
-    aeo_quality = []
     structured = []
+    if not parsed_page.get("flags", {}).get("has_hreflang"):
+        technical.append("hreflang ausente")
+    if schema_comparison is not None and not schema_comparison.get("existing_types"):
+        structured.append("Pagina nao publica dados estruturados")
+    return {"Technical SEO": technical, "Structured Data": structured}
+
+
+def build_issues(
+    parsed_page,
+    score_pack,
+    content_pack,
+    entities,
+    schema_parity_ok,
+    schema_parity_errors,
+    expected_gaps,
+    schema_comparison=None,
+    structural=None,
+    schema_errors=None,
+):
+    if structural is None:
+        structural = structural_issues(parsed_page, schema_comparison)
+    technical = list(structural.get("Technical SEO", []))
+    aeo_quality = []
+    structured = list(structural.get("Structured Data", []))
 
     if not parsed_page.get("meta_description"):
         technical.append("Meta description ausente")
     if len(parsed_page.get("headings", {}).get("h2", [])) < 1:
         technical.append("Poucos H2")
-    if not parsed_page.get("flags", {}).get("has_hreflang"):
-        technical.append("hreflang ausente")
-
     answer_failures = score_pack.get("breakdown", {}).get("answer_first", {}).get("rules_failed", [])
     if answer_failures:
         aeo_quality.append("Resposta direta ausente ou longa demais")
@@ -27,10 +49,16 @@ def build_issues(parsed_page, score_pack, content_pack, entities, schema_parity_
     if content_pack.get("faq") and not any(node.get("@type") == "FAQPage" for node in schema_graph):
         structured.append("Schema FAQPage ausente apesar de FAQ existir")
 
+    if schema_comparison is not None and schema_comparison.get("invalid_jsonld"):
+        structured.append("JSON-LD invalido na pagina")
+
     if not schema_parity_ok:
         structured.append("Paridade schema<->conteudo quebrada")
         structured.extend(schema_parity_errors)
 
+    # Generated nodes that do not match the schema.org vocabulary.
+    structured.extend(f"Schema fora do vocabulario schema.org: {error}" for error in schema_errors or [])
+
     return {
         "Technical SEO": sorted(set(technical)),
         "AEO/GEO Content Quality": sorted(set(aeo_quality)),
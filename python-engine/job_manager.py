@@ -0,0 +1,237 @@
+import collections
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from admission import Overloaded
+from aeo_pipeline import parse_fields
+from budget_engine import request_budget_from_body
+from gazetteer import parse_dictionaries
+from results_store import ResultStore
+from site_analysis import (
+    BatchAnalysis,
+    SiteAnalysis,
+    batch_options_from_body,
+    batch_urls_from_body,
+    crawl_options_from_body,
+)
+
+
+JOB_MAX_CONCURRENT = int(os.getenv("JOB_MAX_CONCURRENT", "2"))
+JOB_MAX_SECONDS = float(os.getenv("JOB_MAX_SECONDS", "1800"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "50"))
+# Queued jobs beyond this are refused (429) instead of piling up.
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "20"))
+JOB_RETRY_AFTER_SECONDS = 30
+# A stream ends before gunicorn's worker timeout; clients reconnect with
+# `after` (NDJSON) or Last-Event-ID (SSE) and continue where they stopped.
+JOB_STREAM_MAX_SECONDS = float(os.getenv("JOB_STREAM_MAX_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = 15.0
+
+TERMINAL_STATUSES = ("done", "failed", "cancelled")
+
+
+class Job:
+    def __init__(self, url: str, body: dict):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.body = dict(body)
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.warning = None
+        self.summary = None
+        self.pages_degraded = 0
+        self.analysis = None
+        self.store = ResultStore()
+        self.cancel_requested = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in TERMINAL_STATUSES
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait_for_progress(self, seen: int, timeout: float):
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.store) > seen or self.finished, timeout)
+
+    def run(self):
+        if self.cancel_requested.is_set():
+            self._finish("cancelled")
+            return
+        self.status = "running"
+        self.started_at = time.time()
+        self._notify()
+        # The deadline starts when the job runs, not while it waits in the queue.
+        budget = request_budget_from_body(self.body, max_seconds=JOB_MAX_SECONDS)
+        try:
+            fields = parse_fields(self.body.get("fields"))
+            dictionaries = parse_dictionaries(self.body.get("dictionary"))
+            if "urls" in self.body:
+                urls = batch_urls_from_body(self.body)
+                options = batch_options_from_body(self.body)
+                analysis = BatchAnalysis(
+                    urls, options, budget, store=self.store, fields=fields, dictionaries=dictionaries
+                )
+            else:
+                options = crawl_options_from_body(self.body)
+                analysis = SiteAnalysis(
+                    self.url, options, budget, store=self.store, fields=fields, dictionaries=dictionaries
+                )
+            self.analysis = analysis
+            pages = analysis.run()
+            try:
+                for _ in pages:
+                    self.pages_degraded = analysis.pages_degraded
+                    self._notify()
+                    if self.cancel_requested.is_set():
+                        break
+            finally:
+                pages.close()
+            self.summary = analysis.finish()
+            if not self.summary["pagesProcessed"]:
+                self.warning = (
+                    "Site protegido por anti-bot ou em manutencao. "
+                    "Nenhuma pagina foi analisada com crawler."
+                )
+            self._finish("cancelled" if self.cancel_requested.is_set() else "done")
+        except Exception as error:
+            self.error = str(error)
+            self._finish("failed")
+
+    def _finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+        self._notify()
+
+    def status_payload(self):
+        if "urls" in self.body:
+            max_pages = len(self.body["urls"])
+        else:
+            max_pages = crawl_options_from_body(self.body)["max_pages"]
+        # Failure records are in the store too; counted the way the final
+        # summary counts them (the analysis counts a failure before storing it).
+        pages_failed = self.analysis.pages_failed if self.analysis is not None else 0
+        payload = {
+            "jobId": self.id,
+            "url": self.url,
+            "status": self.status,
+            "pagesProcessed": len(self.store) - pages_failed,
+            "pagesFailed": pages_failed,
+            "pagesDegraded": self.pages_degraded,
+            "maxPages": max_pages,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+        if self.error:
+            payload["error"] = self.error
+        if self.warning:
+            payload["warning"] = self.warning
+        if self.summary is not None:
+            payload["analysisDetails"] = self.summary["analysisDetails"]
+            payload["entitiesSitewide"] = self.summary["entitiesSitewide"][:20]
+            payload["templates"] = self.summary["templates"]
+            if "aggregates" in self.summary:
+                payload["aggregates"] = self.summary["aggregates"]
+        return payload
+
+    def results_page(self, offset: int, limit: int, include_files: bool = False):
+        total = len(self.store)
+        offset = max(0, min(offset, total))
+        pages = []
+        for record in self.store.iter_records(offset, offset + limit):
+            page = dict(record["page"])
+            if include_files:
+                page["files"] = record["files"]
+            pages.append(page)
+        next_offset = offset + len(pages)
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "nextOffset": next_offset if next_offset < total or not self.finished else None,
+            "pages": pages,
+        }
+
+    def events(self, after: int = -1, max_seconds: float = JOB_STREAM_MAX_SECONDS):
+        # Yields ("page", index, page), ("heartbeat", None, status) and a final
+        # ("done", None, status) or ("reconnect", None, status) event.
+        deadline = time.monotonic() + max_seconds
+        seen = after + 1
+        while True:
+            total = len(self.store)
+            for index, record in enumerate(self.store.iter_records(seen, total), start=seen):
+                yield "page", index, record["page"]
+            seen = max(seen, total)
+            if self.finished and seen >= len(self.store):
+                yield "done", None, self.status_payload()
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield "reconnect", None, self.status_payload()
+                return
+            if not self.wait_for_progress(seen, min(JOB_HEARTBEAT_SECONDS, remaining)):
+                yield "heartbeat", None, self.status_payload()
+
+    def close(self):
+        self.store.close()
+
+
+class JobManager:
+    def __init__(
+        self,
+        max_concurrent: int = JOB_MAX_CONCURRENT,
+        ttl_seconds: float = JOB_TTL_SECONDS,
+        max_retained: int = JOB_MAX_RETAINED,
+        max_queued: int = JOB_MAX_QUEUED,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self.jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix="crawl-job")
+
+    def submit(self, url: str, body: dict):
+        with self._lock:
+            self._expire()
+            queued = sum(1 for job in self.jobs.values() if job.status == "queued")
+            if queued >= self.max_queued:
+                raise Overloaded("jobs", JOB_RETRY_AFTER_SECONDS)
+            job = Job(url, body)
+            self.jobs[job.id] = job
+        self._executor.submit(job.run)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel_requested.set()
+        return job
+
+    def _expire(self):
+        now = time.time()
+        finished = [job for job in self.jobs.values() if job.finished]
+        expired = [job for job in finished if now - job.finished_at > self.ttl_seconds]
+        overflow = len(self.jobs) - len(expired) - self.max_retained + 1
+        if overflow > 0:
+            expired.extend([job for job in finished if job not in expired][:overflow])
+        for job in expired:
+            self.jobs.pop(job.id, None)
+            job.close()
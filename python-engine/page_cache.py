@@ -0,0 +1,70 @@
+import collections
+import os
+import threading
+
+from aeo_pipeline import CONTENT_INPUTS, build_page_artifacts
+from artifact_store import default_artifact_store
+
+
+# Parsed pages of recent single-page analyses, by pageRef, so /rescore can
+# rerun the downstream stages without fetching or parsing again. Pages
+# analyzed by crawls are found through ENGINE_ARTIFACT_STORE when enabled.
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "256"))
+
+
+class CachedPage:
+    def __init__(self, parsed_page, inputs, content_pack=None, dictionaries=()):
+        self.parsed_page = parsed_page
+        self.inputs = inputs
+        self.content_pack = content_pack
+        self.dictionaries = dictionaries
+
+
+class PageCache:
+    def __init__(self, max_entries: int = PAGE_CACHE_MAX_ENTRIES, memo=None):
+        self.max_entries = max_entries
+        self.memo = memo
+        self.entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, page_ref: str, parsed_page, artifacts, dictionaries=()):
+        inputs = {name: artifacts[name] for name in CONTENT_INPUTS if name in artifacts}
+        entry = CachedPage(parsed_page, inputs, artifacts.get("content_pack"), dictionaries)
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self.entries[page_ref] = entry
+            self.entries.move_to_end(page_ref)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def recall(self, page_ref: str, dictionaries=()):
+        # `dictionaries` only applies to pages not analyzed by this process;
+        # a remembered page keeps the dictionaries of its analysis.
+        with self._lock:
+            entry = self.entries.get(page_ref)
+            if entry is not None:
+                self.entries.move_to_end(page_ref)
+        if entry is not None and entry.content_pack is not None:
+            return entry
+        if entry is not None:
+            # Analyzed with a `fields` projection that left content_pack out.
+            parsed_page = entry.parsed_page
+            dictionaries = entry.dictionaries
+        elif self.memo is not None:
+            # The pageRef of a crawled page is its parse key in the artifact store.
+            found, parsed_page = self.memo.get(page_ref)
+            if not found or not isinstance(parsed_page, dict):
+                return None
+        else:
+            return None
+        targets = tuple(name for name in CONTENT_INPUTS if name != "text_index") + ("content_pack",)
+        artifacts = build_page_artifacts(
+            parsed_page, fields=targets, memo=self.memo, page_key=page_ref, dictionaries=dictionaries
+        )
+        return self.remember(page_ref, parsed_page, artifacts, dictionaries)
+
+
+def default_page_cache():
+    return PageCache(memo=default_artifact_store())
@@ -1,9 +1,16 @@
-import json
-import re
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
 
+from boilerplate_engine import strip_template_blocks
+from structured_data_engine import (
+    build_structured_data_index,
+    extract_microdata,
+    extract_rdfa,
+    scan_jsonld_blocks,
+)
+from text_index import text_index_for
+
 
 BOILERPLATE_TAGS = ("nav", "footer", "aside", "script", "style", "noscript")
 
@@ -37,29 +44,35 @@ def _extract_breadcrumbs(soup: BeautifulSoup, base_url: str):
     return deduped[:20]
 
 
-def _extract_structured_data_raw(soup: BeautifulSoup):
-    raw = []
-    for script in soup.find_all("script", type=lambda value: value and "ld+json" in value):
-        text = (script.string or script.get_text() or "").strip()
-        if not text:
-            continue
-        try:
-            raw.append(json.loads(text))
-        except Exception:
-            continue
-    return raw
+def parse_page(html: str, final_url: str, template_fingerprints=None, budget=None):
+    html_truncated = False
+    if budget is not None:
+        html, html_truncated = budget.clamp_html(html)
 
+    # Structured data must be read before boilerplate removal: JSON-LD lives in
+    # <script> tags and microdata is often attached to nav/footer blocks.
+    jsonld_blocks, invalid_jsonld = scan_jsonld_blocks(html)
 
-def parse_page(html: str, final_url: str):
     soup = BeautifulSoup(html, "html.parser")
 
     title = _clean_text(soup.title.get_text(" ", strip=True) if soup.title else "")
     desc_tag = soup.find("meta", attrs={"name": "description"})
     meta_description = _clean_text(desc_tag.get("content") if desc_tag else "")
 
+    structured_data = build_structured_data_index(
+        jsonld_blocks,
+        microdata_items=extract_microdata(soup, html),
+        rdfa_items=extract_rdfa(soup, html),
+        invalid_jsonld=invalid_jsonld,
+    )
+
     for tag in soup.find_all(BOILERPLATE_TAGS):
         tag.decompose()
 
+    # Sitewide template blocks (div-based menus, cookie banners, footers) that
+    # the tag list above cannot catch.
+    template_blocks_removed = strip_template_blocks(soup, template_fingerprints) if template_fingerprints else 0
+
     main = soup.find("main") or soup.find("article") or soup.body or soup
 
     headings = {
@@ -73,23 +86,25 @@ def parse_page(html: str, final_url: str):
 
     lists = []
     for node in main.find_all(["ul", "ol"]):
-        items = [_clean_text(li.get_text(" ", strip=True)) for li in node.find_all("li")]
+        items = [_clean_text(li.get_text(" ", strip=True)) for li in node.find_all("li", limit=40)]
         items = [item for item in items if item]
         if items:
             lists.append(items[:20])
-    lists = lists[:20]
+        if len(lists) >= 20:
+            break
 
     tables = []
     for table in main.find_all("table"):
         rows = []
-        for row in table.find_all("tr"):
-            cells = [_clean_text(col.get_text(" ", strip=True)) for col in row.find_all(["th", "td"])]
+        for row in table.find_all("tr", limit=40):
+            cells = [_clean_text(col.get_text(" ", strip=True)) for col in row.find_all(["th", "td"], limit=16)]
             cells = [cell for cell in cells if cell]
             if cells:
                 rows.append(cells[:8])
         if rows:
             tables.append(rows[:20])
-    tables = tables[:10]
+        if len(tables) >= 10:
+            break
 
     links = []
     base_host = urlparse(final_url).netloc.lower()
@@ -116,6 +131,8 @@ def parse_page(html: str, final_url: str):
 
     page_source_flags = {
         "has_hreflang": bool(soup.find("link", attrs={"rel": lambda value: value and "alternate" in value})),
+        "template_blocks_removed": template_blocks_removed,
+        "html_truncated": html_truncated,
     }
 
     return {
@@ -127,7 +144,8 @@ def parse_page(html: str, final_url: str):
         "lists": lists,
         "tables": tables,
         "breadcrumbs": _extract_breadcrumbs(soup, final_url),
-        "structured_data_raw": _extract_structured_data_raw(soup),
+        "structured_data_raw": jsonld_blocks,
+        "structured_data": structured_data,
         "internal_links": internal_links[:250],
         "external_links": external_links[:250],
         "full_text": full_text[:60000],
@@ -135,8 +153,27 @@ def parse_page(html: str, final_url: str):
     }
 
 
-def expected_data_gaps(parsed_page):
-    text = (parsed_page.get("full_text") or "").lower()
+def empty_parsed_page(final_url: str, title: str = ""):
+    return {
+        "url": final_url,
+        "title": _clean_text(title),
+        "meta_description": "",
+        "headings": {"h1": [], "h2": [], "h3": []},
+        "paragraphs": [],
+        "lists": [],
+        "tables": [],
+        "breadcrumbs": [],
+        "structured_data_raw": [],
+        "structured_data": build_structured_data_index([]),
+        "internal_links": [],
+        "external_links": [],
+        "full_text": "",
+        "flags": {"has_hreflang": False, "template_blocks_removed": 0, "html_truncated": False},
+    }
+
+
+def expected_data_gaps(parsed_page, text_index=None):
+    text_index = text_index_for(parsed_page, text_index)
     gaps = []
     rules = [
         ("price", "Preco nao informado", ("preco", "r$", "valor", "a partir de")),
@@ -145,6 +182,6 @@ def expected_data_gaps(parsed_page):
         ("warranty", "Garantia nao informada", ("garantia", "anos de garantia")),
     ]
     for field, message, hints in rules:
-        if not any(hint in text for hint in hints):
+        if not any(hint in text_index.folded for hint in hints):
             gaps.append({"field": field, "message": message})
     return gaps
@@ -0,0 +1,157 @@
+import collections
+import gzip
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+from artifact_store import digest
+
+
+# Whole responses of the analyze endpoints, keyed by normalized URL and the
+# request options. Fresh entries are served directly; stale ones (within
+# RESPONSE_CACHE_STALE_SECONDS after the TTL) are served while a background
+# request refreshes them. RESPONSE_CACHE_TTL_SECONDS=0 disables the cache.
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_STALE_SECONDS = float(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "256"))
+RESPONSE_CACHE_REFRESH_WORKERS = 2
+GZIP_LEVEL = 6
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit((url or "").strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def cache_key(endpoint: str, body: dict, parsed=None) -> str:
+    # Every option that changes the response is part of the key; `cache`
+    # only controls the lookup. `parsed` holds the options the view reads
+    # from the body or the query string, as it parses them, so both forms
+    # (and equivalent spellings) share one key.
+    parsed = parsed or {}
+    options = {key: value for key, value in body.items() if key not in ("url", "cache") and key not in parsed}
+    if body.get("url"):
+        options["url"] = normalize_url(body["url"])
+    options.update(parsed)
+    return digest(endpoint, options)
+
+
+class CacheEntry:
+    def __init__(self, body_gzip: bytes, mimetype: str, headers: dict):
+        self.body_gzip = body_gzip
+        self.mimetype = mimetype
+        self.headers = headers
+        self.created = time.time()
+
+    def age(self) -> float:
+        return time.time() - self.created
+
+    def body(self) -> bytes:
+        return gzip.decompress(self.body_gzip)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        stale_seconds: float = RESPONSE_CACHE_STALE_SECONDS,
+        max_bytes: int = RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_bytes > 0
+
+    def lookup(self, key: str):
+        # Returns (entry, "HIT" | "STALE") or (None, "MISS").
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, "MISS"
+            age = entry.age()
+            if age > self.ttl_seconds + self.stale_seconds:
+                self._remove(key)
+                return None, "MISS"
+            self.entries.move_to_end(key)
+            return entry, "HIT" if age <= self.ttl_seconds else "STALE"
+
+    def put(self, key: str, body_gzip: bytes, mimetype: str, headers: dict | None = None):
+        # One entry may use at most a quarter of the cache.
+        if len(body_gzip) > self.max_bytes // 4:
+            return
+        with self._lock:
+            self._remove(key)
+            self.entries[key] = CacheEntry(body_gzip, mimetype, dict(headers or {}))
+            self.size += len(body_gzip)
+            while self.size > self.max_bytes and self.entries:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body_gzip)
+
+    def capture(self, key: str, chunks, mimetype: str, headers: dict | None = None):
+        # Passes a streamed body through unchanged and stores it once the
+        # stream completed; an aborted or oversized stream is not cached.
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        parts = []
+        size = 0
+        complete = False
+        try:
+            for chunk in chunks:
+                if parts is not None:
+                    parts.append(compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk))
+                    size += len(parts[-1])
+                    if size > self.max_bytes // 4:
+                        parts = None
+                yield chunk
+            complete = True
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            if complete and parts is not None:
+                parts.append(compressor.flush())
+                self.put(key, b"".join(parts), mimetype, headers)
+
+    def refresh(self, key: str, task):
+        # Runs `task` in the background unless a refresh of `key` is running.
+        with self._lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=RESPONSE_CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+                )
+
+        def run():
+            try:
+                task()
+            finally:
+                with self._lock:
+                    self.refreshing.discard(key)
+
+        self._executor.submit(run)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "bytes": self.size, "refreshing": len(self.refreshing)}
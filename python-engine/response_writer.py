@@ -0,0 +1,394 @@
+import itertools
+import json
+import zipfile
+import zlib
+
+from aeo_pipeline import LEGACY_FILENAMES, safe_filename
+from artifact_store import digest
+from site_schema import merge_site_graph
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip otherwise
+    zstandard = None
+
+
+STREAM_CHUNK_BYTES = 64 * 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+RESPONSE_ENCODINGS = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def dumps_json(value) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False)
+
+
+def coalesce(chunks, size: int = STREAM_CHUNK_BYTES):
+    # The writers yield many small fragments; sending each one as its own
+    # chunked-encoding frame costs a write per fragment. Join them into
+    # `size`-character blocks and encode once per block.
+    buffer = []
+    buffered = 0
+    try:
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= size:
+                yield "".join(buffer).encode("utf-8")
+                buffer.clear()
+                buffered = 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _json_array(items):
+    yield "["
+    first = True
+    for item in items:
+        if not first:
+            yield ","
+        first = False
+        yield dumps_json(item)
+    yield "]"
+
+
+def _joined_markdown(records):
+    # Same value as "\n\n".join(markdowns), emitted one page at a time.
+    yield '"'
+    first = True
+    for record in records:
+        if "markdown" not in record["page"]:
+            continue
+        if not first:
+            yield "\\n\\n"
+        first = False
+        yield dumps_json(record["page"]["markdown"])[1:-1]
+    yield '"'
+
+
+def stream_crawler_response(store, head: dict, tail: dict, extra_files):
+    # Writes the crawler response object field by field. Per-page data is read
+    # back from the ResultStore, so only one page is decoded at a time.
+    yield "{"
+    for key, value in head.items():
+        yield f"{dumps_json(key)}:{dumps_json(value)},"
+
+    yield '"optimizedContent":'
+    yield from _joined_markdown(store)
+
+    yield ',"files":'
+    page_files = (file for record in store for file in record["files"])
+    yield from _json_array(itertools.chain(page_files, extra_files))
+
+    yield ',"pages":'
+    yield from _json_array(record["page"] for record in store)
+
+    for key, value in tail.items():
+        yield f",{dumps_json(key)}:{dumps_json(value)}"
+    yield "}"
+
+
+def content_ref(data) -> str:
+    return digest(data)
+
+
+def compact_filename(page_url: str | None, filename: str):
+    # Legacy files share one name per page; compact output and zips prefix
+    # them with the page so every filename is unique.
+    if page_url and filename in LEGACY_FILENAMES:
+        return f"{safe_filename(page_url)}_{filename}"
+    return filename
+
+
+def records_table(records):
+    # List of objects -> {"columns", "rows"}: keys are written once instead of
+    # once per record. Nested lists of objects (sitewide evidence) are
+    # encoded the same way.
+    columns = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+    rows = [[_table_value(record.get(column)) for column in columns] for record in records]
+    return {"columns": columns, "rows": rows}
+
+
+def _table_value(value):
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return records_table(value)
+    return value
+
+
+def score_table(score_pack):
+    breakdown = score_pack.get("breakdown") or {}
+    columns = []
+    for item in breakdown.values():
+        for key in item:
+            if key not in columns:
+                columns.append(key)
+    rows = {name: [item.get(column) for column in columns] for name, item in breakdown.items()}
+    return {**score_pack, "breakdown": {"columns": columns, "rows": rows}}
+
+
+# Compact encodings per file, by filename suffix.
+TABLE_ENCODINGS = (
+    ("_entities.json", records_table),
+    ("entities_sitewide.json", records_table),
+    ("_score.json", score_table),
+)
+
+
+def _encoded_data(file):
+    # Returns (data, encoding name or None) for the compact form of a file.
+    for suffix, encoder in TABLE_ENCODINGS:
+        if file["filename"].endswith(suffix) and isinstance(file["data"], (list, dict)):
+            return encoder(file["data"]), "table"
+    return file["data"], None
+
+
+def _compact_file(page_url, file, ref, encoding=None):
+    compact = {"filename": compact_filename(page_url, file["filename"]), "mimeType": file["mimeType"], "ref": ref}
+    if encoding:
+        compact["encoding"] = encoding
+    return compact
+
+
+def _compact_page(page):
+    page = dict(page)
+    if "markdown" in page:
+        page["markdownRef"] = content_ref(page.pop("markdown"))
+    if "schema" in page:
+        page["schemaRef"] = content_ref(page.pop("schema"))
+    return page
+
+
+def _record_blobs(record):
+    for file in record["files"]:
+        yield _encoded_data(file)[0]
+    for key in ("markdown", "schema"):
+        if key in record["page"]:
+            yield record["page"][key]
+
+
+def compact_document(document: dict):
+    # Single-page form of stream_compact_response.
+    blobs = {}
+
+    def ref(data):
+        key = content_ref(data)
+        blobs.setdefault(key, data)
+        return key
+
+    compact = {key: value for key, value in document.items() if key not in ("optimizedContent", "files")}
+    compact["compact"] = True
+    if "optimizedContent" in document:
+        compact["optimizedContentRef"] = ref(document["optimizedContent"])
+    if "files" in document:
+        page_url = document.get("analyzedUrl")
+        compact["files"] = []
+        for file in document["files"]:
+            data, encoding = _encoded_data(file)
+            compact["files"].append(_compact_file(page_url, file, ref(data), encoding))
+    compact["blobs"] = blobs
+    return compact
+
+
+def stream_compact_response(store, head: dict, tail: dict, extra_files):
+    # Every distinct artifact is written once under `blobs`, keyed by its
+    # content hash; files and pages point to it (`ref`, `markdownRef`,
+    # `schemaRef`). Entity lists and scores use the table encodings above.
+    # optimizedContent is left out: it is the pages' markdown. Only the refs
+    # of each record are kept between the passes.
+    record_refs = []
+    extra_encoded = [_encoded_data(file) for file in extra_files]
+    extra_refs = [content_ref(data) for data, _ in extra_encoded]
+
+    def blob_entries():
+        seen = set()
+        for record in store:
+            encoded = [_encoded_data(file) for file in record["files"]]
+            record_refs.append([(content_ref(data), encoding) for data, encoding in encoded])
+            for data in _record_blobs(record):
+                key = content_ref(data)
+                if key not in seen:
+                    seen.add(key)
+                    yield f"{dumps_json(key)}:{dumps_json(data)}"
+        for (data, _), key in zip(extra_encoded, extra_refs):
+            if key not in seen:
+                seen.add(key)
+                yield f"{dumps_json(key)}:{dumps_json(data)}"
+
+    yield "{"
+    for key, value in {**head, "compact": True}.items():
+        yield f"{dumps_json(key)}:{dumps_json(value)},"
+
+    yield '"blobs":{'
+    for index, entry in enumerate(blob_entries()):
+        yield entry if index == 0 else "," + entry
+    yield "}"
+
+    def files():
+        for record, refs in zip(store, record_refs):
+            for file, (key, encoding) in zip(record["files"], refs):
+                yield _compact_file(record["page"].get("url"), file, key, encoding)
+        for file, (_, encoding), key in zip(extra_files, extra_encoded, extra_refs):
+            yield _compact_file(None, file, key, encoding)
+
+    yield ',"files":'
+    yield from _json_array(files())
+
+    yield ',"pages":'
+    yield from _json_array(_compact_page(record["page"]) for record in store)
+
+    for key, value in tail.items():
+        if key == "entitiesSitewide":
+            value = records_table(value)
+        yield f",{dumps_json(key)}:{dumps_json(value)}"
+    yield "}"
+
+
+class StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._zlib = None
+        else:
+            self._zstd = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return (self._zstd or self._zlib).compress(data)
+
+    def sync(self) -> bytes:
+        if self._zstd is not None:
+            return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return (self._zstd or self._zlib).flush()
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    compressor = StreamCompressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_chunks(chunks, encoding: str, flush_each: bool = False):
+    # `flush_each` keeps line-oriented streams (NDJSON) readable as they come.
+    compressor = StreamCompressor(encoding)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            if flush_each:
+                data += compressor.sync()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+class _ZipSink:
+    # Write-only target for ZipFile; without tell/seek zipfile writes data
+    # descriptors, so entries can be streamed as they are produced.
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    # `entries` yields (name, chunks); chunks are str or bytes.
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, compresslevel=GZIP_LEVEL) as archive:
+        for name, chunks in entries:
+            with archive.open(name, "w") as handle:
+                for chunk in chunks:
+                    handle.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                    if sink.chunks:
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _file_text(data):
+    if isinstance(data, str):
+        return data
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def zip_entries(document: dict, store=None, extra_files=()):
+    # content.txt, analysis.json (the response without files/markdown) and
+    # one entry per file, as the middleware used to build it.
+    extra_files = list(extra_files)
+    if store is None:
+        yield "content.txt", [document.get("optimizedContent") or document.get("summary") or ""]
+        analysis = {key: value for key, value in document.items() if key not in ("optimizedContent", "files")}
+        yield "analysis.json", [_file_text(analysis)]
+        records = [{"page": {"url": document.get("analyzedUrl")}, "files": document.get("files") or []}]
+    else:
+        yield "content.txt", _joined_text(store)
+        pages = (
+            {key: value for key, value in record["page"].items() if key not in ("markdown", "schema")}
+            for record in store
+        )
+        yield "analysis.json", _crawler_analysis_json(document, pages)
+        records = store
+
+    names = set()
+    for record in itertools.chain(records, [{"page": {}, "files": list(extra_files)}]):
+        for file in record["files"]:
+            name = compact_filename(record["page"].get("url"), file["filename"])
+            if name in names:
+                continue
+            names.add(name)
+            yield name, [_file_text(file["data"])]
+
+    sitewide = next((file["data"] for file in extra_files if file["filename"] == "schema_sitewide.json"), None)
+    if store is not None and sitewide:
+        # The whole site as one graph: sitewide nodes plus every page delta.
+        merged = merge_site_graph(sitewide, (record["page"].get("schema") for record in store))
+        yield "schema_merged.json", [_file_text(merged)]
+
+
+def _joined_text(records):
+    first = True
+    for record in records:
+        if "markdown" not in record["page"]:
+            continue
+        if not first:
+            yield "\n\n"
+        first = False
+        yield record["page"]["markdown"]
+
+
+def _crawler_analysis_json(document, pages):
+    yield "{"
+    for key, value in document.items():
+        yield f"{dumps_json(key)}:{dumps_json(value)},"
+    yield '"pages":'
+    yield from _json_array(pages)
+    yield "}"
@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import threading
+import weakref
+import zlib
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+
+ENGINE_MEMORY_CEILING_MB = float(os.getenv("ENGINE_MEMORY_CEILING_MB", "64"))
+# Shared by every store of the process (running and retained jobs,
+# concurrent requests), so the total kept in memory stays bounded however
+# many stores are open.
+ENGINE_MEMORY_TOTAL_MB = float(os.getenv("ENGINE_MEMORY_TOTAL_MB", "256"))
+ENGINE_SPILL_DIR = os.getenv("ENGINE_SPILL_DIR", "") or None
+COMPRESSION_LEVEL = 1
+
+
+def _dumps(record) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+class MemoryBudget:
+    # Byte counter shared between stores.
+    def __init__(self, max_mb: float = ENGINE_MEMORY_TOTAL_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.used + size > self.max_bytes:
+                return False
+            self.used += size
+            return True
+
+    def release(self, size: int):
+        with self._lock:
+            self.used = max(0, self.used - size)
+
+    def stats(self):
+        return {"usedBytes": self.used, "maxBytes": self.max_bytes}
+
+
+process_memory = MemoryBudget()
+
+
+def _release(budget: MemoryBudget, reserved: list):
+    budget.release(reserved[0])
+    reserved[0] = 0
+
+
+class ResultStore:
+    # Append-only store of JSON records (crawled pages or per-page artifacts).
+    # Records are zlib-compressed; once the store passes its own ceiling, or
+    # the process-wide budget is used up, new records go to an anonymous
+    # segment file on disk.
+    def __init__(
+        self,
+        memory_ceiling_mb: float = ENGINE_MEMORY_CEILING_MB,
+        spill_dir: str | None = ENGINE_SPILL_DIR,
+        budget: MemoryBudget | None = None,
+    ):
+        self.memory_ceiling = int(memory_ceiling_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        self.budget = budget if budget is not None else process_memory
+        # Returned to the budget on close, or when a store that was never
+        # closed is collected.
+        self._reserved = [0]
+        self._release = weakref.finalize(self, _release, self.budget, self._reserved)
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self._blobs = []
+        self._index = []
+        self._segment = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def append(self, record):
+        blob = zlib.compress(_dumps(record), COMPRESSION_LEVEL)
+        with self._lock:
+            if (
+                self._segment is None
+                and self.memory_bytes + len(blob) <= self.memory_ceiling
+                and self.budget.reserve(len(blob))
+            ):
+                self._index.append(("memory", len(self._blobs), len(blob)))
+                self._blobs.append(blob)
+                self.memory_bytes += len(blob)
+                self._reserved[0] += len(blob)
+            else:
+                if self._segment is None:
+                    self._segment = tempfile.TemporaryFile(dir=self.spill_dir, prefix="seokiller-", suffix=".seg")
+                self._segment.seek(0, os.SEEK_END)
+                offset = self._segment.tell()
+                self._segment.write(blob)
+                self._index.append(("disk", offset, len(blob)))
+                self.disk_bytes += len(blob)
+            return len(self._index) - 1
+
+    def get(self, position: int):
+        with self._lock:
+            location, offset, length = self._index[position]
+            if location == "memory":
+                blob = self._blobs[offset]
+            else:
+                self._segment.seek(offset)
+                blob = self._segment.read(length)
+        return _loads(zlib.decompress(blob))
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def iter_records(self, start: int = 0, stop: int | None = None):
+        stop = len(self._index) if stop is None else min(stop, len(self._index))
+        for position in range(start, stop):
+            yield self.get(position)
+
+    def stats(self):
+        return {
+            "records": len(self._index),
+            "memoryBytes": self.memory_bytes,
+            "diskBytes": self.disk_bytes,
+            "spilled": self._segment is not None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._release()
+            self._blobs = []
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,3 +1,27 @@
+from schema_vocabulary import DATA_TYPES, VOCABULARY
+from structured_data_engine import existing_nodes
+
+
+REUSABLE_ORGANIZATION_FIELDS = ("name", "legalName", "url", "logo", "sameAs")
+TEXT_TYPES = frozenset(name for name in DATA_TYPES if name not in ("Number", "Integer", "Boolean"))
+URL_TYPES = frozenset(("URL",))
+
+
+def _existing_organization(parsed_page):
+    for node in existing_nodes(parsed_page.get("structured_data"), "Organization"):
+        if isinstance(node.get("name"), str) and node.get("name").strip():
+            return {field: node[field] for field in REUSABLE_ORGANIZATION_FIELDS if node.get(field)}
+    return None
+
+
+def _existing_breadcrumb_items(parsed_page):
+    for node in existing_nodes(parsed_page.get("structured_data"), "BreadcrumbList"):
+        items = node.get("itemListElement")
+        if isinstance(items, list) and items:
+            return items
+    return None
+
+
 def build_schema_ld(parsed_page, content_pack, intent, entities):
     url = parsed_page.get("url")
     title = parsed_page.get("title") or "Pagina"
@@ -32,9 +56,17 @@ def build_schema_ld(parsed_page, content_pack, intent, entities):
                 ],
             }
         )
+    else:
+        existing_crumbs = _existing_breadcrumb_items(parsed_page)
+        if existing_crumbs:
+            graph.append({"@type": "BreadcrumbList", "@id": f"{url}#breadcrumbs", "itemListElement": existing_crumbs})
 
+    # Markup already published by the site is more reliable than an entity guess.
+    existing_organization = _existing_organization(parsed_page)
     organization = next((entity for entity in entities if entity.get("entity_type") == "Organization"), None)
-    if organization:
+    if existing_organization:
+        graph.append({"@type": "Organization", "@id": f"{url}#organization", **existing_organization})
+    elif organization:
         graph.append(
             {
                 "@type": "Organization",
@@ -88,17 +120,16 @@ def build_schema_ld(parsed_page, content_pack, intent, entities):
     return {"@context": "https://schema.org", "@graph": graph}
 
 
-def check_schema_parity(schema, content_pack):
-    faq_nodes = [node for node in schema.get("@graph", []) if node.get("@type") == "FAQPage"]
-    content_faq = content_pack.get("faq") or []
-
-    if not faq_nodes and not content_faq:
-        return True, []
-    if content_faq and not faq_nodes:
-        return False, ["Schema FAQPage ausente apesar de FAQ existir"]
+def _faq_parity(faq_node, content_faq):
+    if faq_node is None and not content_faq:
+        return []
+    if faq_node is None:
+        return ["Schema FAQPage ausente apesar de FAQ existir"]
 
     errors = []
-    schema_faq = faq_nodes[0].get("mainEntity", [])
+    schema_faq = faq_node.get("mainEntity", [])
+    if not isinstance(schema_faq, list):
+        schema_faq = [schema_faq]
 
     if len(schema_faq) != len(content_faq):
         errors.append("Quantidade de perguntas no schema difere do conteudo")
@@ -106,11 +137,117 @@ def check_schema_parity(schema, content_pack):
     for index, qa in enumerate(content_faq):
         if index >= len(schema_faq):
             break
-        schema_item = schema_faq[index]
+        schema_item = schema_faq[index] if isinstance(schema_faq[index], dict) else {}
         if schema_item.get("name") != qa.get("question"):
             errors.append(f"Pergunta {index + 1} no schema difere do conteudo")
         answer = ((schema_item.get("acceptedAnswer") or {}).get("text") or "").strip()
         if answer != (qa.get("answer") or "").strip():
             errors.append(f"Resposta {index + 1} no schema difere do conteudo")
+    return errors
+
+
+def _is_url(value: str) -> bool:
+    return value.startswith(("http://", "https://", "/"))
+
+
+def _value_errors(value, expected, path: str, errors, counts):
+    # One value against the expected types of its property; nested nodes are
+    # validated in the same traversal.
+    if isinstance(value, list):
+        for item in value:
+            _value_errors(item, expected, path, errors, counts)
+        return
+    if value is None:
+        errors.append(f"{path}: valor vazio")
+    elif isinstance(value, bool):
+        if "Boolean" not in expected:
+            errors.append(f"{path}: booleano nao esperado")
+    elif isinstance(value, (int, float)):
+        if not expected & {"Number", "Integer", "Text"} or (isinstance(value, float) and not expected & {"Number", "Text"}):
+            errors.append(f"{path}: numero nao esperado")
+    elif isinstance(value, str):
+        # Text-like types take any string; a URL also stands for a node
+        # referenced by its IRI.
+        if not expected & TEXT_TYPES and not _is_url(value):
+            errors.append(f"{path}: texto onde se espera {'/'.join(sorted(expected))}")
+        elif expected == URL_TYPES and value and not _is_url(value):
+            errors.append(f"{path}: URL invalida")
+    elif isinstance(value, dict):
+        _node_errors(value, path, errors, counts, expected)
+    else:
+        errors.append(f"{path}: valor invalido")
+
+
+def _node_errors(node, path: str, errors, counts, expected=None):
+    types = node.get("@type")
+    types = [types] if isinstance(types, str) else [value for value in types or [] if isinstance(value, str)]
+    if not types:
+        if "@id" not in node:
+            errors.append(f"{path}: objeto sem @type")
+        return
+    counts["nodes"] += 1
+    compiled = []
+    for name in types:
+        if name in VOCABULARY:
+            compiled.append(VOCABULARY[name])
+        else:
+            errors.append(f"{path}: tipo desconhecido {name}")
+    if not compiled:
+        return
+    if "FAQPage" in types and counts["faq_node"] is None:
+        counts["faq_node"] = node
+    counts["faq_nodes"] += "FAQPage" in types
+    if expected is not None and not any(schema_type.ancestors & expected for schema_type in compiled):
+        errors.append(f"{path}: {'/'.join(types)} onde se espera {'/'.join(sorted(expected))}")
+    for key, value in node.items():
+        if key.startswith("@"):
+            continue
+        allowed = None
+        for schema_type in compiled:
+            if key in schema_type.properties:
+                allowed = (allowed or frozenset()) | schema_type.properties[key]
+        if allowed is None:
+            errors.append(f"{path}: propriedade desconhecida '{key}'")
+        else:
+            _value_errors(value, allowed, f"{path}.{key}", errors, counts)
+
+
+def validate_schema(schema, content_pack):
+    # Single pass over the generated graph: every node is checked against the
+    # compiled schema.org vocabulary and the first FAQPage is compared with
+    # the content FAQ. Parity check, scoring, issues and the test harness
+    # all read this result.
+    errors = []
+    counts = {"nodes": 0, "faq_nodes": 0, "faq_node": None}
+    for index, node in enumerate(schema.get("@graph", [])):
+        if isinstance(node, dict):
+            label = node.get("@type") if isinstance(node.get("@type"), str) else f"@graph[{index}]"
+            _node_errors(node, label, errors, counts)
+        else:
+            errors.append(f"@graph[{index}]: no invalido")
+    parity_errors = _faq_parity(counts["faq_node"], content_pack.get("faq") or [])
+    return {
+        "parity_ok": not parity_errors,
+        "parity_errors": parity_errors,
+        "faq_nodes": counts["faq_nodes"],
+        "nodes": counts["nodes"],
+        "errors": list(dict.fromkeys(errors)),
+    }
+
+
+def check_schema_parity(schema, content_pack, validation=None):
+    validation = validation or validate_schema(schema, content_pack)
+    return validation["parity_ok"], validation["parity_errors"]
+
 
-    return len(errors) == 0, errors
+def compare_existing_schema(schema, parsed_page):
+    structured_data = parsed_page.get("structured_data") or {}
+    existing_types = set(structured_data.get("types") or [])
+    generated_types = {node.get("@type") for node in schema.get("@graph", []) if node.get("@type")}
+    return {
+        "existing_types": sorted(existing_types),
+        "generated_types": sorted(generated_types),
+        "missing_on_page": sorted(generated_types - existing_types),
+        "only_on_page": sorted(existing_types - generated_types),
+        "invalid_jsonld": structured_data.get("invalid_jsonld", 0),
+    }
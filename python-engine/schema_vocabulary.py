@@ -0,0 +1,245 @@
+# Subset of the schema.org vocabulary covering the types the engine
+# generates or reuses from the page: type -> (parent types, {property:
+# expected types}). Properties are inherited; compile_vocabulary flattens
+# them once at import so validation is a dict lookup per property.
+DATA_TYPES = ("Text", "URL", "Number", "Integer", "Boolean", "Date", "DateTime", "Time", "Duration")
+
+SCHEMA_TYPES = {
+    "Thing": (
+        (),
+        {
+            "name": ("Text",),
+            "alternateName": ("Text",),
+            "description": ("Text",),
+            "url": ("URL",),
+            "image": ("ImageObject", "URL"),
+            "sameAs": ("URL",),
+            "identifier": ("PropertyValue", "Text", "URL"),
+            "mainEntityOfPage": ("CreativeWork", "URL"),
+            "potentialAction": ("Action",),
+        },
+    ),
+    "CreativeWork": (
+        ("Thing",),
+        {
+            "headline": ("Text",),
+            "text": ("Text",),
+            "author": ("Organization", "Person"),
+            "publisher": ("Organization", "Person"),
+            "creator": ("Organization", "Person"),
+            "about": ("Thing",),
+            "mainEntity": ("Thing",),
+            "inLanguage": ("Language", "Text"),
+            "keywords": ("DefinedTerm", "Text", "URL"),
+            "datePublished": ("Date", "DateTime"),
+            "dateModified": ("Date", "DateTime"),
+            "isPartOf": ("CreativeWork", "URL"),
+            "hasPart": ("CreativeWork",),
+            "thumbnailUrl": ("URL",),
+        },
+    ),
+    "WebPage": (
+        ("CreativeWork",),
+        {
+            "breadcrumb": ("BreadcrumbList", "Text"),
+            "primaryImageOfPage": ("ImageObject",),
+            "lastReviewed": ("Date",),
+            "relatedLink": ("URL",),
+            "significantLink": ("URL",),
+            "speakable": ("SpeakableSpecification", "URL"),
+        },
+    ),
+    "FAQPage": (("WebPage",), {}),
+    "QAPage": (("WebPage",), {}),
+    "WebSite": (("CreativeWork",), {"issn": ("Text",)}),
+    "Comment": (("CreativeWork",), {"upvoteCount": ("Integer",), "downvoteCount": ("Integer",)}),
+    "Question": (
+        ("Comment",),
+        {
+            "acceptedAnswer": ("Answer", "ItemList"),
+            "suggestedAnswer": ("Answer", "ItemList"),
+            "answerCount": ("Integer",),
+            "eduQuestionType": ("Text",),
+        },
+    ),
+    "Answer": (("Comment",), {"answerExplanation": ("Comment", "WebContent")}),
+    "WebContent": (("CreativeWork",), {}),
+    "HowTo": (
+        ("CreativeWork",),
+        {
+            "step": ("CreativeWork", "HowToSection", "HowToStep", "Text"),
+            "totalTime": ("Duration",),
+            "prepTime": ("Duration",),
+            "performTime": ("Duration",),
+            "estimatedCost": ("MonetaryAmount", "Text"),
+            "supply": ("HowToSupply", "Text"),
+            "tool": ("HowToTool", "Text"),
+            "yield": ("QuantitativeValue", "Text"),
+        },
+    ),
+    "HowToSection": (("CreativeWork", "ItemList", "ListItem"), {"steps": ("CreativeWork", "ItemList", "Text")}),
+    "HowToStep": (("CreativeWork", "ItemList", "ListItem"), {}),
+    "HowToSupply": (("Intangible",), {"requiredQuantity": ("QuantitativeValue", "Text")}),
+    "HowToTool": (("Intangible",), {"requiredQuantity": ("QuantitativeValue", "Text")}),
+    "MediaObject": (
+        ("CreativeWork",),
+        {"contentUrl": ("URL",), "encodingFormat": ("Text", "URL"), "width": ("Distance", "QuantitativeValue"), "height": ("Distance", "QuantitativeValue")},
+    ),
+    "ImageObject": (("MediaObject",), {"caption": ("MediaObject", "Text")}),
+    "Intangible": (("Thing",), {}),
+    "ItemList": (
+        ("Intangible",),
+        {"itemListElement": ("ListItem", "Text", "Thing"), "numberOfItems": ("Integer",), "itemListOrder": ("Text",)},
+    ),
+    "BreadcrumbList": (("ItemList",), {}),
+    "ListItem": (
+        ("Intangible",),
+        {"item": ("Thing",), "position": ("Integer", "Text"), "nextItem": ("ListItem",), "previousItem": ("ListItem",)},
+    ),
+    "SpeakableSpecification": (("Intangible",), {"cssSelector": ("Text",), "xpath": ("Text",)}),
+    "DefinedTerm": (("Intangible",), {"termCode": ("Text",)}),
+    "Language": (("Intangible",), {}),
+    "Brand": (("Intangible",), {"logo": ("ImageObject", "URL"), "slogan": ("Text",)}),
+    "StructuredValue": (("Intangible",), {}),
+    "PropertyValue": (("StructuredValue",), {"propertyID": ("Text", "URL"), "value": ("Boolean", "Number", "StructuredValue", "Text")}),
+    "QuantitativeValue": (("StructuredValue",), {"value": ("Boolean", "Number", "StructuredValue", "Text"), "unitCode": ("Text", "URL"), "unitText": ("Text",)}),
+    "Distance": (("Intangible",), {}),
+    "MonetaryAmount": (("StructuredValue",), {"currency": ("Text",), "value": ("Boolean", "Number", "StructuredValue", "Text")}),
+    "GeoCoordinates": (("StructuredValue",), {"latitude": ("Number", "Text"), "longitude": ("Number", "Text")}),
+    "ContactPoint": (
+        ("StructuredValue",),
+        {
+            "telephone": ("Text",),
+            "email": ("Text",),
+            "contactType": ("Text",),
+            "areaServed": ("AdministrativeArea", "Place", "Text"),
+            "availableLanguage": ("Language", "Text"),
+        },
+    ),
+    "PostalAddress": (
+        ("ContactPoint",),
+        {
+            "streetAddress": ("Text",),
+            "addressLocality": ("Text",),
+            "addressRegion": ("Text",),
+            "postalCode": ("Text",),
+            "addressCountry": ("Country", "Text"),
+        },
+    ),
+    "OpeningHoursSpecification": (
+        ("StructuredValue",),
+        {"dayOfWeek": ("DayOfWeek", "URL", "Text"), "opens": ("Time",), "closes": ("Time",)},
+    ),
+    "DayOfWeek": (("Intangible",), {}),
+    "Action": (("Thing",), {"target": ("EntryPoint", "URL"), "query-input": ("Text",)}),
+    "SearchAction": (("Action",), {"query": ("Text",)}),
+    "EntryPoint": (("Intangible",), {"urlTemplate": ("Text",)}),
+    "Person": (
+        ("Thing",),
+        {"jobTitle": ("Text",), "worksFor": ("Organization",), "affiliation": ("Organization",), "email": ("Text",)},
+    ),
+    "Organization": (
+        ("Thing",),
+        {
+            "legalName": ("Text",),
+            "logo": ("ImageObject", "URL"),
+            "address": ("PostalAddress", "Text"),
+            "telephone": ("Text",),
+            "email": ("Text",),
+            "contactPoint": ("ContactPoint",),
+            "brand": ("Brand", "Organization"),
+            "founder": ("Person",),
+            "foundingDate": ("Date",),
+            "parentOrganization": ("Organization",),
+            "subOrganization": ("Organization",),
+            "department": ("Organization",),
+            "areaServed": ("AdministrativeArea", "Place", "Text"),
+            "slogan": ("Text",),
+            "taxID": ("Text",),
+            "vatID": ("Text",),
+        },
+    ),
+    "Place": (
+        ("Thing",),
+        {
+            "address": ("PostalAddress", "Text"),
+            "geo": ("GeoCoordinates",),
+            "telephone": ("Text",),
+            "hasMap": ("Map", "URL"),
+            "openingHoursSpecification": ("OpeningHoursSpecification",),
+        },
+    ),
+    "AdministrativeArea": (("Place",), {}),
+    "Country": (("AdministrativeArea",), {}),
+    "Map": (("CreativeWork",), {}),
+    "LocalBusiness": (
+        ("Organization", "Place"),
+        {"openingHours": ("Text",), "priceRange": ("Text",), "currenciesAccepted": ("Text",), "paymentAccepted": ("Text",)},
+    ),
+    "AutomotiveBusiness": (("LocalBusiness",), {}),
+    "AutoDealer": (("AutomotiveBusiness",), {}),
+    "AutoRepair": (("AutomotiveBusiness",), {}),
+    "Product": (
+        ("Thing",),
+        {
+            "brand": ("Brand", "Organization"),
+            "manufacturer": ("Organization",),
+            "model": ("ProductModel", "Text"),
+            "sku": ("Text",),
+            "offers": ("Offer",),
+            "category": ("Text", "Thing", "URL"),
+        },
+    ),
+    "ProductModel": (("Product",), {}),
+    "Vehicle": (("Product",), {"vehicleModelDate": ("Date",), "fuelType": ("QualitativeValue", "Text", "URL")}),
+    "Car": (("Vehicle",), {}),
+    "QualitativeValue": (("Intangible",), {}),
+    "Offer": (
+        ("Intangible",),
+        {
+            "price": ("Number", "Text"),
+            "priceCurrency": ("Text",),
+            "availability": ("ItemAvailability", "URL"),
+            "itemOffered": ("Product", "Service", "Thing"),
+            "seller": ("Organization", "Person"),
+            "validFrom": ("Date", "DateTime"),
+            "priceValidUntil": ("Date",),
+        },
+    ),
+    "ItemAvailability": (("Intangible",), {}),
+    "Service": (("Intangible",), {"provider": ("Organization", "Person"), "serviceType": ("Text",), "areaServed": ("AdministrativeArea", "Place", "Text")}),
+}
+
+
+class CompiledType:
+    def __init__(self, name: str, ancestors, properties):
+        self.name = name
+        self.ancestors = ancestors
+        self.properties = properties
+
+
+def compile_vocabulary(types):
+    # Flattens inheritance: every type knows all its ancestors (itself
+    # included) and every property it accepts with the expected types.
+    compiled = {}
+
+    def build(name):
+        if name in compiled:
+            return compiled[name]
+        parents, own_properties = types[name]
+        ancestors = {name}
+        properties = {}
+        for parent in parents:
+            parent_type = build(parent)
+            ancestors |= parent_type.ancestors
+            properties.update(parent_type.properties)
+        properties.update((key, frozenset(expected)) for key, expected in own_properties.items())
+        compiled[name] = CompiledType(name, frozenset(ancestors), properties)
+        return compiled[name]
+
+    for name in types:
+        build(name)
+    return compiled
+
+
+VOCABULARY = compile_vocabulary(SCHEMA_TYPES)
@@ -1,25 +1,18 @@
 import re
 
-
-QUESTION_PREFIXES = ("como", "quanto", "quais", "onde", "quando", "qual", "quem")
+from content_model import blocks_text, content_blocks, question_headings, standalone_paragraphs
+from schema_engine import validate_schema
 
 
-def _paragraphs_from_markdown(markdown: str):
-    blocks = [block.strip() for block in markdown.split("\n\n") if block.strip()]
-    paragraphs = []
-    for block in blocks:
-        if block.startswith("#") or block.startswith("|") or block.startswith("- ") or block.startswith("###"):
-            continue
-        paragraphs.append(block)
-    return paragraphs
+QUESTION_PREFIXES = ("como", "quanto", "quais", "onde", "quando", "qual", "quem")
 
 
-def compute_aeo_score(intent, primary_question, entities, content_pack, schema, secondary_questions):
-    markdown = content_pack.get("markdown", "")
-    lines = markdown.splitlines()
+def compute_aeo_score(intent, primary_question, entities, content_pack, schema, secondary_questions, validation=None):
+    blocks = content_blocks(content_pack)
+    validation = validation or validate_schema(schema, content_pack)
     direct_answer = content_pack.get("direct_answer", "")
     faq = content_pack.get("faq", [])
-    paragraphs = _paragraphs_from_markdown(markdown)
+    paragraphs = standalone_paragraphs(blocks)
 
     breakdown = {
         "answer_first": {"score": 0, "max": 20, "rules_failed": []},
@@ -35,12 +28,12 @@ def compute_aeo_score(intent, primary_question, entities, content_pack, schema,
     else:
         breakdown["answer_first"]["rules_failed"].append("Resposta direta ausente ou fora de 1-2 frases")
 
-    if any(line.strip().lower().startswith("**resposta direta:**") for line in lines[:6]):
+    if any(block["type"] == "answer" for block in blocks[:2]):
         breakdown["answer_first"]["score"] += 8
     else:
         breakdown["answer_first"]["rules_failed"].append("Resposta direta nao esta no topo")
 
-    heading_lines = re.findall(r"^###\s+(.+)$", markdown, flags=re.M)
+    heading_lines = question_headings(blocks)
     if heading_lines:
         prefix_hits = sum(1 for heading in heading_lines if heading.strip().lower().startswith(QUESTION_PREFIXES))
         breakdown["extractability"]["score"] += min(10, prefix_hits * 2)
@@ -49,12 +42,12 @@ def compute_aeo_score(intent, primary_question, entities, content_pack, schema,
     else:
         breakdown["extractability"]["rules_failed"].append("Faltam headings em formato pergunta")
 
-    if any(line.startswith("- ") for line in lines):
+    if any(block["type"] == "list" and not block["ordered"] and block["items"] for block in blocks):
         breakdown["extractability"]["score"] += 5
     else:
         breakdown["extractability"]["rules_failed"].append("Faltam listas curtas")
 
-    if "|" in markdown:
+    if any(block["type"] == "table" for block in blocks):
         breakdown["extractability"]["score"] += 5
     else:
         breakdown["extractability"]["rules_failed"].append("Falta tabela simples de entidades")
@@ -69,17 +62,17 @@ def compute_aeo_score(intent, primary_question, entities, content_pack, schema,
         breakdown["entity_clarity"]["rules_failed"].append("Baixa diversidade de tipos de entidade")
 
     covered = 0
-    markdown_lower = markdown.lower()
+    text_lower = blocks_text(blocks).lower()
     for question in secondary_questions:
         first_token = question.split()[0].lower()
-        if first_token in markdown_lower:
+        if first_token in text_lower:
             covered += 1
     ratio = covered / max(1, len(secondary_questions))
     breakdown["coverage"]["score"] = min(20, int(round(ratio * 20)))
     if ratio < 0.6:
         breakdown["coverage"]["rules_failed"].append("Cobertura baixa das intencoes secundarias")
 
-    faq_nodes = [node for node in schema.get("@graph", []) if node.get("@type") == "FAQPage"]
+    faq_nodes = validation["faq_nodes"]
     if faq and faq_nodes:
         breakdown["schema_parity"]["score"] += 10
     elif faq and not faq_nodes:
@@ -92,21 +85,8 @@ def compute_aeo_score(intent, primary_question, entities, content_pack, schema,
     else:
         breakdown["schema_parity"]["rules_failed"].append("Schema vazio")
 
-    mismatch = False
-    if faq_nodes and faq:
-        main_entities = faq_nodes[0].get("mainEntity", [])
-        if len(main_entities) != len(faq):
-            mismatch = True
-        else:
-            for index, qa in enumerate(faq):
-                schema_item = main_entities[index]
-                if schema_item.get("name") != qa.get("question"):
-                    mismatch = True
-                    break
-                schema_answer = ((schema_item.get("acceptedAnswer") or {}).get("text") or "")
-                if schema_answer != qa.get("answer"):
-                    mismatch = True
-                    break
+    # A missing FAQPage already failed above; parity only compares existing nodes.
+    mismatch = bool(faq and faq_nodes) and not validation["parity_ok"]
 
     if mismatch:
         breakdown["schema_parity"]["rules_failed"].append("Paridade schema-conteudo quebrada")
@@ -0,0 +1,320 @@
+import collections
+import os
+
+from aeo_pipeline import InternalLinkGraph, to_download_files
+from artifact_store import default_artifact_store
+from boilerplate_engine import BOILERPLATE_MIN_PAGES, load_boilerplate_cache
+from crawl_analysis import CrawlAnalysisStream
+from crawler_async import BATCH_PER_HOST, crawl_site_stream, fetch_urls_stream
+from entity_engine import aggregate_sitewide_entities
+from fact_matrix import FACT_MATRIX, FactMatrix
+from results_store import ResultStore
+from site_schema import SITEWIDE_SCHEMA, SitewideSchema
+
+
+DEFAULT_CRAWL_TIMEOUT = int(os.getenv("ENGINE_REQUEST_TIMEOUT", "180"))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "500"))
+
+
+def crawl_options_from_body(body):
+    return {
+        "max_pages": int(body.get("maxPages") or 15),
+        "max_tasks": int(body.get("maxTasks") or 6),
+        "delay": float(body.get("delay") or 0.4),
+        "timeout": int(body.get("timeout") or DEFAULT_CRAWL_TIMEOUT),
+    }
+
+
+def batch_options_from_body(body):
+    return {
+        "max_tasks": int(body.get("maxTasks") or 8),
+        "per_host": int(body.get("perHost") or BATCH_PER_HOST),
+        "timeout": int(body.get("timeout") or DEFAULT_CRAWL_TIMEOUT),
+    }
+
+
+def batch_urls_from_body(body):
+    urls = body.get("urls")
+    if not isinstance(urls, list):
+        raise ValueError("Campo 'urls' deve ser uma lista")
+    urls = [url.strip() for url in urls if isinstance(url, str) and url.strip()]
+    if not urls:
+        raise ValueError("Campo 'urls' e obrigatorio")
+    if len(urls) > BATCH_MAX_URLS:
+        raise ValueError(f"Maximo de {BATCH_MAX_URLS} URLs por lote")
+    return urls
+
+
+def analysis_details(parsed_page, artifacts):
+    return {
+        "intent": artifacts["intent"],
+        "primaryQuestion": artifacts["primary_question"],
+        "secondaryQuestions": artifacts["secondary_questions"],
+        "topEntities": artifacts["entities"][:10],
+        "scoreBreakdown": artifacts["score_pack"]["breakdown"],
+        "issuesByCategory": artifacts["issues_pack"],
+        "testReport": artifacts["test_report"],
+        "degraded": artifacts["degraded"],
+        "schemaComparison": artifacts["schema_comparison"],
+        "url": parsed_page.get("url"),
+    }
+
+
+def projected_page_record(parsed_page, artifacts, fields):
+    page = {
+        "url": parsed_page.get("url"),
+        "title": parsed_page.get("title"),
+        "templateId": artifacts.get("template_id"),
+        "degraded": artifacts["degraded"],
+    }
+    if artifacts.get("page_ref"):
+        page["pageRef"] = artifacts["page_ref"]
+    if "intent" in artifacts:
+        page["intent"] = artifacts["intent"]
+    if "score_pack" in artifacts:
+        page["score"] = artifacts["score_pack"]["total"]
+    page["artifacts"] = {key: artifacts[key] for key in fields}
+    return {"page": page, "files": [], "entities": artifacts.get("entities", [])}
+
+
+def page_record(parsed_page, artifacts, fields=None):
+    if fields:
+        return projected_page_record(parsed_page, artifacts, fields)
+    return {
+        "page": {
+            "url": parsed_page.get("url"),
+            "title": parsed_page.get("title"),
+            "h1": parsed_page.get("headings", {}).get("h1", []),
+            "intent": artifacts["intent"],
+            "primaryQuestion": artifacts["primary_question"],
+            "score": artifacts["score_pack"]["total"],
+            "templateId": artifacts["template_id"],
+            "degraded": artifacts["degraded"],
+            "markdown": artifacts["content_pack"]["markdown"],
+            "schema": artifacts["schema"],
+            **({"pageRef": artifacts["page_ref"]} if artifacts.get("page_ref") else {}),
+        },
+        "files": to_download_files(parsed_page.get("url"), artifacts),
+        "entities": artifacts["entities"],
+    }
+
+
+class SiteAnalysis:
+    # One crawler-mode analysis: crawl, analyze each page as it arrives and
+    # append its record to a ResultStore. Used by /analyze and by jobs.
+    def __init__(self, url: str, options: dict, budget, store=None, fields=None, memo=None, dictionaries=()):
+        self.url = url
+        self.fields = fields
+        self.dictionaries = dictionaries
+        self.memo = memo if memo is not None else default_artifact_store()
+        self.options = options
+        self.budget = budget
+        self.store = store if store is not None else ResultStore()
+        self.link_graph = InternalLinkGraph()
+        self.first_details = None
+        self.pages_degraded = 0
+        self.pages_failed = 0
+        self.failures = collections.deque()
+        self.boilerplate = None
+        # Full records only; a `fields` projection keeps each page's graph.
+        self.site_schema = SitewideSchema() if SITEWIDE_SCHEMA and not fields else None
+        self.fact_matrix = FactMatrix() if FACT_MATRIX and not fields else None
+        self._stream = None
+
+    def _analysis_stream(self):
+        self.boilerplate = load_boilerplate_cache(self.url)
+        crawled_pages = crawl_site_stream(
+            self.url,
+            boilerplate=self.boilerplate,
+            deadline=self.budget.deadline,
+            max_bytes=self.budget.page_max_bytes,
+            **self.options,
+        )
+        return CrawlAnalysisStream(
+            self._analyzable(crawled_pages),
+            self.url,
+            template_fingerprints=self.boilerplate.template_fingerprints if self.boilerplate else None,
+            budget=self.budget,
+            warmup=BOILERPLATE_MIN_PAGES if self.boilerplate else 0,
+            fields=self.fields,
+            memo=self.memo,
+            dictionaries=self.dictionaries,
+        )
+
+    def _analyzable(self, pages):
+        # Pages that failed to fetch or process come back with `error`; they
+        # become failure records instead of going to analysis.
+        for page in pages:
+            if page.get("html"):
+                yield page
+            elif page.get("error"):
+                self.failures.append(page)
+
+    def _failure_record(self, failure):
+        return {"page": {"url": failure["url"], "error": failure["error"]}, "files": [], "entities": []}
+
+    def _page_record(self, item):
+        parsed_page = item["parsed_page"]
+        artifacts = item["artifacts"]
+        self.link_graph.add_page(parsed_page)
+        if self.first_details is None and not self.fields:
+            self.first_details = analysis_details(parsed_page, artifacts)
+        if artifacts["degraded"]:
+            self.pages_degraded += 1
+        if self.fact_matrix is not None:
+            self.fact_matrix.add_page(parsed_page.get("url"), artifacts)
+        if self.site_schema is not None:
+            artifacts = {**artifacts, "schema": self.site_schema.add_page(parsed_page.get("url"), artifacts["schema"])}
+        return page_record(parsed_page, artifacts, self.fields)
+
+    def _pending_records(self):
+        while self.failures:
+            self.pages_failed += 1
+            yield self._failure_record(self.failures.popleft())
+
+    def _append(self, record):
+        return self.store.append(record), record
+
+    def run(self):
+        # Yields (index, record) as pages complete.
+        self._stream = self._analysis_stream()
+        for item in self._stream:
+            for record in self._pending_records():
+                yield self._append(record)
+            yield self._append(self._page_record(item))
+        for record in self._pending_records():
+            yield self._append(record)
+
+    def finish(self):
+        template_report = self._stream.template_report() if self._stream is not None else []
+        if self.boilerplate:
+            self.boilerplate.save()
+        entities_sitewide = aggregate_sitewide_entities(
+            {"url": record["page"]["url"], "entities": record["entities"]} for record in self.store
+        )
+        return {
+            "pagesProcessed": len(self.store) - self.pages_failed,
+            "pagesFailed": self.pages_failed,
+            "pagesDegraded": self.pages_degraded,
+            "analysisDetails": self.first_details or {},
+            "entitiesSitewide": entities_sitewide,
+            "templates": template_report,
+            "linkGraph": self.link_graph.to_list(),
+            "schemaSitewide": self.site_schema.graph() if self.site_schema is not None else None,
+            "factMatrix": self.fact_matrix,
+        }
+
+
+class BatchAnalysis(SiteAnalysis):
+    # Analysis of an explicit URL list: pages are fetched concurrently with a
+    # per-host limit and failed URLs are reported as records with `error`.
+    def __init__(self, urls, options: dict, budget, store=None, fields=None, memo=None, dictionaries=()):
+        super().__init__(
+            urls[0] if urls else "", options, budget, store=store, fields=fields, memo=memo, dictionaries=dictionaries
+        )
+        self.urls = list(urls)
+        self.requested = collections.defaultdict(collections.deque)
+        self.pages_analyzed = 0
+        self.scores = []
+        self.intents = collections.Counter()
+
+    def _fetched_pages(self):
+        for page in fetch_urls_stream(
+            self.urls,
+            deadline=self.budget.deadline,
+            max_bytes=self.budget.page_max_bytes,
+            **self.options,
+        ):
+            if page.get("html"):
+                self.requested[page["url"]].append((page["index"], page["requested_url"]))
+            yield page
+
+    def _analysis_stream(self):
+        return CrawlAnalysisStream(
+            self._analyzable(self._fetched_pages()),
+            self.url,
+            budget=self.budget,
+            fields=self.fields,
+            memo=self.memo,
+            dictionaries=self.dictionaries,
+        )
+
+    def _page_record(self, item):
+        record = super()._page_record(item)
+        page = record["page"]
+        requested = self.requested.get(page["url"])
+        if requested:
+            page["index"], page["requestedUrl"] = requested.popleft()
+        self.pages_analyzed += 1
+        if page.get("score") is not None:
+            self.scores.append(page["score"])
+        if "intent" in page:
+            self.intents[page["intent"]] += 1
+        return record
+
+    def _failure_record(self, failure):
+        record = super()._failure_record(failure)
+        record["page"].update(requestedUrl=failure["requested_url"], index=failure["index"])
+        return record
+
+    def finish(self):
+        summary = super().finish()
+        summaries = self._stream.summaries if self._stream is not None else []
+        issue_counts = collections.Counter(issue for item in summaries for issue in item["issues"])
+        summary["aggregates"] = {
+            "urlsRequested": len(self.urls),
+            "pagesAnalyzed": self.pages_analyzed,
+            "pagesFailed": self.pages_failed,
+            "pagesDegraded": self.pages_degraded,
+            "averageScore": round(sum(self.scores) / len(self.scores), 1) if self.scores else 0,
+            "minScore": min(self.scores) if self.scores else 0,
+            "maxScore": max(self.scores) if self.scores else 0,
+            "intents": dict(self.intents.most_common()),
+            "commonIssues": [
+                {"message": message, "pages": count} for message, count in issue_counts.most_common(10)
+            ],
+        }
+        return summary
+
+
+class BundleAnalysis(SiteAnalysis):
+    # Pre-fetched pages ({url, html, title}): no network, only parsing and
+    # artifact building on the same process pool as the crawler.
+    def __init__(self, pages, default_url: str, budget, store=None, fields=None, memo=None, dictionaries=()):
+        super().__init__(default_url, {}, budget, store=store, fields=fields, memo=memo, dictionaries=dictionaries)
+        self.pages = pages
+
+    def _analysis_stream(self):
+        return CrawlAnalysisStream(
+            self.pages, self.url, budget=self.budget, fields=self.fields, memo=self.memo, dictionaries=self.dictionaries
+        )
+
+
+def site_files(summary):
+    return [
+        {
+            "filename": "entities_sitewide.json",
+            "mimeType": "application/json",
+            "data": summary["entitiesSitewide"],
+        },
+        {
+            "filename": "internal_link_graph.json",
+            "mimeType": "application/json",
+            "data": summary["linkGraph"],
+        },
+        {
+            "filename": "templates.json",
+            "mimeType": "application/json",
+            "data": summary["templates"],
+        },
+        *(
+            [{"filename": "schema_sitewide.json", "mimeType": "application/json", "data": summary["schemaSitewide"]}]
+            if summary.get("schemaSitewide")
+            else []
+        ),
+        *(
+            [{"filename": "fact_matrix.json", "mimeType": "application/json", "data": summary["factMatrix"].to_columns()}]
+            if summary.get("factMatrix")
+            else []
+        ),
+    ]
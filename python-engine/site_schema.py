@@ -0,0 +1,135 @@
+import collections
+import os
+import re
+from urllib.parse import urlsplit
+
+from text_index import fold_text
+
+
+# Crawler mode: nodes every page repeats (Organization, WebSite, breadcrumb
+# ancestors) become single sitewide nodes with stable @id values and the
+# per-page graphs keep only their own nodes plus references. The sitewide
+# graph is exported as schema_sitewide.json; together with the per-page
+# deltas it is the merged graph of the site.
+SITEWIDE_SCHEMA = os.getenv("SITEWIDE_SCHEMA", "1") == "1"
+SCHEMA_CONTEXT = "https://schema.org"
+
+
+def site_root(url: str) -> str:
+    parts = urlsplit(url or "")
+    return f"{parts.scheme}://{parts.netloc}/" if parts.netloc else ""
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", fold_text(value).lower()).strip("-") or "org"
+
+
+def organization_id(root: str, name: str) -> str:
+    return f"{root}#org-{_slug(name)}"
+
+
+def website_id(root: str) -> str:
+    return f"{root}#website"
+
+
+def webpage_id(url: str) -> str:
+    return f"{url}#webpage"
+
+
+def _merge_node(target, node):
+    # First non-empty value wins, so a node stays stable once published.
+    for key, value in node.items():
+        if value not in (None, "", [], {}) and target.get(key) in (None, "", [], {}):
+            target[key] = value
+
+
+class SitewideSchema:
+    def __init__(self):
+        self.nodes = {}
+        self.organizations = collections.defaultdict(collections.Counter)
+
+    def _shared(self, node_id: str, node):
+        shared = self.nodes.setdefault(node_id, {"@type": node.get("@type"), "@id": node_id})
+        _merge_node(shared, {key: value for key, value in node.items() if key != "@id"})
+        return {"@id": node_id}
+
+    def _breadcrumb(self, node, page_url: str):
+        items = []
+        for item in node.get("itemListElement") or []:
+            target = item.get("item") if isinstance(item, dict) else None
+            if not isinstance(target, str) or not target:
+                items.append(item)
+                continue
+            if target.rstrip("/") == (page_url or "").rstrip("/"):
+                items.append({**item, "item": {"@id": webpage_id(page_url)}})
+                continue
+            ancestor = {"@type": "WebPage", "url": target}
+            if item.get("name"):
+                ancestor["name"] = item["name"]
+            reference = self._shared(webpage_id(target), ancestor)
+            item = {**item, "item": reference}
+            # The shared ancestor carries the name unless this page calls it
+            # something else.
+            if item.get("name") == self.nodes[reference["@id"]].get("name"):
+                item.pop("name")
+            items.append(item)
+        return {**node, "itemListElement": items}
+
+    def add_page(self, page_url: str, schema):
+        # Returns the page's delta graph; shared nodes are kept here.
+        root = site_root(page_url)
+        if not root or not isinstance(schema, dict):
+            return schema
+        delta = []
+        publisher = None
+        webpage = None
+        for node in schema.get("@graph", []):
+            node_type = node.get("@type") if isinstance(node, dict) else None
+            if node_type == "Organization" and node.get("name"):
+                node_id = organization_id(root, node["name"])
+                publisher = publisher or self._shared(node_id, node)
+                self.organizations[root][node_id] += 1
+                continue
+            if node_type == "BreadcrumbList":
+                node = self._breadcrumb(node, page_url)
+            if node_type == "WebPage" and webpage is None:
+                node = dict(node)
+                webpage = node
+            delta.append(node)
+        self._shared(website_id(root), {"@type": "WebSite", "url": root})
+        if webpage is not None:
+            webpage["isPartOf"] = {"@id": website_id(root)}
+            if publisher is not None:
+                webpage["publisher"] = publisher
+        return {**schema, "@graph": delta}
+
+    def graph(self):
+        # WebSite name and publisher come from the organization most pages
+        # of that host refer to.
+        for root, counts in self.organizations.items():
+            node_id, _ = counts.most_common(1)[0]
+            website = self.nodes[website_id(root)]
+            website.setdefault("publisher", {"@id": node_id})
+            website.setdefault("name", self.nodes[node_id].get("name"))
+        for node_id, node in self.nodes.items():
+            if node.get("@type") == "WebSite" and "name" not in node:
+                node["name"] = urlsplit(node_id).netloc
+        return {"@context": SCHEMA_CONTEXT, "@graph": [self.nodes[key] for key in sorted(self.nodes)]}
+
+
+def merge_site_graph(sitewide, page_schemas):
+    # Sitewide nodes plus every page delta as one @graph; nodes sharing an
+    # @id are merged.
+    merged = {node["@id"]: dict(node) for node in sitewide.get("@graph", [])}
+    graph = list(merged.values())
+    for schema in page_schemas:
+        for node in (schema or {}).get("@graph", []):
+            node_id = node.get("@id") if isinstance(node, dict) else None
+            if node_id and node_id in merged:
+                _merge_node(merged[node_id], node)
+                continue
+            if node_id:
+                merged[node_id] = dict(node)
+                node = merged[node_id]
+            graph.append(node)
+    return {"@context": SCHEMA_CONTEXT, "@graph": graph}
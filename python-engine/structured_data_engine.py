@@ -0,0 +1,212 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # optional fast decoder
+    orjson = None
+
+
+MAX_JSONLD_BLOCKS = 50
+MAX_INDEXED_NODES = 200
+SCHEMA_PREFIXES = ("https://schema.org/", "http://schema.org/", "schema:")
+
+_LD_OPEN_STR = re.compile(r"<script\b[^>]*?\btype\s*=\s*[\"']?application/ld\+json[^>]*>", re.I)
+_LD_OPEN_BYTES = re.compile(rb"<script\b[^>]*?\btype\s*=\s*[\"']?application/ld\+json[^>]*>", re.I)
+_SCRIPT_CLOSE_STR = re.compile(r"</script\s*>", re.I)
+_SCRIPT_CLOSE_BYTES = re.compile(rb"</script\s*>", re.I)
+# Comment/CDATA wrappers CMSs put around the JSON, optionally behind "//" or
+# "/* */": "<!-- {...} -->", "//<![CDATA[ {...} //]]>".
+_WRAPPER_START = re.compile(r"^\s*(?:(?://|/\*)\s*)?(?:<!--|<!\[CDATA\[)(?:\s*\*/)?")
+_WRAPPER_END = re.compile(r"(?:(?://|/\*)\s*)?(?:-->|\]\]>)(?:\s*\*/)?\s*$")
+
+
+def _loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", errors="ignore")
+    return json.loads(raw)
+
+
+def _strip_wrappers(raw):
+    text = raw.decode("utf-8", errors="ignore") if isinstance(raw, bytes) else raw
+    previous = None
+    while text != previous:
+        previous = text
+        text = _WRAPPER_END.sub("", _WRAPPER_START.sub("", text))
+    return text.strip()
+
+
+def scan_jsonld_blocks(html):
+    if not html:
+        return [], 0
+    is_bytes = isinstance(html, bytes)
+    # Cheap rejection before running the regex: most pages either have no
+    # JSON-LD at all or a handful of blocks near the head.
+    marker = b"ld+json" if is_bytes else "ld+json"
+    if marker not in html and marker.upper() not in html:
+        return [], 0
+
+    open_pattern = _LD_OPEN_BYTES if is_bytes else _LD_OPEN_STR
+    close_pattern = _SCRIPT_CLOSE_BYTES if is_bytes else _SCRIPT_CLOSE_STR
+
+    blocks = []
+    invalid = 0
+    position = 0
+    while len(blocks) < MAX_JSONLD_BLOCKS:
+        opening = open_pattern.search(html, position)
+        if not opening:
+            break
+        closing = close_pattern.search(html, opening.end())
+        if not closing:
+            break
+        raw = html[opening.end():closing.start()]
+        position = closing.end()
+        if not raw.strip():
+            continue
+        try:
+            blocks.append(_loads(raw))
+        except Exception:
+            try:
+                blocks.append(_loads(_strip_wrappers(raw)))
+            except Exception:
+                invalid += 1
+    return blocks, invalid
+
+
+def _normalize_type(value):
+    value = (value or "").strip()
+    for prefix in SCHEMA_PREFIXES:
+        if value.startswith(prefix):
+            return value[len(prefix):]
+    return value.rsplit("/", 1)[-1] if "/" in value else value
+
+
+def _node_types(node):
+    raw_type = node.get("@type")
+    if isinstance(raw_type, str):
+        raw_type = [raw_type]
+    if not isinstance(raw_type, list):
+        return []
+    return [_normalize_type(item) for item in raw_type if isinstance(item, str) and item.strip()]
+
+
+def _iter_jsonld_nodes(value, depth: int = 0):
+    if depth > 12:
+        return
+    if isinstance(value, list):
+        for item in value:
+            yield from _iter_jsonld_nodes(item, depth + 1)
+        return
+    if not isinstance(value, dict):
+        return
+    if "@type" in value:
+        yield value
+    for key, child in value.items():
+        if key == "@context":
+            continue
+        if isinstance(child, (dict, list)):
+            yield from _iter_jsonld_nodes(child, depth + 1)
+
+
+def _microdata_value(tag):
+    if tag.has_attr("itemscope"):
+        return _microdata_item(tag)
+    for attr in ("content", "href", "src", "datetime", "value"):
+        if tag.has_attr(attr):
+            return (tag.get(attr) or "").strip()
+    return " ".join(tag.get_text(" ", strip=True).split())
+
+
+def _microdata_item(scope):
+    item_types = (scope.get("itemtype") or "").split()
+    item = {"@type": _normalize_type(item_types[0]) if item_types else ""}
+    if scope.get("itemid"):
+        item["@id"] = scope.get("itemid")
+    for prop in scope.find_all(attrs={"itemprop": True}):
+        owner = prop.find_parent(attrs={"itemscope": True})
+        if owner is not scope:
+            continue
+        value = _microdata_value(prop)
+        for name in (prop.get("itemprop") or "").split():
+            if name in item:
+                if not isinstance(item[name], list):
+                    item[name] = [item[name]]
+                item[name].append(value)
+            else:
+                item[name] = value
+    return item
+
+
+def extract_microdata(soup, html: str = ""):
+    if html and "itemscope" not in html:
+        return []
+    items = []
+    for scope in soup.find_all(attrs={"itemscope": True}):
+        # Nested items are reached through their parent's itemprop.
+        if scope.has_attr("itemprop"):
+            continue
+        items.append(_microdata_item(scope))
+        if len(items) >= MAX_INDEXED_NODES:
+            break
+    return items
+
+
+def extract_rdfa(soup, html: str = ""):
+    if html and "typeof" not in html:
+        return []
+    items = []
+    for scope in soup.find_all(attrs={"typeof": True}):
+        if scope.find_parent(attrs={"typeof": True}) is not None:
+            continue
+        item = {"@type": _normalize_type((scope.get("typeof") or "").split()[0] if scope.get("typeof") else "")}
+        if scope.get("resource"):
+            item["@id"] = scope.get("resource")
+        for prop in scope.find_all(attrs={"property": True}):
+            if prop.name == "meta" and (prop.get("property") or "").startswith("og:"):
+                continue
+            name = _normalize_type(prop.get("property"))
+            if name and name not in item:
+                item[name] = (prop.get("content") or prop.get("href") or " ".join(prop.get_text(" ", strip=True).split()))
+        items.append(item)
+        if len(items) >= MAX_INDEXED_NODES:
+            break
+    return items
+
+
+def build_structured_data_index(jsonld_blocks, microdata_items=None, rdfa_items=None, invalid_jsonld: int = 0):
+    by_type = {}
+    indexed = 0
+
+    def add(source, node):
+        nonlocal indexed
+        if indexed >= MAX_INDEXED_NODES:
+            return
+        types = _node_types(node)
+        for node_type in types:
+            by_type.setdefault(node_type, []).append({"source": source, "node": node})
+        if types:
+            indexed += 1
+
+    for node in _iter_jsonld_nodes(jsonld_blocks):
+        add("json-ld", node)
+    for item in microdata_items or []:
+        add("microdata", item)
+    for item in rdfa_items or []:
+        add("rdfa", item)
+
+    return {
+        "types": sorted(by_type),
+        "by_type": by_type,
+        "sources": {
+            "json-ld": len(jsonld_blocks),
+            "microdata": len(microdata_items or []),
+            "rdfa": len(rdfa_items or []),
+        },
+        "invalid_jsonld": invalid_jsonld,
+    }
+
+
+def existing_nodes(structured_data, schema_type: str):
+    return [entry.get("node") or {} for entry in (structured_data or {}).get("by_type", {}).get(schema_type, [])]
@@ -0,0 +1,115 @@
+import os
+import re
+import zlib
+from collections import Counter
+
+
+TEMPLATE_SIMILARITY = float(os.getenv("TEMPLATE_SIMILARITY", "0.8"))
+SIGNATURE_SIZE = 64
+SHINGLE_DEPTH = 3
+MAX_TEMPLATES = 200
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+}
+RAW_TEXT_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+_TAG_PATTERN = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^>]*?(/?)>")
+
+
+def _tag_paths(html: str):
+    stack = []
+    skip_until = None
+    for match in _TAG_PATTERN.finditer(html):
+        closing, name, self_closing = match.group(1), match.group(2).lower(), match.group(3)
+        if skip_until:
+            if closing and name == skip_until:
+                skip_until = None
+            continue
+        if closing:
+            if name in stack:
+                while stack and stack.pop() != name:
+                    pass
+            continue
+        if name in RAW_TEXT_TAGS:
+            skip_until = name
+            continue
+        yield "/".join(stack[-(SHINGLE_DEPTH - 1):] + [name])
+        if not self_closing and name not in VOID_TAGS:
+            stack.append(name)
+
+
+def dom_signature(html: str):
+    # Bottom-k sketch of tag-path shingles: cheap to compute from raw HTML and
+    # compact enough to ship between processes.
+    hashes = {zlib.crc32(path.encode("ascii", errors="ignore")) for path in _tag_paths(html or "")}
+    return sorted(hashes)[:SIGNATURE_SIZE]
+
+
+def signature_similarity(left, right):
+    if not left or not right:
+        return 0.0
+    union = sorted(set(left) | set(right))[:SIGNATURE_SIZE]
+    left_set, right_set = set(left), set(right)
+    shared = sum(1 for value in union if value in left_set and value in right_set)
+    return shared / len(union)
+
+
+class TemplateClusterer:
+    def __init__(self, threshold: float = TEMPLATE_SIMILARITY, max_templates: int = MAX_TEMPLATES):
+        self.threshold = threshold
+        self.max_templates = max_templates
+        self.templates = []
+
+    def assign(self, url: str, signature):
+        best_id, best_score = None, 0.0
+        for template in self.templates:
+            score = signature_similarity(signature, template["signature"])
+            if score > best_score:
+                best_id, best_score = template["template_id"], score
+        if best_id is not None and (best_score >= self.threshold or len(self.templates) >= self.max_templates):
+            self.templates[best_id]["pages"].append(url)
+            return best_id, False
+
+        template_id = len(self.templates)
+        self.templates.append(
+            {"template_id": template_id, "signature": signature, "representative": url, "pages": [url]}
+        )
+        return template_id, True
+
+
+def _counted(counter: Counter, key: str, limit: int = 10):
+    return [{key: value, "pages": count} for value, count in counter.most_common(limit)]
+
+
+def build_template_report(clusterer, page_summaries):
+    # Per-page findings (intent, structural issues, published schema types)
+    # are counted over the template's pages; no page speaks for the others.
+    pages_by_template = {}
+    for summary in page_summaries:
+        pages_by_template.setdefault(summary.get("template_id"), []).append(summary)
+
+    report = []
+    for template in clusterer.templates:
+        template_id = template["template_id"]
+        members = pages_by_template.get(template_id, [])
+        scores = [member["score"] for member in members if member.get("score") is not None]
+        intents = Counter(member["intent"] for member in members if member.get("intent"))
+        structural = Counter(issue for member in members for issue in member.get("structural_issues", []))
+        schema_types = Counter(value for member in members for value in member.get("existing_schema_types", []))
+        issue_counts = Counter(issue for member in members for issue in member.get("issues", []))
+        report.append(
+            {
+                "templateId": template_id,
+                "representativeUrl": template["representative"],
+                "pageCount": len(members),
+                "pages": [member.get("url") for member in members][:50],
+                "intents": _counted(intents, "intent"),
+                "structuralIssues": _counted(structural, "message"),
+                "existingSchemaTypes": _counted(schema_types, "type"),
+                "averageScore": round(sum(scores) / len(scores), 1) if scores else 0,
+                "commonIssues": _counted(issue_counts, "message"),
+            }
+        )
+    report.sort(key=lambda item: (-item["pageCount"], item["templateId"]))
+    return report
@@ -1,22 +1,21 @@
 import re
 
-
-QUESTION_PREFIXES = ("como", "quanto", "quais", "onde", "quando", "qual", "quem")
+from content_model import blocks_text, content_blocks, leading_words, question_headings, standalone_paragraphs
+from schema_engine import validate_schema
 
 
-def _word_count(text: str):
-    return len([token for token in re.split(r"\s+", text.strip()) if token])
+QUESTION_PREFIXES = ("como", "quanto", "quais", "onde", "quando", "qual", "quem")
 
 
-def run_test_harness(primary_question, content_pack, entities, schema):
-    markdown = content_pack.get("markdown", "")
+def run_test_harness(primary_question, content_pack, entities, schema, validation=None):
+    blocks = content_blocks(content_pack)
+    validation = validation or validate_schema(schema, content_pack)
     faq = content_pack.get("faq", [])
     direct_answer = content_pack.get("direct_answer", "")
-    lines = markdown.splitlines()
 
     checks = []
 
-    first_window = " ".join(markdown.split()[:60]).lower()
+    first_window = " ".join(leading_words(blocks, 60)).lower()
     question_tokens = {token.lower() for token in re.findall(r"[A-Za-z]{4,}", primary_question or "")}
     overlap = len([token for token in question_tokens if token in first_window])
     checks.append(
@@ -27,26 +26,18 @@ def run_test_harness(primary_question, content_pack, entities, schema):
         }
     )
 
-    question_headings = [line[4:].strip() for line in lines if line.startswith("### ")]
-    headings_ok = bool(question_headings) and all(h.lower().startswith(QUESTION_PREFIXES) for h in question_headings)
+    headings = question_headings(blocks)
+    headings_ok = bool(headings) and all(h.lower().startswith(QUESTION_PREFIXES) for h in headings)
     checks.append(
         {
             "name": "question_headings",
             "passed": headings_ok,
-            "details": f"headings={len(question_headings)}",
+            "details": f"headings={len(headings)}",
         }
     )
 
-    paragraphs = [
-        block
-        for block in markdown.split("\n\n")
-        if block
-        and not block.startswith("#")
-        and not block.startswith("###")
-        and not block.startswith("|")
-        and not block.startswith("- ")
-    ]
-    avg_paragraph_size = int(sum(_word_count(block) for block in paragraphs) / max(1, len(paragraphs)))
+    paragraphs = standalone_paragraphs(blocks)
+    avg_paragraph_size = int(sum(block["words"] for block in paragraphs) / max(1, len(paragraphs)))
     checks.append(
         {
             "name": "avg_paragraph_size",
@@ -65,7 +56,8 @@ def run_test_harness(primary_question, content_pack, entities, schema):
     )
 
     entity_names = [entity.get("entity_name", "") for entity in entities]
-    names_in_text = sum(1 for name in entity_names if name and name.lower() in markdown.lower())
+    text_lower = blocks_text(blocks).lower()
+    names_in_text = sum(1 for name in entity_names if name and name.lower() in text_lower)
     checks.append(
         {
             "name": "entities_present_in_text",
@@ -74,29 +66,19 @@ def run_test_harness(primary_question, content_pack, entities, schema):
         }
     )
 
-    faq_nodes = [node for node in schema.get("@graph", []) if node.get("@type") == "FAQPage"]
-    parity_ok = True
-    if faq and faq_nodes:
-        schema_entities = faq_nodes[0].get("mainEntity", [])
-        if len(schema_entities) != len(faq):
-            parity_ok = False
-        else:
-            for index, qa in enumerate(faq):
-                item = schema_entities[index]
-                if item.get("name") != qa.get("question"):
-                    parity_ok = False
-                    break
-                if ((item.get("acceptedAnswer") or {}).get("text") or "") != qa.get("answer"):
-                    parity_ok = False
-                    break
-    elif faq and not faq_nodes:
-        parity_ok = False
-
     checks.append(
         {
             "name": "schema_faq_parity",
-            "passed": parity_ok,
-            "details": f"faq_schema_nodes={len(faq_nodes)}",
+            "passed": validation["parity_ok"],
+            "details": f"faq_schema_nodes={validation['faq_nodes']}",
+        }
+    )
+
+    checks.append(
+        {
+            "name": "schema_vocabulary",
+            "passed": not validation["errors"],
+            "details": f"nodes={validation['nodes']} errors={len(validation['errors'])}",
         }
     )
 
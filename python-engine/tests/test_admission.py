@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app as app_module
+from admission import AdmissionController, Lane, Overloaded
+
+
+class LaneTest(unittest.TestCase):
+    def test_full_queue_is_rejected_immediately(self):
+        lane = Lane("crawl", concurrency=1, queue_size=0, wait_seconds=5)
+        started = lane.acquire()
+        began = time.monotonic()
+        with self.assertRaises(Overloaded) as raised:
+            lane.acquire()
+        self.assertLess(time.monotonic() - began, 1)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        lane.release(started)
+        lane.release(lane.acquire())
+        self.assertEqual((lane.admitted, lane.rejected, lane.active), (2, 1, 0))
+
+    def test_queued_request_is_admitted_after_release(self):
+        controller = AdmissionController([Lane("crawl", concurrency=1, queue_size=1, wait_seconds=5)])
+        release = controller.acquire("crawl")
+        admitted = []
+        waiter = threading.Thread(target=lambda: admitted.append(controller.acquire("crawl")))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(controller.lanes["crawl"].waiting, 1)
+        release()
+        release()  # idempotent
+        waiter.join(2)
+        self.assertEqual(len(admitted), 1)
+        self.assertEqual(controller.lanes["crawl"].active, 1)
+        admitted[0]()
+
+
+class AppAdmissionTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app_module.app.test_client()
+        self.lanes = {
+            "interactive": Lane("interactive", concurrency=1, queue_size=0, wait_seconds=0),
+            "crawl": Lane("crawl", concurrency=1, queue_size=0, wait_seconds=0),
+        }
+        patcher = mock.patch.dict(app_module.admission.lanes, self.lanes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_busy_crawl_lane_does_not_block_interactive_requests(self):
+        release = app_module.admission.acquire("crawl")
+        self.addCleanup(release)
+
+        response = self.client.post("/analyze", json={"url": "https://example.com", "useCrawler": True})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], str(response.get_json()["retryAfter"]))
+
+        with mock.patch.object(app_module, "fetch_html", return_value=("<html><title>x</title></html>", "https://example.com", False)):
+            response = self.client.post("/analyze", json={"url": "https://example.com"})
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertEqual(self.lanes["interactive"].active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
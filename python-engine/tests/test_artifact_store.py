@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import aeo_pipeline
+import artifact_store
+from aeo_pipeline import build_page_artifacts
+from artifact_store import ArtifactStore
+from crawl_analysis import analyze_page, parse_key
+
+
+HTML = (
+    "<html><head><title>Peugeot 208</title></head><body><main><h1>Peugeot 208</h1>"
+    "<p>O Peugeot 208 tem garantia de 3 anos e preco de R$ 99.990,00 em Sao Paulo.</p></main></body></html>"
+)
+URL = "https://example.com/modelos/208"
+
+
+class ArtifactStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = ArtifactStore(self.tmp.name)
+
+    def test_put_and_get_round_trip(self):
+        self.assertEqual(self.store.get("ab" * 16), (False, None))
+        self.store.put("ab" * 16, {"score": None, "items": [1, 2]})
+        self.assertEqual(self.store.get("ab" * 16), (True, {"score": None, "items": [1, 2]}))
+
+    def test_second_run_reuses_parse_and_stages(self):
+        parsed, first = analyze_page(HTML, URL, memo=self.store)
+        with mock.patch("crawl_analysis.parse_page") as parse, mock.patch("aeo_pipeline.compute_aeo_score") as score:
+            parsed_again, second = analyze_page(HTML, URL, memo=self.store)
+        parse.assert_not_called()
+        score.assert_not_called()
+        self.assertEqual(parsed_again, parsed)
+        self.assertEqual(second, first)
+        self.assertEqual(first.pop("page_ref"), parse_key(HTML, URL))
+        self.assertEqual(build_page_artifacts(parsed), first)
+
+    def test_stage_version_change_recomputes_downstream_only(self):
+        analyze_page(HTML, URL, memo=self.store)
+        real_version = artifact_store.module_version
+
+        def bumped(*names):
+            return real_version(*names) + ("-v2" if "scoring_engine" in names else "")
+
+        with (
+            mock.patch("aeo_pipeline.module_version", side_effect=bumped),
+            mock.patch("aeo_pipeline.compute_aeo_score", wraps=aeo_pipeline.compute_aeo_score) as score,
+            mock.patch("aeo_pipeline.extract_entities") as entities,
+        ):
+            analyze_page(HTML, URL, memo=self.store)
+        score.assert_called_once()
+        entities.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from boilerplate_engine import BoilerplateCache, block_fingerprints
+from parser_engine import parse_page
+
+
+TEMPLATE = """
+<div class="menu"><ul><li>Modelos</li><li>Ofertas</li><li>Concessionarias</li></ul></div>
+<div class="cookies"><p>Usamos cookies para melhorar sua experiencia.</p></div>
+"""
+
+
+def _page(body: str):
+    return f"<html><head><title>Pagina</title></head><body>{TEMPLATE}<main><p>{body}</p></main></body></html>"
+
+
+class BoilerplateCacheTest(unittest.TestCase):
+    def test_repeated_blocks_become_template_and_are_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = BoilerplateCache("https://www.example.com", cache_dir=tmp, min_pages=2)
+            bodies = ["Primeiro modelo com motor turbo.", "Segundo modelo hibrido.", "Terceiro modelo eletrico."]
+            for body in bodies:
+                cache.observe(block_fingerprints(BeautifulSoup(_page(body), "html.parser")))
+            template = cache.template_fingerprints()
+            self.assertEqual(len(template), 2)
+
+            parsed = parse_page(_page(bodies[0]), "https://www.example.com/a", template_fingerprints=template)
+            self.assertEqual(parsed["paragraphs"], [bodies[0]])
+            self.assertEqual(parsed["lists"], [])
+            self.assertEqual(parsed["flags"]["template_blocks_removed"], 2)
+
+            cache.save()
+            reloaded = BoilerplateCache("example.com", cache_dir=tmp, min_pages=2, decay=1.0).load()
+            self.assertEqual(reloaded.template_fingerprints(), template)
+
+    def test_repeated_main_content_is_kept(self):
+        page = (
+            "<html><body><div class='links'><a href='/a'>Modelos</a> <a href='/b'>Ofertas</a></div>"
+            "<main><h2>Ficha tecnica</h2><p>Precos sujeitos a alteracao sem aviso previo.</p>"
+            "<table><tr><td>Garantia</td><td>3 anos</td></tr></table>"
+            "<ul><li><a href='/c'>Versao Active</a></li><li><a href='/d'>Versao Allure</a></li></ul></main></body></html>"
+        )
+        soup = BeautifulSoup(page, "html.parser")
+        fingerprints = block_fingerprints(soup)
+        self.assertEqual(len(fingerprints), 2)
+
+        parsed = parse_page(page, "https://www.example.com/a", template_fingerprints=fingerprints)
+        self.assertEqual(parsed["headings"]["h2"], ["Ficha tecnica"])
+        self.assertEqual(parsed["paragraphs"], ["Precos sujeitos a alteracao sem aviso previo."])
+        self.assertEqual(len(parsed["tables"]), 1)
+        self.assertEqual(parsed["lists"], [])
+
+    def test_counts_decay_and_saves_merge(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = BoilerplateCache("example.com", cache_dir=tmp, min_pages=2).load()
+            second = BoilerplateCache("example.com", cache_dir=tmp, min_pages=2).load()
+            for _ in range(4):
+                first.observe({"menu"})
+                second.observe({"menu", "banner"})
+            first.save()
+            second.save()
+            # First crawl decayed once (2) plus the second crawl (4).
+            reloaded = BoilerplateCache("example.com", cache_dir=tmp, min_pages=2, decay=1.0).load()
+            self.assertEqual(reloaded.pages_seen, 6)
+            self.assertEqual(reloaded.counts, {"menu": 6, "banner": 4})
+
+            faded = BoilerplateCache("example.com", cache_dir=tmp, min_pages=2, decay=0.1).load()
+            self.assertEqual(faded.template_fingerprints(), frozenset())
+
+
+if __name__ == "__main__":
+    unittest.main()
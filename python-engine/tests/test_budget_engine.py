@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from aeo_pipeline import build_page_artifacts_within_budget
+from budget_engine import PageBudget, RequestBudget
+from crawl_analysis import CrawlAnalysisStream
+from parser_engine import parse_page
+
+
+HTML = "<html><head><title>Onix</title></head><body><main><p>Garantia de 3 anos.</p></main></body></html>"
+
+
+class BudgetTest(unittest.TestCase):
+    def test_oversized_html_is_truncated_and_flagged(self):
+        budget = PageBudget(max_seconds=0, max_bytes=40)
+        parsed = parse_page(HTML, "https://example.com/onix", budget=budget)
+        self.assertTrue(parsed["flags"]["html_truncated"])
+
+    def test_expired_page_budget_returns_degraded_artifacts(self):
+        parsed = parse_page(HTML, "https://example.com/onix")
+        budget = PageBudget(max_seconds=1)
+        budget.deadline = 0
+        artifacts = build_page_artifacts_within_budget(parsed, budget=budget)
+        self.assertEqual(artifacts["degraded"], {"stage": "parse", "reason": "page_time"})
+        self.assertEqual(artifacts["score_pack"]["total"], 0)
+
+    def test_exhausted_request_budget_skips_remaining_pages(self):
+        budget = RequestBudget(max_seconds=1)
+        budget.deadline = 0
+        pages = [{"url": "https://example.com/onix", "title": "Onix", "html": HTML}]
+        analyzed = list(CrawlAnalysisStream(pages, "https://example.com", budget=budget))
+        self.assertEqual(analyzed[0]["artifacts"]["degraded"]["reason"], "request_time")
+        self.assertEqual(analyzed[0]["parsed_page"]["title"], "Onix")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cli import build_parser, run
+
+
+class CliTest(unittest.TestCase):
+    def test_jsonl_output_and_resume(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            html_dir = os.path.join(tmp, "html")
+            os.makedirs(html_dir)
+            for index in range(3):
+                with open(os.path.join(html_dir, f"p{index}.html"), "w", encoding="utf-8") as handle:
+                    handle.write(f"<html><head><title>Produto {index}</title></head><body><p>Produto {index}</p></body></html>")
+            output = os.path.join(tmp, "out.jsonl")
+            argv = [html_dir, "--base-url", "https://example.com", "-o", output, "--workers", "1"]
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                first = run(build_parser().parse_args(argv))
+                second = run(build_parser().parse_args(argv + ["--resume"]))
+
+            with open(output, "r", encoding="utf-8") as handle:
+                records = [json.loads(line) for line in handle]
+            self.assertEqual(first.pages, 3)
+            self.assertEqual(second.pages, 0)
+            self.assertEqual(second.skipped, 3)
+            self.assertEqual([record["source"] for record in records], [f"https://example.com/p{index}.html" for index in range(3)])
+            self.assertTrue(any(file["filename"].endswith("_score.json") for file in records[0]["files"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
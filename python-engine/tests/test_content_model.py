@@ -0,0 +1,95 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from content_model import (
+    answer,
+    edit_content_pack,
+    faq_entry,
+    heading,
+    item_list,
+    leading_words,
+    paragraph,
+    parse_markdown,
+    render_markdown,
+    standalone_paragraphs,
+    table,
+)
+from test_harness import run_test_harness
+
+BLOCKS = [
+    heading(1, "Peugeot 208"),
+    answer("O 208 custa R$ 99.990."),
+    heading(2, "Quanto custa o Peugeot 208?"),
+    paragraph("Preco publicado na pagina oficial."),
+    heading(2, "Como comprar"),
+    item_list(["Simule.", "Agende."], ordered=True),
+    heading(2, "Entidades relevantes"),
+    table(["Entidade", "Tipo"], [["Peugeot", "Brand"]]),
+    heading(2, "Perguntas frequentes"),
+    faq_entry("Qual a garantia?", "Tres anos."),
+    faq_entry("Quanto custa?", "R$ 99.990."),
+    heading(2, "Dados nao informados"),
+    item_list(["Consumo nao informado."]),
+]
+
+MARKDOWN = """# Peugeot 208
+
+**Resposta direta:** O 208 custa R$ 99.990.
+
+## Quanto custa o Peugeot 208?
+Preco publicado na pagina oficial.
+
+## Como comprar
+1. Simule.
+2. Agende.
+
+## Entidades relevantes
+| Entidade | Tipo |
+| --- | --- |
+| Peugeot | Brand |
+
+## Perguntas frequentes
+### Qual a garantia?
+Tres anos.
+
+### Quanto custa?
+R$ 99.990.
+
+## Dados nao informados
+- Consumo nao informado."""
+
+
+class ContentModelTest(unittest.TestCase):
+    def test_render_and_parse_round_trip(self):
+        self.assertEqual(render_markdown(BLOCKS), MARKDOWN)
+        self.assertEqual(parse_markdown(MARKDOWN), BLOCKS)
+
+    def test_word_counts_match_the_rendering(self):
+        for block in BLOCKS:
+            self.assertEqual(block["words"], len(render_markdown([block]).split()), block["type"])
+        self.assertEqual(leading_words(BLOCKS, 12), MARKDOWN.split()[:12])
+
+    def test_standalone_paragraphs(self):
+        self.assertEqual(standalone_paragraphs(BLOCKS), [BLOCKS[1]])
+        blocks = parse_markdown("# Titulo\n\n## Secao\n\nTexto solto.")
+        self.assertEqual([block["text"] for block in standalone_paragraphs(blocks)], ["Texto solto."])
+
+    def test_harness_reads_blocks_or_markdown(self):
+        schema = {"@graph": []}
+        from_blocks = run_test_harness("Quanto custa o 208?", {"blocks": BLOCKS, "faq": []}, [], schema)
+        from_markdown = run_test_harness("Quanto custa o 208?", {"markdown": MARKDOWN, "faq": []}, [], schema)
+        self.assertEqual(from_blocks, from_markdown)
+
+    def test_edited_markdown_replaces_blocks(self):
+        edited = edit_content_pack({"blocks": BLOCKS, "markdown": MARKDOWN, "schema_graph": []}, {"markdown": "# Novo"})
+        self.assertEqual(edited["blocks"], [heading(1, "Novo")])
+        self.assertNotIn("schema_graph", edited)
+        edited = edit_content_pack({"blocks": BLOCKS, "markdown": MARKDOWN}, {"blocks": BLOCKS[:2]})
+        self.assertNotIn("markdown", edited)
+
+
+if __name__ == "__main__":
+    unittest.main()
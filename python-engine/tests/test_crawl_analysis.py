@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import worker_pool
+from crawl_analysis import CrawlAnalysisStream, _timed_out_stream_task
+from worker_pool import configure_workers, imap_in_pool, worker_count
+
+
+def _page(index: int):
+    return {
+        "url": f"https://example.com/modelos/{index}",
+        "html": f"<html><head><title>Modelo {index}</title></head><body><main><p>Modelo {index} com garantia.</p></main></body></html>",
+    }
+
+
+def _slow_first(index: int):
+    # Task 0 finishes last.
+    time.sleep(0.5 if index == 0 else 0)
+    return index
+
+
+def _stuck_on_one(index: int):
+    # Task 1 never finishes within the test's timeout.
+    time.sleep(60 if index == 1 else 0)
+    return index
+
+
+class CrawlAnalysisStreamTest(unittest.TestCase):
+    def test_stream_consumes_pages_lazily_and_keeps_order(self):
+        pulled = []
+
+        def pages():
+            for index in range(5):
+                pulled.append(index)
+                yield _page(index)
+
+        stream = CrawlAnalysisStream(pages(), "https://example.com", parallel=False)
+        iterator = iter(stream)
+        first = next(iterator)
+        self.assertEqual(first["parsed_page"]["url"], "https://example.com/modelos/0")
+        self.assertEqual(pulled, [0])
+
+        rest = [item["parsed_page"]["url"] for item in iterator]
+        self.assertEqual(rest, [f"https://example.com/modelos/{index}" for index in range(1, 5)])
+        self.assertEqual(stream.template_report()[0]["pageCount"], 5)
+
+    def test_pool_matches_in_process_analysis(self):
+        pages = [_page(index) for index in range(3)]
+        serial = list(CrawlAnalysisStream(iter(pages), "https://example.com", parallel=False))
+        pooled = list(CrawlAnalysisStream(iter(pages), "https://example.com"))
+        self.assertEqual(
+            [item["artifacts"]["score_pack"] for item in serial],
+            [item["artifacts"]["score_pack"] for item in pooled],
+        )
+
+    def test_template_fingerprints_are_read_once_after_warmup(self):
+        reads = []
+
+        def fingerprints():
+            reads.append(len(reads))
+            return {f"block-{len(reads)}"}
+
+        pages = iter([_page(index) for index in range(4)])
+        stream = CrawlAnalysisStream(pages, "https://example.com", fingerprints, parallel=False, warmup=2)
+        self.assertEqual(len(list(stream)), 4)
+        self.assertEqual(reads, [0])
+        self.assertEqual(stream.fingerprints, frozenset({"block-1"}))
+
+
+class ImapInPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.workers = worker_count()
+        configure_workers(2)
+
+    def tearDown(self):
+        configure_workers(self.workers)
+
+    def test_results_are_not_held_back_by_a_blocked_producer(self):
+        received = threading.Event()
+        waited = []
+
+        def tasks():
+            yield -1
+            # The next task only arrives once the first result was consumed.
+            waited.append(received.wait(10))
+            yield -2
+
+        results = []
+        for result in imap_in_pool(abs, tasks(), window=4):
+            results.append(result)
+            received.set()
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(waited, [True])
+
+    def test_results_keep_task_order_when_the_first_task_is_slow(self):
+        self.assertEqual(list(imap_in_pool(_slow_first, range(6), window=6)), list(range(6)))
+
+    def test_stuck_task_times_out_and_workers_are_recycled(self):
+        pool = worker_pool.get_process_pool()
+        started = time.monotonic()
+        results = list(imap_in_pool(_stuck_on_one, range(5), timeout=1, fallback=lambda task: -task))
+        self.assertEqual(results, [0, -1, 2, 3, 4])
+        self.assertLess(time.monotonic() - started, 20)
+        self.assertIsNot(worker_pool.get_process_pool(), pool)
+
+    @unittest.skipUnless(resource is not None, "resource indisponivel")
+    def test_workers_run_with_an_address_space_cap(self):
+        (soft, _), = imap_in_pool(resource.getrlimit, [resource.RLIMIT_AS])
+        self.assertEqual(soft, worker_pool.ENGINE_WORKER_MAX_MB * 1024 * 1024)
+
+    def test_timed_out_page_is_reported_degraded(self):
+        page_task = ("<html></html>", "https://example.com/lenta", "Lenta", None, None, ("score_pack",), None, ())
+        template_id, parsed_page, artifacts = _timed_out_stream_task((3, page_task))
+        self.assertEqual((template_id, parsed_page["url"]), (3, "https://example.com/lenta"))
+        self.assertEqual(artifacts["degraded"], {"stage": "page", "reason": "worker_timeout"})
+        self.assertEqual(set(artifacts), {"score_pack", "degraded"})
+
+
+if __name__ == "__main__":
+    unittest.main()
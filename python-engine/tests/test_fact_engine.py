@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fact_engine import extract_facts, parse_number
+from text_index import TextIndex
+
+
+class FactEngineTests(unittest.TestCase):
+    def test_parse_number_reads_brazilian_notation(self):
+        self.assertEqual(parse_number("129.990,00"), 129990)
+        self.assertEqual(parse_number("99.990"), 99990)
+        self.assertEqual(parse_number("13,5"), 13.5)
+        self.assertEqual(parse_number("1.5"), 1.5)
+        self.assertIsNone(parse_number(""))
+
+    def test_typed_values_and_offsets(self):
+        text = "O Peugeot 208 custa R$ 129.990,00 e faz 13,5 km/l. Garantia de 3 anos. Telefone (11) 5555-1234."
+        index = TextIndex(text)
+        result = extract_facts({}, index)
+
+        self.assertEqual(result["facts"]["price"], "R$ 129.990,00")
+        self.assertEqual(result["values"]["price"], {"amount": 129990, "currency": "BRL"})
+        self.assertEqual(result["values"]["consumption"], {"value": 13.5, "unit": "km/l"})
+        self.assertEqual(result["values"]["warranty"], {"value": 3, "unit": "years"})
+        self.assertEqual(result["values"]["address_or_contact"], {"phone": "1155551234"})
+        price = result["candidates"]["price"][0]
+        self.assertEqual(text[price["start"]:price["end"]], "R$ 129.990,00")
+
+    def test_repeated_value_ranks_first(self):
+        text = "Entrada de R$ 10.000. Preco R$ 99.990 a vista. Oferta: R$ 99.990,00 ate sexta."
+        result = extract_facts({}, TextIndex(text))
+
+        candidates = result["candidates"]["price"]
+        self.assertEqual(result["values"]["price"]["amount"], 99990)
+        self.assertEqual(candidates[0]["text"], "R$ 99.990")
+        self.assertEqual([candidate["mentions"] for candidate in candidates], [2, 1])
+        self.assertEqual(candidates[1]["value"]["amount"], 10000)
+
+    def test_instalments_do_not_outrank_the_price(self):
+        text = "Peugeot 208 por R$ 99.990 ou 48x de R$ 1.299,00; parcela de R$ 1.299,00."
+        result = extract_facts({}, TextIndex(text))
+
+        self.assertEqual(result["facts"]["price"], "R$ 99.990")
+        self.assertEqual(result["values"]["price"], {"amount": 99990, "currency": "BRL"})
+        self.assertEqual([candidate["text"] for candidate in result["candidates"]["price"]], ["R$ 99.990", "R$ 1.299,00"])
+
+    def test_facts_and_values_come_from_the_same_occurrence(self):
+        text = "Entrada de R$ 10.000 e R$ 899 mensais. Desde R$ 89.990; versao topo R$ 99.990, R$ 99.990 a vista."
+        result = extract_facts({}, TextIndex(text))
+
+        self.assertEqual(result["facts"]["price"], "R$ 89.990")
+        self.assertEqual(result["values"]["price"]["amount"], 89990)
+        self.assertEqual(result["candidates"]["price"][0]["value"]["amount"], 99990)
+        self.assertEqual([candidate["value"]["amount"] for candidate in result["candidates"]["price"]][-2:], [10000, 899])
+
+    def test_warranty_reads_thousands_separators(self):
+        result = extract_facts({}, TextIndex("Garantia de 100.000 km ou 3 anos."))
+
+        self.assertEqual(result["values"]["warranty"], {"value": 100000, "unit": "km"})
+        result = extract_facts({}, TextIndex("Garantia de 100000 km."))
+        self.assertEqual(result["values"]["warranty"], {"value": 100000, "unit": "km"})
+
+    def test_missing_facts_are_none(self):
+        result = extract_facts({"full_text": "Pagina institucional sem dados."})
+
+        self.assertEqual(set(result["facts"].values()), {None})
+        self.assertEqual(result["candidates"]["price"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fact_matrix
+from fact_engine import extract_facts
+from fact_matrix import FactMatrix, conditions_from_args
+from text_index import TextIndex
+
+
+def _artifacts(intent, price=None, warranty=None, gaps=(), score=50, degraded=None):
+    values = {"price": {"amount": price, "currency": "BRL"} if price else None, "warranty": warranty}
+    facts = {"price": f"R$ {price}" if price else None, "warranty": "Garantia" if warranty else None}
+    return {
+        "intent": intent,
+        "template_id": 0,
+        "gaps": [{"field": field, "message": ""} for field in gaps],
+        "content_pack": {"facts": facts, "fact_values": values},
+        "score_pack": {"total": score, "breakdown": {"coverage": {"score": 10, "max": 20}}},
+        "degraded": degraded,
+    }
+
+
+def _matrix():
+    matrix = FactMatrix()
+    matrix.add_page("https://loja.example/modelos/208", _artifacts("transacional", price=99990, warranty={"value": 3, "unit": "years"}))
+    matrix.add_page("https://loja.example/modelos/2008", _artifacts("transacional", gaps=("price",), score=40))
+    matrix.add_page("https://loja.example/modelos/3008", _artifacts("comparativa", price=189990, gaps=("warranty",), score=70))
+    matrix.add_page("https://loja.example/contato", _artifacts("local", degraded={"stage": "entities"}, score=0))
+    return matrix
+
+
+class FactMatrixTest(unittest.TestCase):
+    def test_rows_hold_normalized_values(self):
+        records = _matrix().records(columns=["intent", "price", "warranty_months", "gap_price", "score_coverage", "degraded"])
+
+        self.assertEqual(records[0], {"intent": "transacional", "price": 99990, "warranty_months": 36, "gap_price": False, "score_coverage": 10, "degraded": False})
+        self.assertIsNone(records[1]["price"])
+        self.assertTrue(records[1]["gap_price"])
+        self.assertTrue(records[3]["degraded"])
+
+    def test_filters(self):
+        matrix = _matrix()
+
+        self.assertEqual(matrix.where({"url": "/modelos/", "price": None}), [1])
+        self.assertEqual(matrix.where({"price": (100000, None)}), [2])
+        self.assertEqual(matrix.where({"intent": ["transacional", "local"], "score": (1, None)}), [0, 1])
+        self.assertEqual(matrix.where({"gap_warranty": True}), [2])
+        self.assertEqual(matrix.where({"intent": ["inexistente"]}), [])
+        self.assertEqual(matrix.stats("price", matrix.where({"url": "/modelos/"})), {"count": 2, "min": 99990, "max": 189990, "mean": 144990.0})
+        with self.assertRaises(ValueError):
+            matrix.where({"preco": None})
+
+    def test_filters_without_numpy(self):
+        matrix = _matrix()
+        queries = [{"url": "/modelos/", "price": None}, {"price": (100000, None)}, {"intent": None}, {"score": 40.0}, {}]
+        with mock.patch.object(fact_matrix, "numpy", None):
+            found = [matrix.where(query) for query in queries]
+        self.assertEqual(found, [[1], [2], [], [1], [0, 1, 2, 3]])
+
+    @unittest.skipUnless(fact_matrix.numpy is not None, "numpy nao instalado")
+    def test_numpy_masks_match_the_row_filters(self):
+        matrix = _matrix()
+        queries = [
+            {"url": "/modelos/", "price": None},
+            {"price": (100000, None)},
+            {"price": (None, 100000), "gap_price": False},
+            {"intent": None},
+            {"intent": ["transacional", "inexistente"], "degraded": False},
+            {"score": 40.0},
+            {},
+        ]
+        with mock.patch.object(fact_matrix, "numpy", None):
+            expected = [matrix.where(query) for query in queries]
+        self.assertEqual([matrix.where(query) for query in queries], expected)
+
+    def test_price_flag_and_value_come_from_the_same_occurrence(self):
+        text = "Peugeot 208 por R$ 99.990 ou 48x de R$ 1.299,00; parcela de R$ 1.299,00."
+        extracted = extract_facts({}, TextIndex(text))
+        matrix = FactMatrix()
+        matrix.add_page("https://loja.example/modelos/208", {"content_pack": {"facts": extracted["facts"], "fact_values": extracted["values"]}})
+        matrix.add_page("https://loja.example/modelos/2008", _artifacts("transacional", price=None) | {"content_pack": {"facts": {}, "fact_values": {"price": {"amount": 1299}}}})
+
+        self.assertEqual(matrix.records(columns=["price", "has_price"]), [{"price": 99990, "has_price": True}, {"price": None, "has_price": False}])
+        self.assertEqual(matrix.where({"price": (None, 2000)}), [])
+
+    def test_query_args_and_export(self):
+        matrix = _matrix()
+        conditions = conditions_from_args({"price_min": "90000", "price_max": "100000", "gap_warranty": "0", "limit": "5"}, reserved=("limit",))
+
+        self.assertEqual(conditions, {"price": (90000.0, 100000.0), "gap_warranty": False})
+        page = matrix.query(conditions, limit=5, columns=["url"], stats=["price"])
+        self.assertEqual(page["rows"], [{"url": "https://loja.example/modelos/208"}])
+        self.assertEqual(page["stats"]["price"]["count"], 1)
+        with self.assertRaises(ValueError):
+            conditions_from_args({"gap_price": "talvez"})
+        with self.assertRaises(ValueError):
+            conditions_from_args({"cor": "azul"})
+
+        exported = matrix.to_columns()
+        self.assertEqual(exported["rows"], 4)
+        self.assertEqual(exported["columns"]["price"], [99990, None, 189990, None])
+        lines = matrix.to_csv(matrix.where({"gap_price": True}), ["url", "price", "gap_price"]).splitlines()
+        self.assertEqual(lines, ["url,price,gap_price", "https://loja.example/modelos/2008,,True"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import gazetteer as gazetteer_module
+from aeo_pipeline import build_page_artifacts
+from artifact_store import ArtifactStore
+from entity_engine import extract_entities
+from gazetteer import Gazetteer, gazetteer_for, load_dictionary, load_gazetteer, parse_dictionaries, trie_pattern
+from text_index import TextIndex
+
+
+def _gazetteer(entries):
+    return Gazetteer([{"key": name.lower(), "name": name, "type": entity_type, "aliases": aliases} for name, entity_type, aliases in entries])
+
+
+def _matches(gazetteer, text):
+    index = TextIndex(text)
+    return [(entry["name"], index.original_text(start, end)) for entry, start, end in gazetteer.find_all(index)]
+
+
+class GazetteerTest(unittest.TestCase):
+    def test_every_alias_occurrence_on_word_boundaries(self):
+        gazetteer = _gazetteer(
+            [
+                ("IOF", "Tax/Regulation", ["IOF", "Imposto sobre Operacoes Financeiras"]),
+                ("Seguro", "FinancialProduct", ["Seguro"]),
+                ("Stellantis", "Organization", ["Stellantis", "Grupo Stellantis"]),
+            ]
+        )
+        text = "Imposto sobre Operações Financeiras (IOF) e seguros. Seguro do Grupo Stellantis; grupo novo Stellantis e IOFX."
+
+        self.assertEqual(
+            _matches(gazetteer, text),
+            [
+                ("IOF", "Imposto sobre Operações Financeiras"),
+                ("IOF", "IOF"),
+                ("Seguro", "Seguro"),
+                ("Stellantis", "Grupo Stellantis"),
+                ("Stellantis", "Stellantis"),
+                ("Stellantis", "Stellantis"),
+            ],
+        )
+
+    def test_overlapping_aliases_follow_failure_links(self):
+        gazetteer = _gazetteer([("A", "Model", ["partner rapid"]), ("B", "Model", ["rapid city"]), ("C", "Model", ["partner rapid city van"])])
+
+        self.assertEqual(
+            _matches(gazetteer, "Partner Rapid City e partner rapid city van."),
+            [("A", "Partner Rapid"), ("B", "Rapid City"), ("A", "partner rapid"), ("B", "rapid city"), ("C", "partner rapid city van")],
+        )
+
+    def test_trie_pattern_matches_like_plain_alternation(self):
+        words = ["sa", "sao", "paulo", "peugeot", "partner", "p", "208", "2008"]
+        text = "sao paulo sa p 2008 208 partnerx peugeot s"
+        plain = re.compile(r"\b(?:" + "|".join(sorted(words, key=len, reverse=True)) + r")\b")
+        trie = re.compile(r"\b" + trie_pattern(words) + r"\b")
+
+        self.assertEqual(trie.findall(text), plain.findall(text))
+
+    def test_dictionaries_load_from_files_and_later_files_override(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "a_default.json"), "w", encoding="utf-8") as handle:
+                json.dump({"peugeot": {"type": "Brand", "aliases": ["Peugeot"]}}, handle)
+            with open(os.path.join(directory, "b_cliente.tsv"), "w", encoding="utf-8") as handle:
+                handle.write("# nome\ttipo\taliases\n")
+                handle.write("Peugeot\tOrganization\tPeugeot do Brasil|PSA\n")
+                handle.write("Peugeot 208 GT\tModel\t208 GT|P208GT\n")
+            entries = load_dictionary(os.path.join(directory, "b_cliente.tsv"))
+            gazetteer = load_gazetteer(directory)
+
+        self.assertEqual(entries[1]["aliases"], ["Peugeot 208 GT", "208 GT", "P208GT"])
+        self.assertEqual(len(gazetteer), 2)
+        entities = extract_entities({"full_text": "A PSA lancou o P208GT."}, gazetteer=gazetteer)
+        found = {(entity["entity_name"], entity["entity_type"]) for entity in entities}
+        self.assertIn(("Peugeot", "Organization"), found)
+        self.assertIn(("Peugeot 208 GT", "Model"), found)
+
+    def test_default_dictionary_entities(self):
+        entities = extract_entities({"full_text": "Financiamento sem IOF pela Stellantis."})
+        names = {entity["entity_name"]: entity for entity in entities}
+
+        self.assertLessEqual({"Financiamento", "IOF", "Stellantis"}, set(names))
+        self.assertEqual(names["IOF"]["evidence"]["start"], 18)
+        self.assertEqual(names["Stellantis"]["aliases"], ["Stellantis", "Grupo Stellantis"])
+
+
+
+class DictionarySetTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, "cliente_a.json"), "w", encoding="utf-8") as handle:
+            json.dump({"acme": {"type": "Brand", "aliases": ["Acme"]}}, handle)
+        os.mkdir(os.path.join(directory.name, "cliente_b"))
+        with open(os.path.join(directory.name, "cliente_b", "marcas.tsv"), "w", encoding="utf-8") as handle:
+            handle.write("Globex\tBrand\tGlobex\n")
+        for patcher in (
+            mock.patch.object(gazetteer_module, "ENTITY_DICTIONARY_DIR", directory.name),
+            mock.patch.object(gazetteer_module, "GAZETTEER_CACHE_SIZE", 1),
+            mock.patch.object(gazetteer_module, "_by_set", gazetteer_module.collections.OrderedDict()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _names(self, dictionaries):
+        entities = extract_entities({"full_text": "Acme e Globex sem IOF."}, gazetteer=gazetteer_for(dictionaries))
+        return {entity["entity_name"] for entity in entities}
+
+    def test_each_set_matches_only_its_own_dictionaries(self):
+        self.assertLessEqual({"Acme", "IOF"}, self._names(("cliente_a",)))
+        self.assertNotIn("Globex", self._names(("cliente_a",)))
+        self.assertLessEqual({"Globex", "IOF"}, self._names(("cliente_b",)))
+        self.assertNotIn("Acme", self._names(("cliente_b",)))
+        self.assertFalse({"Acme", "Globex"} & self._names(()))
+
+    def test_compiled_sets_are_kept_in_an_lru(self):
+        first = gazetteer_for(("cliente_a",))
+        self.assertIs(gazetteer_for(("cliente_a",)), first)
+        gazetteer_for(("cliente_b",))
+        self.assertEqual(list(gazetteer_module._by_set), [("cliente_b",)])
+        self.assertIsNot(gazetteer_for(("cliente_a",)), first)
+
+    def test_unknown_or_unsafe_names_are_rejected(self):
+        self.assertEqual(parse_dictionaries("cliente_a, cliente_b,cliente_a"), ("cliente_a", "cliente_b"))
+        self.assertEqual(parse_dictionaries(None), ())
+        for value in ("cliente_c", "../cliente_a", ["cliente_a", "/etc/passwd"]):
+            with self.assertRaises(ValueError):
+                parse_dictionaries(value)
+
+    def test_entities_memo_key_follows_the_dictionary_set(self):
+        parsed = {"url": "https://example.com/", "full_text": "Acme e Globex."}
+        with tempfile.TemporaryDirectory() as directory:
+            memo = ArtifactStore(directory)
+            default = build_page_artifacts(parsed, fields=("entities",), memo=memo, page_key="page")
+            client = build_page_artifacts(
+                parsed, fields=("entities",), memo=memo, page_key="page", dictionaries=("cliente_a",)
+            )
+        self.assertNotIn("Acme", {entity["entity_name"] for entity in default["entities"]})
+        self.assertIn("Acme", {entity["entity_name"] for entity in client["entities"]})
+
+    def test_request_option_selects_the_dictionary_set(self):
+        import app as app_module
+
+        client = app_module.app.test_client()
+        body = {"url": "https://example.com/", "html": "<p>Acme e Globex.</p>", "fields": "entities"}
+        response = client.post("/analyze/html", json={**body, "dictionary": "cliente_b"})
+        entities = response.get_json()["artifacts"]["entities"]
+        response.close()
+        self.assertEqual([entity["entity_name"] for entity in entities if entity["entity_type"] == "Brand"], ["Globex"])
+        response = client.post("/analyze/html", json={**body, "dictionary": "cliente_c"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cliente_c", response.get_json()["message"])
+        response.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
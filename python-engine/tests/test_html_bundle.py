@@ -0,0 +1,51 @@
+import gzip
+import io
+import json
+import os
+import sys
+import tarfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from html_bundle import bundle_pages
+
+
+def _html(index: int):
+    return f"<html><head><title>Pagina {index}</title></head><body><p>Pagina {index}</p></body></html>"
+
+
+class HtmlBundleTest(unittest.TestCase):
+    def test_gzipped_jsonl_resolves_relative_urls(self):
+        lines = "\n".join(json.dumps({"url": f"/p{index}", "html": _html(index)}) for index in range(3))
+        stream = io.BytesIO(gzip.compress(lines.encode("utf-8")))
+        pages = list(bundle_pages(stream, "application/x-ndjson", base_url="https://example.com/"))
+        self.assertEqual([page["url"] for page in pages], [f"https://example.com/p{index}" for index in range(3)])
+        self.assertIn("Pagina 2", pages[2]["html"])
+
+    def test_tar_reads_html_and_jsonl_members(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            members = {
+                "site/a.html": _html(1).encode("utf-8"),
+                "site/notes.txt": b"ignorar",
+                "extra.jsonl": json.dumps({"url": "https://example.com/b", "html": _html(2)}).encode("utf-8"),
+            }
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        buffer.seek(0)
+        pages = list(bundle_pages(buffer, "application/x-tar", base_url="https://example.com/"))
+        self.assertEqual([page["url"] for page in pages], ["https://example.com/site/a.html", "https://example.com/b"])
+
+    def test_rejects_unknown_type_and_oversized_bundle(self):
+        with self.assertRaises(ValueError):
+            bundle_pages(io.BytesIO(b""), "application/zip")
+        lines = "\n".join(json.dumps({"url": f"https://example.com/{index}", "html": _html(index)}) for index in range(3))
+        with self.assertRaises(ValueError):
+            list(bundle_pages(io.BytesIO(lines.encode("utf-8")), "application/x-ndjson", max_pages=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
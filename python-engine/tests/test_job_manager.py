@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from job_manager import JobManager
+
+
+def _pages(count: int):
+    for index in range(count):
+        yield {
+            "url": f"https://example.com/modelos/{index}",
+            "html": f"<html><head><title>Modelo {index}</title></head><body><main><p>Modelo {index} com garantia.</p></main></body></html>",
+        }
+
+
+class JobManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = JobManager(max_concurrent=1)
+
+    def _run(self, count: int, failed: int = 0):
+        def crawl(*args, **kwargs):
+            for index in range(failed):
+                yield {"url": f"https://example.com/erro/{index}", "error": "Falha ao processar pagina"}
+            yield from _pages(count)
+
+        with mock.patch("site_analysis.crawl_site_stream", crawl), mock.patch(
+            "site_analysis.load_boilerplate_cache", lambda url: None
+        ):
+            job = self.manager.submit("https://example.com", {"url": "https://example.com"})
+            events = list(job.events(max_seconds=10))
+        return job, events
+
+    def test_events_stream_pages_then_done(self):
+        job, events = self._run(4)
+        self.assertEqual([kind for kind, _, _ in events], ["page"] * 4 + ["done"])
+        self.assertEqual([index for _, index, _ in events[:4]], [0, 1, 2, 3])
+        self.assertEqual(events[-1][2]["status"], "done")
+        self.assertEqual(events[-1][2]["pagesProcessed"], 4)
+
+    def test_progress_counts_failures_like_the_summary(self):
+        job, events = self._run(3, failed=2)
+        status = events[-1][2]
+        self.assertEqual((status["pagesProcessed"], status["pagesFailed"]), (3, 2))
+        self.assertEqual(status["pagesProcessed"], job.summary["pagesProcessed"])
+        self.assertEqual(len([kind for kind, _, _ in events if kind == "page"]), 5)
+
+    def test_results_are_paginated_and_resumable(self):
+        job, _ = self._run(5)
+        first = job.results_page(0, 2)
+        self.assertEqual([page["url"] for page in first["pages"]], [
+            "https://example.com/modelos/0",
+            "https://example.com/modelos/1",
+        ])
+        self.assertEqual(first["nextOffset"], 2)
+        last = job.results_page(4, 2)
+        self.assertIsNone(last["nextOffset"])
+
+        resumed = [index for kind, index, _ in job.events(after=2) if kind == "page"]
+        self.assertEqual(resumed, [3, 4])
+
+    def test_empty_crawl_finishes_with_warning(self):
+        job, events = self._run(0)
+        self.assertEqual(job.status, "done")
+        self.assertIn("warning", events[-1][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import aeo_pipeline
+import app as app_module
+from page_cache import PageCache
+
+HTML = """
+<html><head><title>Troca de oleo</title><meta name="description" content="Quanto custa a troca de oleo"></head>
+<body><h1>Quanto custa a troca de oleo?</h1><p>A troca de oleo custa entre R$ 150 e R$ 300 em Sao Paulo.</p>
+<h2>Quando trocar?</h2><p>A cada 10.000 km ou 12 meses.</p></body></html>
+"""
+
+
+class RescoreTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app_module.app.test_client()
+        patcher = mock.patch.object(app_module, "page_cache", PageCache(max_entries=4))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache = mock.patch.object(app_module.response_cache, "ttl_seconds", 0)
+        cache.start()
+        self.addCleanup(cache.stop)
+
+    def _analyze(self):
+        with mock.patch.object(app_module, "fetch_html", return_value=(HTML, "https://example.com/oleo", False)):
+            response = self.client.post("/analyze", json={"url": "https://example.com/oleo"})
+        document = response.get_json()
+        response.close()
+        return document
+
+    def test_rescore_reruns_downstream_stages_without_fetching(self):
+        document = self._analyze()
+        page_ref = document["pageRef"]
+        markdown = document["optimizedContent"] + "\n\n## Perguntas frequentes\n\nQuanto custa? Entre R$ 150 e R$ 300."
+        score = mock.patch.object(aeo_pipeline, "compute_aeo_score", wraps=aeo_pipeline.compute_aeo_score)
+        fetch = mock.patch.object(app_module, "fetch_html")
+        with score as compute_aeo_score, fetch as fetch_html:
+            response = self.client.post("/rescore", json={"pageRef": page_ref, "contentPack": {"markdown": markdown}})
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        fetch_html.assert_not_called()
+        compute_aeo_score.assert_called_once()
+        self.assertEqual(set(result["artifacts"]), set(aeo_pipeline.RESCORE_ARTIFACTS))
+        self.assertIn("total", result["artifacts"]["score_pack"])
+
+        response = self.client.post("/rescore", json={"pageRef": page_ref, "contentPack": {}, "fields": "score"})
+        self.assertEqual(list(response.get_json()["artifacts"]), ["score_pack"])
+
+    def test_unchanged_content_pack_reproduces_the_analysis(self):
+        with mock.patch.object(app_module, "fetch_html", return_value=(HTML, "https://example.com/oleo", False)):
+            response = self.client.post("/analyze", json={"url": "https://example.com/oleo", "fields": "score,issues"})
+        document = response.get_json()
+        response.close()
+        response = self.client.post(
+            "/rescore", json={"pageRef": document["pageRef"], "contentPack": {}, "fields": "score,issues"}
+        )
+        self.assertEqual(response.get_json()["artifacts"], document["artifacts"])
+
+    def test_invalid_content_pack_is_rejected(self):
+        page_ref = self._analyze()["pageRef"]
+        invalid = [
+            {"markdown": 123},
+            {"blocks": "abc"},
+            {"blocks": [{"text": "x"}]},
+            {"blocks": [{"type": "heading", "level": 9, "text": "x"}]},
+            {"faq": "x"},
+            {"faq": [{"q": 1}]},
+        ]
+        for edits in invalid:
+            response = self.client.post("/rescore", json={"pageRef": page_ref, "contentPack": edits})
+            self.assertEqual(response.status_code, 400, edits)
+            self.assertIn("contentPack invalido", response.get_json()["message"])
+            response.close()
+
+    def test_edited_blocks_get_server_word_counts(self):
+        page_ref = self._analyze()["pageRef"]
+        blocks = [{"type": "answer", "text": "Entre R$ 150 e R$ 300.", "words": 9999}]
+        response = self.client.post(
+            "/rescore", json={"pageRef": page_ref, "contentPack": {"blocks": blocks}, "fields": "content"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["artifacts"]["content_pack"]["blocks"][0]["words"], 8)
+        response.close()
+
+    def test_unknown_page_ref(self):
+        response = self.client.post("/rescore", json={"pageRef": "desconhecido", "contentPack": {}})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post("/rescore", json={"contentPack": {}})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
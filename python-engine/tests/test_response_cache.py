@@ -0,0 +1,90 @@
+import gzip
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app as app_module
+from response_cache import ResponseCache, cache_key, normalize_url
+
+
+HTML = "<html><head><title>Peugeot 208</title></head><body><main><h1>Peugeot 208</h1><p>Preco R$ 99.990,00.</p></main></body></html>"
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(ttl_seconds=60, stale_seconds=60)
+        patcher = mock.patch.object(app_module, "response_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        fetch = mock.patch.object(app_module, "fetch_html", return_value=(HTML, "https://example.com/", False))
+        self.fetch = fetch.start()
+        self.addCleanup(fetch.stop)
+        self.client = app_module.app.test_client()
+
+    def _post(self, body, **kwargs):
+        response = self.client.post("/analyze", json=body, **kwargs)
+        data = response.get_data()
+        response.close()
+        return response, data
+
+    def test_key_normalizes_url_and_keeps_options(self):
+        self.assertEqual(normalize_url("HTTPS://Example.com:443#top"), "https://example.com/")
+        base = cache_key("/analyze", {"url": "https://example.com"}, {})
+        self.assertEqual(base, cache_key("/analyze", {"url": "https://EXAMPLE.com/", "cache": True}, {}))
+        self.assertNotEqual(base, cache_key("/analyze", {"url": "https://example.com", "useCrawler": True}, {}))
+        self.assertNotEqual(base, cache_key("/analyze", {"url": "https://example.com"}, {"compact": "compact"}))
+        self.assertEqual(
+            cache_key("/analyze", {"url": "https://example.com", "fields": "score"}, {"fields": ("score_pack",)}),
+            cache_key("/analyze", {"url": "https://example.com", "fields": ["score"]}, {"fields": ("score_pack",)}),
+        )
+
+    def test_query_string_options_are_part_of_the_key(self):
+        self._post({"url": "https://example.com"})
+        response = self.client.post("/analyze?dictionary=default", json={"url": "https://example.com"})
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        response.close()
+        response = self.client.post("/analyze", json={"url": "https://example.com", "dictionary": "default"})
+        self.assertEqual(response.headers["X-Cache"], "HIT")
+        response.close()
+        response = self.client.post("/analyze?dictionary=nada", json={"url": "https://example.com"})
+        self.assertEqual(response.status_code, 400)
+        response.close()
+
+    def test_second_request_is_a_hit(self):
+        first, body = self._post({"url": "https://example.com"})
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        second, cached_body = self._post({"url": "https://example.com/"}, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(gzip.decompress(cached_body), body)
+        self.assertEqual(self.fetch.call_count, 1)
+
+        bypass, _ = self._post({"url": "https://example.com", "cache": False})
+        self.assertEqual(bypass.headers["X-Cache"], "BYPASS")
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_stale_entry_is_served_and_refreshed(self):
+        self._post({"url": "https://example.com"})
+        entry = next(iter(self.cache.entries.values()))
+        entry.created -= 90
+
+        stale, _ = self._post({"url": "https://example.com"})
+        self.assertEqual(stale.headers["X-Cache"], "STALE")
+        deadline = time.monotonic() + 5
+        while self.cache.refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.fetch.call_count, 2)
+        fresh, _ = self._post({"url": "https://example.com"})
+        self.assertEqual(fresh.headers["X-Cache"], "HIT")
+
+    def test_errors_are_not_cached(self):
+        self.fetch.side_effect = ValueError("Unsupported content type: application/pdf")
+        self._post({"url": "https://example.com/doc"})
+        self.assertEqual(len(self.cache.entries), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import gzip
+import io
+import json
+import os
+import sys
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import response_writer
+from response_writer import (
+    compact_document,
+    compress_chunks,
+    records_table,
+    score_table,
+    stream_compact_response,
+    stream_crawler_response,
+    stream_zip,
+    zip_entries,
+)
+from results_store import ResultStore
+
+
+def _record(index):
+    url = f"https://example.com/p{index}"
+    markdown = f"# Pagina {index}"
+    schema = {"@graph": [{"@type": "WebPage"}]}
+    files = [
+        {"filename": f"example_com_p{index}_page.md", "mimeType": "text/markdown", "data": markdown},
+        {"filename": f"example_com_p{index}_schema.json", "mimeType": "application/json", "data": schema},
+        {"filename": "links.json", "mimeType": "application/json", "data": {"internal": ["/"]}},
+    ]
+    return {"page": {"url": url, "markdown": markdown, "schema": schema}, "files": files, "entities": []}
+
+
+class ResponseWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.store = ResultStore()
+        self.addCleanup(self.store.close)
+        for index in range(3):
+            self.store.append(_record(index))
+        self.extra = [{"filename": "templates.json", "mimeType": "application/json", "data": []}]
+
+    def test_compact_response_references_deduplicated_blobs(self):
+        full = json.loads("".join(stream_crawler_response(self.store, {"mode": "crawler"}, {}, self.extra)))
+        compact = json.loads("".join(stream_compact_response(self.store, {"mode": "crawler"}, {}, self.extra)))
+
+        # Identical schemas and link files are stored once.
+        self.assertEqual(len(compact["blobs"]), 3 + 1 + 1 + 1)
+        self.assertNotIn("optimizedContent", compact)
+        for file, compact_file in zip(full["files"], compact["files"]):
+            self.assertEqual(compact["blobs"][compact_file["ref"]], file["data"])
+        names = [file["filename"] for file in compact["files"]]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn("example_com_p1_links.json", names)
+        page = compact["pages"][1]
+        self.assertEqual(compact["blobs"][page["markdownRef"]], "# Pagina 1")
+        self.assertNotIn("markdown", page)
+
+    def test_compact_document(self):
+        document = {"analyzedUrl": "https://example.com/p0", "optimizedContent": "# Pagina 0", "files": _record(0)["files"]}
+        compact = compact_document(document)
+        self.assertEqual(compact["blobs"][compact["optimizedContentRef"]], "# Pagina 0")
+        self.assertEqual(compact["files"][0]["ref"], compact["optimizedContentRef"])
+
+    def test_table_encodings(self):
+        entities = [
+            {"entity_name": "Peugeot", "entity_type": "Brand", "evidence": [{"url": "/a", "start": 0}]},
+            {"entity_name": "Sao Paulo", "entity_type": "Location", "aliases": ["SP"]},
+        ]
+        table = records_table(entities)
+        self.assertEqual(table["columns"], ["entity_name", "entity_type", "evidence", "aliases"])
+        self.assertEqual(table["rows"][0][2], {"columns": ["url", "start"], "rows": [["/a", 0]]})
+        self.assertEqual(table["rows"][1], ["Sao Paulo", "Location", None, ["SP"]])
+
+        score = score_table({"total": 80, "breakdown": {"coverage": {"score": 20, "max": 20, "rules_failed": []}}})
+        self.assertEqual(score["total"], 80)
+        self.assertEqual(score["breakdown"], {"columns": ["score", "max", "rules_failed"], "rows": {"coverage": [20, 20, []]}})
+
+    def test_compressed_chunks_round_trip(self):
+        chunks = list(stream_crawler_response(self.store, {"mode": "crawler"}, {}, self.extra))
+        compressed = b"".join(compress_chunks(iter(chunks), "gzip", flush_each=True))
+        self.assertEqual(gzip.decompress(compressed).decode("utf-8"), "".join(chunks))
+
+    @unittest.skipUnless(response_writer.zstandard is not None, "zstandard nao instalado")
+    def test_zstd_chunks_round_trip(self):
+        chunks = list(stream_crawler_response(self.store, {"mode": "crawler"}, {}, self.extra))
+        compressed = b"".join(compress_chunks(iter(chunks), "zstd", flush_each=True))
+        decompressed = response_writer.zstandard.ZstdDecompressor().decompressobj().decompress(compressed)
+        self.assertEqual(decompressed.decode("utf-8"), "".join(chunks))
+        self.assertEqual(response_writer.RESPONSE_ENCODINGS[0], "zstd")
+
+    def test_streamed_zip(self):
+        data = b"".join(stream_zip(zip_entries({"mode": "crawler"}, self.store, self.extra)))
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read("content.txt").decode("utf-8"), "# Pagina 0\n\n# Pagina 1\n\n# Pagina 2")
+        self.assertEqual(len(json.loads(archive.read("analysis.json"))["pages"]), 3)
+        self.assertIn("example_com_p2_links.json", archive.namelist())
+        self.assertIn("templates.json", archive.namelist())
+
+
+if __name__ == "__main__":
+    unittest.main()
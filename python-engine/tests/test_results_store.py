@@ -0,0 +1,75 @@
+import json
+import os
+import gc
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from response_writer import stream_crawler_response
+from results_store import MemoryBudget, ResultStore
+
+
+class ResultStoreTest(unittest.TestCase):
+    def test_spills_past_ceiling_and_keeps_order(self):
+        records = [{"index": index, "html": "<p>pagina %d</p>" % index * 200} for index in range(20)]
+        with ResultStore(memory_ceiling_mb=0.001) as store:
+            for record in records:
+                store.append(record)
+            stats = store.stats()
+            self.assertTrue(stats["spilled"])
+            self.assertGreater(stats["diskBytes"], 0)
+            self.assertLessEqual(stats["memoryBytes"], 1024 * 1024 * 0.001)
+            self.assertEqual(list(store), records)
+            self.assertEqual(store.get(17), records[17])
+
+    def test_stores_share_the_process_budget(self):
+        budget = MemoryBudget(max_mb=0.002)
+        records = [{"index": index, "html": os.urandom(300).hex()} for index in range(10)]
+        first = ResultStore(budget=budget)
+        second = ResultStore(budget=budget)
+        for record in records:
+            first.append(record)
+        self.assertTrue(first.stats()["spilled"])
+        second.append(records[0])
+        self.assertTrue(second.stats()["spilled"])
+        self.assertLessEqual(budget.used, budget.max_bytes)
+        self.assertEqual(list(first), records)
+
+        first.close()
+        first.close()
+        self.assertEqual(budget.used, 0)
+        third = ResultStore(budget=budget)
+        third.append(records[0])
+        self.assertFalse(third.stats()["spilled"])
+        del third
+        gc.collect()
+        self.assertEqual(budget.used, 0)
+        second.close()
+
+    def test_streamed_response_is_valid_json(self):
+        with ResultStore() as store:
+            for index in range(3):
+                page = {"url": f"https://example.com/{index}", "markdown": f"# Pagina \"{index}\"\nação"}
+                store.append({"page": page, "files": [{"filename": f"{index}.md"}], "entities": []})
+            body = "".join(
+                stream_crawler_response(
+                    store,
+                    {"analyzedUrl": "https://example.com", "pagesProcessed": 3},
+                    {"templates": []},
+                    [{"filename": "templates.json"}],
+                )
+            )
+
+        payload = json.loads(body)
+        self.assertEqual(payload["pagesProcessed"], 3)
+        self.assertEqual(
+            payload["optimizedContent"],
+            "\n\n".join(f"# Pagina \"{index}\"\nação" for index in range(3)),
+        )
+        self.assertEqual([file["filename"] for file in payload["files"]], ["0.md", "1.md", "2.md", "templates.json"])
+        self.assertEqual(len(payload["pages"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ import unittest
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from schema_engine import check_schema_parity
+from schema_engine import check_schema_parity, validate_schema
 
 
 class SchemaParityTest(unittest.TestCase):
@@ -44,6 +44,43 @@ class SchemaParityTest(unittest.TestCase):
         self.assertFalse(ok)
         self.assertTrue(errors)
 
+    def test_validation_checks_nodes_against_vocabulary(self):
+        schema = {
+            "@graph": [
+                {"@type": "WebPage", "@id": "https://x.com/#webpage", "url": "https://x.com/", "name": "X"},
+                {
+                    "@type": "BreadcrumbList",
+                    "itemListElement": [{"@type": "ListItem", "position": 1, "name": None, "item": "https://x.com/"}],
+                },
+                {"@type": "Organization", "name": "X", "logo": "https://x.com/logo.png", "author": "Fulano"},
+                {"@type": "FAQPage", "mainEntity": [{"@type": "Answer", "text": "Sim."}]},
+                {"@type": "Veiculo", "name": "208"},
+            ]
+        }
+        validation = validate_schema(schema, {"faq": []})
+        self.assertEqual(validation["faq_nodes"], 1)
+        self.assertEqual(
+            validation["errors"],
+            [
+                "BreadcrumbList.itemListElement.name: valor vazio",
+                "Organization: propriedade desconhecida 'author'",
+                "Veiculo: tipo desconhecido Veiculo",
+            ],
+        )
+
+    def test_validation_accepts_generated_types(self):
+        schema = {
+            "@graph": [
+                {"@type": "AutoDealer", "name": "Loja", "description": "Rua A", "address": {"@type": "PostalAddress", "postalCode": "01000-000"}},
+                {"@type": "HowTo", "name": "Como", "step": [{"@type": "HowToStep", "text": "Passo."}]},
+                {"@type": ["Organization", "Brand"], "name": "Peugeot", "sameAs": ["https://peugeot.com"]},
+            ]
+        }
+        validation = validate_schema(schema, {})
+        self.assertEqual(validation["errors"], [])
+        self.assertEqual(validation["nodes"], 5)
+        self.assertTrue(validation["parity_ok"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from budget_engine import RequestBudget
+from site_analysis import BatchAnalysis, SiteAnalysis, batch_urls_from_body
+
+
+def _fetched(urls, **kwargs):
+    for index, url in enumerate(urls):
+        if url.endswith("/fora"):
+            yield {"index": index, "requested_url": url, "url": url, "error": "HTTP 404"}
+            continue
+        yield {
+            "index": index,
+            "requested_url": url,
+            "url": url,
+            "html": f"<html><head><title>Produto {index}</title></head><body><main><p>Produto {index} com garantia.</p></main></body></html>",
+        }
+
+
+class BatchAnalysisTest(unittest.TestCase):
+    def test_failed_urls_are_recorded_and_aggregated(self):
+        urls = ["https://a.example/1", "https://a.example/fora", "https://b.example/2"]
+        with mock.patch("site_analysis.fetch_urls_stream", _fetched):
+            analysis = BatchAnalysis(urls, {}, RequestBudget())
+            records = [record for _, record in analysis.run()]
+            summary = analysis.finish()
+        analysis.store.close()
+
+        pages = sorted((record["page"] for record in records), key=lambda page: page["index"])
+        self.assertEqual([page["requestedUrl"] for page in pages], urls)
+        self.assertEqual(pages[1]["error"], "HTTP 404")
+        self.assertNotIn("error", pages[0])
+        aggregates = summary["aggregates"]
+        self.assertEqual(aggregates["urlsRequested"], 3)
+        self.assertEqual(aggregates["pagesAnalyzed"], 2)
+        self.assertEqual(aggregates["pagesFailed"], 1)
+        self.assertEqual(summary["pagesProcessed"], 2)
+        matrix = summary["factMatrix"]
+        self.assertEqual(sorted(matrix.urls), [urls[0], urls[2]])
+        self.assertEqual(matrix.where({"has_warranty": True, "gap_price": True}), [0, 1])
+
+    def test_crawl_failures_become_records(self):
+        def crawled(url, **kwargs):
+            yield {"url": url, "html": "<html><head><title>Home</title></head><body><main><p>Inicio.</p></main></body></html>"}
+            yield {"url": url + "quebrada", "error": "Falha ao processar pagina: boom"}
+
+        with mock.patch("site_analysis.crawl_site_stream", crawled), mock.patch(
+            "site_analysis.load_boilerplate_cache", lambda url: None
+        ):
+            analysis = SiteAnalysis("https://a.example/", {}, RequestBudget())
+            records = [record for _, record in analysis.run()]
+            summary = analysis.finish()
+        analysis.store.close()
+
+        self.assertEqual(records[-1]["page"], {"url": "https://a.example/quebrada", "error": "Falha ao processar pagina: boom"})
+        self.assertEqual(summary["pagesProcessed"], 1)
+        self.assertEqual(summary["pagesFailed"], 1)
+
+    def test_url_list_is_validated(self):
+        with self.assertRaises(ValueError):
+            batch_urls_from_body({"urls": "https://a.example"})
+        with self.assertRaises(ValueError):
+            batch_urls_from_body({"urls": ["  "]})
+        self.assertEqual(batch_urls_from_body({"urls": [" https://a.example "]}), ["https://a.example"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from schema_engine import validate_schema
+from site_schema import SitewideSchema, merge_site_graph
+
+
+def _page_schema(path, organization):
+    url = f"https://example.com{path}"
+    return {
+        "@context": "https://schema.org",
+        "@graph": [
+            {"@type": "WebPage", "@id": f"{url}#webpage", "url": url, "name": path},
+            {
+                "@type": "BreadcrumbList",
+                "@id": f"{url}#breadcrumbs",
+                "itemListElement": [
+                    {"@type": "ListItem", "position": 1, "name": "Inicio", "item": "https://example.com/"},
+                    {"@type": "ListItem", "position": 2, "name": "Modelos", "item": "https://example.com/modelos/"},
+                    {"@type": "ListItem", "position": 3, "name": path, "item": url},
+                ],
+            },
+            {"@type": "Organization", "@id": f"{url}#organization", **organization},
+        ],
+    }
+
+
+class SitewideSchemaTest(unittest.TestCase):
+    def test_shared_nodes_are_referenced_by_stable_ids(self):
+        site = SitewideSchema()
+        first = site.add_page("https://example.com/modelos/208", _page_schema("/modelos/208", {"name": "Peugeot"}))
+        second = site.add_page(
+            "https://example.com/modelos/2008",
+            _page_schema("/modelos/2008", {"name": "Peugeot", "logo": "https://example.com/logo.png"}),
+        )
+        sitewide = site.graph()
+
+        ids = [node["@id"] for node in sitewide["@graph"]]
+        self.assertEqual(
+            ids,
+            [
+                "https://example.com/#org-peugeot",
+                "https://example.com/#webpage",
+                "https://example.com/#website",
+                "https://example.com/modelos/#webpage",
+            ],
+        )
+        organization = sitewide["@graph"][0]
+        self.assertEqual(organization["logo"], "https://example.com/logo.png")
+        self.assertEqual(sitewide["@graph"][2]["publisher"], {"@id": organization["@id"]})
+
+        for delta in (first, second):
+            self.assertEqual([node["@type"] for node in delta["@graph"]], ["WebPage", "BreadcrumbList"])
+            webpage = delta["@graph"][0]
+            self.assertEqual(webpage["isPartOf"], {"@id": "https://example.com/#website"})
+            self.assertEqual(webpage["publisher"], {"@id": organization["@id"]})
+            crumbs = delta["@graph"][1]["itemListElement"]
+            self.assertEqual(crumbs[1], {"@type": "ListItem", "position": 2, "item": {"@id": "https://example.com/modelos/#webpage"}})
+            self.assertEqual(crumbs[2]["item"], {"@id": webpage["@id"]})
+
+        merged = merge_site_graph(sitewide, [first, second])
+        self.assertEqual(len(merged["@graph"]), 4 + 2 * 2)
+        self.assertEqual(validate_schema(merged, {})["errors"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from aeo_pipeline import build_page_artifacts, parse_fields, stage_plan
+from parser_engine import parse_page
+
+
+HTML = (
+    "<html><head><title>Peugeot 208</title></head><body><main><h1>Peugeot 208</h1>"
+    "<p>O Peugeot 208 tem garantia de 3 anos e preco de R$ 99.990,00 em Sao Paulo.</p></main></body></html>"
+)
+
+
+class StageGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.parsed = parse_page(HTML, "https://example.com/modelos/208")
+
+    def test_projection_matches_full_artifacts(self):
+        full = build_page_artifacts(self.parsed)
+        projected = build_page_artifacts(self.parsed, fields=parse_fields("score,entities"))
+        self.assertEqual(set(projected), {"score_pack", "entities", "degraded"})
+        self.assertEqual(projected["score_pack"], full["score_pack"])
+        self.assertEqual(projected["entities"], full["entities"])
+
+    def test_only_required_stages_run(self):
+        self.assertEqual(stage_plan(parse_fields("entities")), ["text_index", "entities"])
+        with mock.patch("aeo_pipeline.generate_aeo_content") as content, mock.patch("aeo_pipeline.run_test_harness") as harness:
+            build_page_artifacts(self.parsed, fields=parse_fields("entities,intent"))
+        content.assert_not_called()
+        harness.assert_not_called()
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_fields("score,nada")
+        self.assertIsNone(parse_fields(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser_engine import parse_page
+from structured_data_engine import scan_jsonld_blocks
+
+
+HTML = """
+<html><head><title>Peugeot 208</title>
+<script type="application/ld+json">{"@context": "https://schema.org", "@graph": [
+  {"@type": "Organization", "name": "Peugeot", "url": "https://example.com"},
+  {"@type": "WebSite", "name": "Peugeot Brasil"}]}</script>
+<script type='application/ld+json'><!-- {"@type": "Product", "name": "208"} --></script>
+<script type="application/ld+json">{broken</script>
+</head><body>
+<footer itemscope itemtype="https://schema.org/AutoDealer"><span itemprop="name">Loja Centro</span></footer>
+<main><p>Conteudo principal.</p></main>
+</body></html>
+"""
+
+
+class StructuredDataTest(unittest.TestCase):
+    def test_scan_accepts_bytes_and_counts_invalid_blocks(self):
+        blocks, invalid = scan_jsonld_blocks(HTML.encode("utf-8"))
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(invalid, 1)
+
+    def test_scan_strips_commented_cdata_wrappers(self):
+        html = (
+            '<script type="application/ld+json">//<![CDATA[\n{"@type": "Product", "name": "208"}\n//]]></script>'
+            '<script type="application/ld+json">/* <![CDATA[ */ {"@type": "Offer"} /* ]]> */</script>'
+        )
+        blocks, invalid = scan_jsonld_blocks(html)
+        self.assertEqual([block["@type"] for block in blocks], ["Product", "Offer"])
+        self.assertEqual(invalid, 0)
+
+    def test_parse_page_indexes_markup_before_boilerplate_removal(self):
+        parsed = parse_page(HTML, "https://example.com/208")
+        self.assertEqual(len(parsed["structured_data_raw"]), 2)
+        index = parsed["structured_data"]
+        self.assertEqual(index["types"], ["AutoDealer", "Organization", "Product", "WebSite"])
+        self.assertEqual(index["by_type"]["AutoDealer"][0]["source"], "microdata")
+        self.assertEqual(index["by_type"]["AutoDealer"][0]["node"]["name"], "Loja Centro")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawl_analysis import CrawlAnalysisStream
+from template_engine import TemplateClusterer, dom_signature
+
+
+PRODUCT = """<html><head><title>{name}</title></head><body><main>
+<h1>{name}</h1><div class="gallery"><img src="a.jpg"><img src="b.jpg"></div>
+<section><h2>Versoes</h2><table><tr><th>Versao</th><td>{name} Active</td></tr></table></section>
+<section><h2>Garantia</h2><p>Garantia de 3 anos para o {name}.</p></section>
+</main></body></html>"""
+
+LISTING = """<html><head><title>Ofertas</title></head><body>
+<header><form><input name="q"><button>Buscar</button></form></header>
+<article><ul><li><a href="/a">A</a></li><li><a href="/b">B</a></li></ul></article>
+<aside><ol><li>Filtro</li></ol></aside><script>var a = "<div>";</script>
+</body></html>"""
+
+
+class TemplateClusteringTest(unittest.TestCase):
+    def test_pages_from_same_template_share_a_cluster(self):
+        clusterer = TemplateClusterer()
+        first, first_is_new = clusterer.assign("/208", dom_signature(PRODUCT.format(name="208")))
+        second, second_is_new = clusterer.assign("/2008", dom_signature(PRODUCT.format(name="2008")))
+        third, third_is_new = clusterer.assign("/ofertas", dom_signature(LISTING))
+        self.assertEqual(first, second)
+        self.assertTrue(first_is_new)
+        self.assertFalse(second_is_new)
+        self.assertNotEqual(first, third)
+        self.assertTrue(third_is_new)
+
+    def test_template_report_groups_members(self):
+        pages = [
+            {"url": "https://example.com/208", "html": PRODUCT.format(name="208")},
+            {"url": "https://example.com/2008", "html": PRODUCT.format(name="2008")},
+            {"url": "https://example.com/ofertas", "html": LISTING},
+        ]
+        stream = CrawlAnalysisStream(pages, "https://example.com")
+        analyzed = list(stream)
+        report = stream.template_report()
+        self.assertEqual(len(analyzed), 3)
+        self.assertEqual([item["pageCount"] for item in report], [2, 1])
+        self.assertEqual(report[0]["representativeUrl"], "https://example.com/208")
+        self.assertIn("hreflang ausente", analyzed[1]["artifacts"]["issues_pack"]["Technical SEO"])
+        self.assertEqual(report[0]["structuralIssues"][0], {"message": "hreflang ausente", "pages": 2})
+
+    def test_members_keep_their_own_structural_findings(self):
+        with_markup = PRODUCT.replace(
+            "<title>{name}</title>",
+            '<title>{name}</title><link rel="alternate" hreflang="es" href="/es">'
+            '<script type="application/ld+json">{{"@type": "Car", "name": "{name}"}}</script>',
+        )
+        pages = [
+            {"url": "https://example.com/208", "html": PRODUCT.format(name="208")},
+            {"url": "https://example.com/2008", "html": with_markup.format(name="2008")},
+        ]
+        stream = CrawlAnalysisStream(pages, "https://example.com", parallel=False)
+        analyzed = list(stream)
+        report = stream.template_report()
+        self.assertEqual(len(report), 1)
+        member = analyzed[1]["artifacts"]
+        self.assertEqual(member["structural_issues"], {"Technical SEO": [], "Structured Data": []})
+        self.assertEqual(report[0]["structuralIssues"], [
+            {"message": "hreflang ausente", "pages": 1},
+            {"message": "Pagina nao publica dados estruturados", "pages": 1},
+        ])
+        self.assertEqual(report[0]["existingSchemaTypes"], [{"type": "Car", "pages": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
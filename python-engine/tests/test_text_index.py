@@ -0,0 +1,37 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from entity_engine import extract_entities
+from parser_engine import expected_data_gaps
+from text_index import TextIndex
+
+
+class TextIndexTest(unittest.TestCase):
+    def test_accent_insensitive_find_maps_back_to_original(self):
+        index = TextIndex("Preço em São Paulo 🚗 com garantia.")
+        start, end = index.find("sao paulo")
+        self.assertEqual(index.original[start:end], "São Paulo")
+        start, end = index.find("garantia")
+        self.assertEqual(index.original[start:end], "garantia")
+        self.assertTrue(index.contains("PRECO"))
+
+    def test_sentences_and_tokens(self):
+        index = TextIndex("Primeira frase. Segunda frase!")
+        self.assertEqual(len(index.sentences), 2)
+        self.assertEqual(index.sentence_at(20), "Segunda frase!")
+        self.assertEqual(len(index.tokens), 4)
+
+    def test_engines_match_accented_text(self):
+        parsed = {"full_text": "Preço e versão publicados. Atendimento em São Paulo."}
+        gaps = {gap["field"] for gap in expected_data_gaps(parsed)}
+        self.assertNotIn("price", gaps)
+        self.assertNotIn("versions", gaps)
+        locations = [entity["entity_name"] for entity in extract_entities(parsed) if entity["entity_type"] == "Location"]
+        self.assertEqual(locations, ["Sao Paulo"])
+
+
+if __name__ == "__main__":
+    unittest.main()
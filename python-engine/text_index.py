@@ -0,0 +1,131 @@
+import bisect
+import re
+import unicodedata
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SENTENCE_BREAK_PATTERN = re.compile(r"(?<=[.!?])\s+")
+_OUTSIDE_TABLE_PATTERN = re.compile(r"[^\u0000-\u024f]")
+
+
+def _fold_char(char: str) -> str:
+    decomposed = unicodedata.normalize("NFD", char.lower())
+    return "".join(part for part in decomposed if not unicodedata.combining(part))
+
+
+def _build_fold_table():
+    table = {}
+    for code in range(0x250):
+        char = chr(code)
+        folded = _fold_char(char)
+        if folded != char and len(folded) == 1:
+            table[code] = folded
+    return table
+
+
+# Latin-1 and Latin Extended-A/B fold 1:1, so str.translate keeps offsets
+# aligned and no offset map is needed for the common (Portuguese) case.
+_FOLD_TABLE = _build_fold_table()
+
+
+def fold_text(text: str) -> str:
+    text = text or ""
+    if not _OUTSIDE_TABLE_PATTERN.search(text):
+        return text.translate(_FOLD_TABLE)
+    return "".join(_fold_char(char) for char in text)
+
+
+class TextIndex:
+    def __init__(self, text: str):
+        self.original = text or ""
+        if not _OUTSIDE_TABLE_PATTERN.search(self.original):
+            self.folded = self.original.translate(_FOLD_TABLE)
+            self._offsets = None
+        else:
+            folded_parts = []
+            offsets = []
+            for position, char in enumerate(self.original):
+                folded = _fold_char(char)
+                folded_parts.append(folded)
+                offsets.extend([position] * len(folded))
+            self.folded = "".join(folded_parts)
+            offsets.append(len(self.original))
+            self._offsets = offsets
+        self._lowered = None
+        self._tokens = None
+        self._sentences = None
+
+    @property
+    def lowered(self):
+        if self._lowered is None:
+            self._lowered = self.original.lower()
+        return self._lowered
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = [match.span() for match in TOKEN_PATTERN.finditer(self.folded)]
+        return self._tokens
+
+    @property
+    def sentences(self):
+        if self._sentences is None:
+            spans = []
+            start = 0
+            for match in SENTENCE_BREAK_PATTERN.finditer(self.folded):
+                spans.append((start, match.start()))
+                start = match.end()
+            if start < len(self.folded):
+                spans.append((start, len(self.folded)))
+            self._sentences = spans
+        return self._sentences
+
+    def to_original(self, start: int, end: int):
+        if self._offsets is None:
+            return start, end
+        end_index = min(end, len(self._offsets) - 1)
+        original_end = self._offsets[end_index - 1] + 1 if end_index > 0 else 0
+        return self._offsets[min(start, len(self._offsets) - 1)], original_end
+
+    def contains(self, term: str) -> bool:
+        return fold_text(term) in self.folded
+
+    def contains_any(self, terms) -> bool:
+        return any(self.contains(term) for term in terms)
+
+    def find(self, term: str):
+        folded_term = fold_text(term)
+        if not folded_term:
+            return None
+        start = self.folded.find(folded_term)
+        if start < 0:
+            return None
+        return self.to_original(start, start + len(folded_term))
+
+    def search(self, pattern):
+        # `pattern` runs against the folded text; map spans back with to_original.
+        return pattern.search(self.folded) if hasattr(pattern, "search") else re.search(pattern, self.folded)
+
+    def finditer(self, pattern):
+        return pattern.finditer(self.folded) if hasattr(pattern, "finditer") else re.finditer(pattern, self.folded)
+
+    def original_text(self, start: int, end: int) -> str:
+        original_start, original_end = self.to_original(start, end)
+        return self.original[original_start:original_end]
+
+    def snippet(self, start: int, end: int, window: int = 90):
+        # `start`/`end` are original offsets.
+        return self.original[max(0, start - window): min(len(self.original), end + window)].strip()
+
+    def sentence_at(self, folded_offset: int):
+        spans = self.sentences
+        index = bisect.bisect_right([span[0] for span in spans], folded_offset) - 1
+        if index < 0:
+            return ""
+        return self.original_text(*spans[index])
+
+
+def text_index_for(parsed_page, text_index=None):
+    if text_index is not None:
+        return text_index
+    return TextIndex(parsed_page.get("full_text") or "")
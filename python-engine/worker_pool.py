@@ -0,0 +1,248 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # not on Windows; workers run without an address-space cap
+    resource = None
+
+
+ENGINE_WORKERS = int(os.getenv("ENGINE_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+ENGINE_MP_START = os.getenv("ENGINE_MP_START", "forkserver")
+# Address space per worker process (RLIMIT_AS); 0 disables the cap.
+ENGINE_WORKER_MAX_MB = int(os.getenv("ENGINE_WORKER_MAX_MB", "2048"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_workers = ENGINE_WORKERS
+
+
+def _start_method():
+    available = multiprocessing.get_all_start_methods()
+    # forkserver/spawn avoid forking a process that already runs request threads.
+    for method in (ENGINE_MP_START, "forkserver", "spawn"):
+        if method in available:
+            return method
+    return None
+
+
+def _limit_worker(max_mb: int):
+    # Pool initializer. A page that blows up the DOM fails with MemoryError
+    # in its own worker instead of pushing the host into the OOM killer.
+    # RLIMIT_CPU is left out on purpose: it counts the worker's whole life,
+    # not one task, so it would kill long-lived workers; a stuck task is cut
+    # by the per-task timeout of imap_in_pool instead.
+    if resource is None or max_mb <= 0:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = max_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def configure_workers(count: int):
+    global _workers
+    reset_process_pool()
+    _workers = max(1, int(count or 1))
+
+
+def worker_count():
+    return _workers
+
+
+def get_process_pool():
+    global _pool
+    if _workers <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = ProcessPoolExecutor(
+                    max_workers=_workers,
+                    mp_context=multiprocessing.get_context(_start_method()),
+                    initializer=_limit_worker,
+                    initargs=(ENGINE_WORKER_MAX_MB,),
+                )
+            except (OSError, ValueError, NotImplementedError):
+                return None
+        return _pool
+
+
+def reset_process_pool(broken=None):
+    # With `broken`, only that pool is dropped: another caller may already
+    # have replaced it.
+    global _pool
+    with _pool_lock:
+        if broken is not None and _pool is not broken:
+            return
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def recycle_process_pool(pool):
+    # Kills the workers of `pool`: the only way to stop a task that ran past
+    # its timeout. Its other tasks fail with BrokenProcessPool and the next
+    # get_process_pool() starts fresh workers.
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(reset_process_pool)
+
+
+def imap_in_pool(function, tasks, parallel: bool = True, window: int = 0, timeout: float = 0, fallback=None):
+    # Yields results in task order, with at most `window` tasks submitted
+    # and not yet consumed, so a slow consumer throttles the producer. Tasks
+    # are pulled on a feeder thread: a producer that blocks (the crawler
+    # waiting on a fetch) does not hold back results that are already done.
+    # Results that finish early wait in `finished` until their turn.
+    #
+    # With `timeout`, a task still running that many seconds after it reached
+    # a worker yields fallback(task) instead (TimeoutError without one); the
+    # pool's workers are killed and tasks that were in flight with it are
+    # submitted once more to fresh workers. A task whose worker dies twice
+    # also gets fallback(task), or runs in-process without one. In-process
+    # runs cannot be cut.
+    if (get_process_pool() if parallel else None) is None:
+        for task in tasks:
+            yield function(task)
+        return
+
+    slots = threading.Semaphore(window or _workers * 2)
+    completed = queue.Queue()
+    stopped = threading.Event()
+    # sequence -> [task, future, pool, attempts, started]
+    in_flight = {}
+    in_flight_lock = threading.Lock()
+    end = object()
+
+    def submit(sequence, task, attempts=0):
+        pool = get_process_pool()
+        try:
+            future = pool.submit(function, task) if pool is not None else None
+        except (BrokenProcessPool, RuntimeError):
+            future = None
+        if future is None:
+            pool, future = None, _completed(function, task)
+        with in_flight_lock:
+            in_flight[sequence] = [task, future, pool, attempts, None]
+        future.add_done_callback(lambda done: completed.put((sequence, done)))
+
+    def feed():
+        submitted = 0
+        error = None
+        try:
+            for task in tasks:
+                while not slots.acquire(timeout=0.5):
+                    if stopped.is_set():
+                        return
+                if stopped.is_set():
+                    return
+                submit(submitted, task)
+                submitted += 1
+        except BaseException as exc:
+            error = exc
+        finally:
+            close = getattr(tasks, "close", None)
+            if close is not None:
+                close()
+            completed.put((end, (submitted, error)))
+
+    def expire():
+        # Start clocks of tasks seen running; time out the ones past `timeout`.
+        now = time.monotonic()
+        expired = []
+        with in_flight_lock:
+            for sequence, entry in list(in_flight.items()):
+                future, pool, started = entry[1], entry[2], entry[4]
+                if pool is None or future.done():
+                    continue
+                if started is None:
+                    if future.running():
+                        entry[4] = now
+                elif now - started > timeout:
+                    expired.append(entry[2])
+                    del in_flight[sequence]
+                    finished[sequence] = [entry[0], None]
+        for pool in expired:
+            recycle_process_pool(pool)
+
+    def result_of(task, future):
+        if future is not None:
+            return future.result()
+        if fallback is None:
+            raise TimeoutError(f"Tarefa excedeu {timeout}s no pool")
+        return fallback(task)
+
+    feeder = threading.Thread(target=feed, name="pool-feed", daemon=True)
+    feeder.start()
+    finished = {}
+    yielded = 0
+    total = None
+    error = None
+    poll = min(1.0, timeout / 4) if timeout else None
+    try:
+        while total is None or yielded < total:
+            if yielded in finished:
+                task, future = finished.pop(yielded)
+                slots.release()
+                result = result_of(task, future)
+                yielded += 1
+                yield result
+                continue
+            try:
+                sequence, future = completed.get(timeout=poll)
+            except queue.Empty:
+                expire()
+                continue
+            if sequence is end:
+                total, error = future
+                continue
+            with in_flight_lock:
+                entry = in_flight.get(sequence)
+                if entry is None or entry[1] is not future:
+                    # Timed out or submitted again meanwhile.
+                    continue
+                del in_flight[sequence]
+            if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+                if entry[2] is not None:
+                    reset_process_pool(entry[2])
+                if entry[3] < 1:
+                    submit(sequence, entry[0], entry[3] + 1)
+                    continue
+                future = None if fallback is not None else _completed(function, entry[0])
+            finished[sequence] = [entry[0], future]
+            if timeout:
+                expire()
+        if error is not None:
+            raise error
+    finally:
+        stopped.set()
+        with in_flight_lock:
+            for entry in in_flight.values():
+                entry[1].cancel()
+
+
+def _completed(function, task):
+    future = Future()
+    try:
+        future.set_result(function(task))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
@@ -54,6 +54,14 @@ describe('Middleware /avalie', () => {
     expect(res.headers['content-type']).toMatch(/application\/zip/);
   });
 
+  test('zip=1 passes engine errors through without re-running /analyze', async () => {
+    const res = await authorizedAvalieRequest('http://localhost:5173', '?zip=1')
+      .send({ url: 'https://busy.example.com' });
+    expect(res.status).toBe(429);
+    expect(res.headers['retry-after']).toBe('7');
+    expect(res.body.message).toBe('Engine ocupada');
+  });
+
   test('health returns ok', async () => {
     const res = await request(app).get('/health');
     expect(res.status).toBe(200);
@@ -55,6 +55,17 @@ app.post('/analyze', (req, res) => {
   res.json({ analyzedUrl: url, summary, files });
 });
 
+// Only busy answers: any other URL gets a 404, like an engine without the
+// ZIP endpoint, so the middleware zips the JSON itself.
+app.post('/analyze/zip', (req, res) => {
+  const { url } = req.body || {};
+  if (String(url || '').includes('busy')) {
+    res.setHeader('Retry-After', '7');
+    return res.status(429).json({ status: 'error', message: 'Engine ocupada' });
+  }
+  return res.status(404).json({ status: 'error', message: 'Not found' });
+});
+
 const PORT = parseInt(process.env.ENGINE_PORT, 10) || 5000;
 if (require.main === module) {
   app.listen(PORT, () => console.log(`Engine falsa rodando na ${PORT}`));
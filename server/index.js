@@ -3,6 +3,7 @@ require('dotenv').config();
 const express = require('express');
 const cors = require('cors');
 const archiver = require('archiver');
+const { Readable } = require('stream');
 // Ensure fetch exists on older Node versions
 const fetch = global.fetch || require('node-fetch');
 
@@ -41,6 +42,10 @@ const ENGINE_URL = process.env.ENGINE_URL || 'http://localhost:5000/analyze';
 const ENGINE_TIMEOUT_MS =
   parseInt(process.env.ENGINE_TIMEOUT_MS, 10) || 180_000;
 const SHARED_KEY = (process.env.WCE_SHARED_KEY || '').trim();
+// Engine endpoint that streams the analysis as a ZIP; older engines without
+// it fall back to zipping the JSON response here.
+const ENGINE_ZIP_URL =
+  process.env.ENGINE_ZIP_URL || ENGINE_URL.replace(/\/analyze\/?$/, '/analyze/zip');
 
 const trimUrl = (value) =>
   typeof value === 'string' ? value.trim() : '';
@@ -68,6 +73,78 @@ async function readEnginePayload(response) {
   }
 }
 
+// Returns false only when the engine has no ZIP endpoint (404) or cannot be
+// reached, so the caller zips the JSON response itself. Anything else the
+// engine answers (errors, 429 with Retry-After) goes straight to the client.
+async function pipeEngineZip(payload, res) {
+  const controller = new AbortController();
+  // Runs until the ZIP has been fully streamed, not just until the headers.
+  const timeoutId = setTimeout(() => controller.abort(), ENGINE_TIMEOUT_MS);
+  try {
+    let response;
+    try {
+      response = await fetch(ENGINE_ZIP_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload),
+        signal: controller.signal,
+      });
+    } catch (err) {
+      if (err?.name === 'AbortError') throw err;
+      console.warn('[middleware] Engine zip endpoint unavailable; zipping locally.');
+      return false;
+    }
+    if (response.status === 404) {
+      await response.text();
+      console.warn('[middleware] Engine has no zip endpoint; zipping locally.');
+      return false;
+    }
+    const contentType = response.headers.get('content-type') || '';
+    if (!response.ok) {
+      const raw = await response.text();
+      const retryAfter = response.headers.get('retry-after');
+      if (retryAfter) {
+        res.setHeader('Retry-After', retryAfter);
+      }
+      if (contentType) {
+        res.setHeader('Content-Type', contentType);
+      }
+      res.status(response.status).send(raw);
+      return true;
+    }
+    if (!contentType.includes('application/zip') || !response.body) {
+      sendError(res, 502, 'Engine respondeu com formato inesperado', {
+        engineResponse: await response.text(),
+      });
+      return true;
+    }
+
+    res.setHeader('Content-Type', 'application/zip');
+    res.setHeader('Content-Disposition', 'attachment; filename="analysis.zip"');
+    const body = typeof response.body.pipe === 'function' ? response.body : Readable.fromWeb(response.body);
+    await new Promise((resolve) => {
+      res.on('close', () => {
+        if (!res.writableFinished) {
+          // Client went away: stop the engine from building the rest.
+          controller.abort();
+          body.destroy();
+        }
+        resolve();
+      });
+      body.on('error', (err) => {
+        console.error('Zip stream error:', err);
+        res.destroy(err);
+        resolve();
+      });
+      body.on('end', resolve);
+      body.pipe(res);
+    });
+    return true;
+  } finally {
+    clearTimeout(timeoutId);
+  }
+}
+
 function sendError(res, status, message, extra = {}) {
   res.statusMessage = message;
   return res.status(status).json({
@@ -122,12 +199,6 @@ app.post('/avalie', async (req, res) => {
     console.log(`[middleware] Receiving URL to analyze: ${normalizedUrl}`);
     console.log(`[middleware] Forwarding to engine: ${ENGINE_URL}`);
 
-    const controller = new AbortController();
-    const timeoutId = setTimeout(
-      () => controller.abort(),
-      ENGINE_TIMEOUT_MS
-    );
-
     const useCrawler = !!req.body?.useCrawler;
     const payload = { url: normalizedUrl, useCrawler };
 
@@ -143,6 +214,16 @@ app.post('/avalie', async (req, res) => {
       if (delay !== null) payload.delay = delay;
     }
 
+    const wantZip = req.query?.zip === '1' || req.query?.zip === 'true';
+    if (wantZip && (await pipeEngineZip(payload, res))) {
+      return; // answered by the engine
+    }
+
+    const controller = new AbortController();
+    const timeoutId = setTimeout(
+      () => controller.abort(),
+      ENGINE_TIMEOUT_MS
+    );
     let response;
     try {
       response = await fetch(ENGINE_URL, {
@@ -212,6 +293,10 @@ app.post('/avalie', async (req, res) => {
           ? data.message
           : `Engine retornou ${response.status} ${response.statusText}`;
       const friendlyMessage = friendlyEngineMessage(message, normalizedUrl);
+      const retryAfter = response.headers.get('retry-after');
+      if (response.status === 429 && retryAfter) {
+        res.setHeader('Retry-After', retryAfter);
+      }
       return sendError(res, status, friendlyMessage, {
         engineStatus: response.status,
         engineResponse: data ?? raw,
@@ -234,7 +319,6 @@ app.post('/avalie', async (req, res) => {
 
     const files = Array.isArray(data?.files) ? data.files : [];
 
-    const wantZip = req.query?.zip === '1' || req.query?.zip === 'true';
     if (wantZip) {
       res.setHeader('Content-Type', 'application/zip');
       res.setHeader('Content-Disposition', 'attachment; filename="analysis.zip"');